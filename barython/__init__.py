@@ -12,6 +12,10 @@ logger = logging.getLogger("barython")
 
 class _BarSpawner():
     _cache = None
+    #: content version when the cache has been set
+    _cache_version = None
+    #: version of the content, changes when gather() needs to be called again
+    version = None
 
     def _write_in_bar(self, content):
         if self._stop.is_set():
@@ -24,7 +28,12 @@ class _BarSpawner():
         """
         Draws the bar on the screen
         """
+        version = self.version
+        if self._cache is not None and self._cache_version == version:
+            # nothing changed since the last draw
+            return
         content = (self.gather() + "\n").encode()
+        self._cache_version = version
         if self._cache == content:
             return
         self._cache = content
@@ -52,26 +61,74 @@ class _BarSpawner():
         """
         Ask to redraw the screen or the global panel
 
-        If more than one widget is waiting for the barrier, it is meaningless
-        to wait too (because its value will be taken in account by the update
-        ran by the waiting widget).
-        A sleep is launched at the end to respect the refresh rate set for this
-        Screen.
+        Marks the bar as dirty and schedules a draw for the deadline allowed
+        by the refresh rate of this Screen. All updates asked before this
+        deadline are coalesced in this only draw. Never blocks the caller.
 
-        :param no_wait: does not wait for the refresh time before leaving
+        :param no_wait: draw now, without waiting for the deadline
         """
-        try:
-            locked = self._refresh_lock.acquire(blocking=False)
-            # More than 2 threads are already here, doesn't make any sense to
-            # wait because the screen will be updated
-            if not locked:
+        if no_wait:
+            with self._update_lock:
+                self.update_requests += 1
+            return self._draw_frame()
+        with self._update_lock:
+            self.update_requests += 1
+            if self._dirty:
+                self.updates_coalesced += 1
+                return
+            self._dirty = True
+            now = time.monotonic()
+            self._draw_deadline = max(
+                now, self._last_draw + (self.refresh or 0)
+            )
+            self._draw_timer = self.runtime.call_later(
+                self._draw_deadline - now, self._on_draw_deadline
+            )
+
+    def _on_draw_deadline(self):
+        """
+        Have the frame drawn by a worker, called by the runtime timer
+
+        Drawing can block on the pipe of lemonbar, so it is kept out of the
+        timers thread. If a draw is still running, another one is done right
+        after it.
+        """
+        with self._update_lock:
+            if self._drawing:
+                self._draw_again = True
                 return
+            self._drawing = True
+        if not self.runtime.update_dispatcher.submit(self._draw_frames):
+            with self._update_lock:
+                self._drawing = False
+                # let the next update schedule a draw
+                self._dirty = False
+
+    def _draw_frames(self):
+        again = True
+        while again:
+            try:
+                self._draw_frame()
+            except Exception as e:
+                logger.error("Error when drawing: {}".format(e))
             with self._update_lock:
-                self.draw()
-                if not no_wait:
-                    time.sleep(self.refresh)
-        finally:
-            self._refresh_lock.release()
+                again, self._draw_again = self._draw_again, False
+                self._drawing = again
+
+    def _draw_frame(self):
+        """
+        Draw a frame and clean the dirty flag
+        """
+        with self._update_lock:
+            now = time.monotonic()
+            # a timer firing late should not push back the next deadlines
+            self._last_draw = (
+                min(now, self._draw_deadline) if self._dirty else now
+            )
+            self._dirty = False
+        with self._draw_lock:
+            self.frames_drawn += 1
+            self.draw()
 
     def init_bar(self):
         """
@@ -122,11 +179,25 @@ class _BarSpawner():
         except:
             pass
 
+    def restart_bar(self):
+        """
+        Restart lemonbar and draw the content again
+
+        Used to take in account a new geometry.
+        """
+        self.stop_bar()
+        self._cache = None
+        self.update(no_wait=True)
+
     def stop(self, *args, **kwargs):
         """
         Stop the screen
         """
         self._stop.set()
+        with self._update_lock:
+            if self._draw_timer:
+                self._draw_timer.cancel()
+            self._dirty = False
         self.stop_bar()
 
     def restart(self, *args, **kwargs):
@@ -135,10 +206,30 @@ class _BarSpawner():
 
     def __init__(self, offset=None, height=18, geometry=None, fg=None,
                  bg=None, fonts=None, clickable=10):
-        #: used to limit the update
+        #: protects the redraw scheduling state
         self._update_lock = threading.Lock()
+        #: only one draw at a time
+        self._draw_lock = threading.Lock()
+        #: a draw is scheduled and will take in account any new change
+        self._dirty = False
+        #: time.monotonic() value of the last draw
+        self._last_draw = 0
+        #: time.monotonic() value when the scheduled draw is due
+        self._draw_deadline = 0
+        #: scheduled draw, if any
+        self._draw_timer = None
+        #: a worker is drawing frames
+        self._drawing = False
+        #: the worker has to draw another frame
+        self._draw_again = False
+
+        #: number of frames drawn
+        self.frames_drawn = 0
+        #: number of updates asked
+        self.update_requests = 0
+        #: number of updates merged in an already scheduled frame
+        self.updates_coalesced = 0
 
-        self._refresh_lock = threading.Semaphore(2)
         #: event to stop the screen
         self._stop = threading.Event()
         self._stop.set()
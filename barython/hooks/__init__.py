@@ -2,14 +2,16 @@
 
 
 import copy as copy_module
+import functools
 import logging
-import os
-import select
 import shlex
 import subprocess
 import threading
+import time
 
-from barython.tools import splitted_sleep
+from barython.launcher import default_launcher
+from barython.runtime import default_runtime
+from barython.tools import LineReader, cancellable_sleep
 
 
 logger = logging.getLogger("barython")
@@ -17,6 +19,14 @@ logger = logging.getLogger("barython")
 
 class _Hook:
     _running_thread = None
+    _task = None
+
+    @property
+    def dispatcher(self):
+        """
+        Dispatcher calling the callbacks, the one of the runtime
+        """
+        return self.runtime.dispatcher
 
     def parse_event(self, event):
         """
@@ -26,15 +36,22 @@ class _Hook:
             "event": event,
         }
 
-    def notify(self, *args, **kwargs):
+    def _dispatch(self, *args, **kwargs):
+        """
+        Call all callbacks in background, through the dispatcher of the
+        runtime
+        """
         for c in self.callbacks:
             try:
-                threading.Thread(target=c, args=args, kwargs=kwargs).start()
+                self.dispatcher.submit(c, *args, **kwargs)
             except Exception as e:
                 logger.debug("Error in hook: {}".format(e))
                 continue
+
+    def notify(self, *args, **kwargs):
+        self._dispatch(*args, **kwargs)
         if self.refresh:
-            splitted_sleep(self.refresh, stop=self._stop_event.is_set)
+            cancellable_sleep(self.refresh, self._stop_event)
 
     def run(self, *args, **kwargs):
         raise NotImplementedError()
@@ -44,26 +61,33 @@ class _Hook:
             raise threading.ThreadError("Thread already running")
 
         self._stop_event.clear()
-        self._running_thread = threading.Thread(
-            target=self.run, args=args, kwargs=kwargs, daemon=self.daemon
-        )
-        self._running_thread.start()
+        self._running_thread = self.runtime.start_hook(self, *args, **kwargs)
 
     def is_started(self):
         return not self._stop_event.is_set()
 
     def stop(self, *args, **kwargs):
         self._stop_event.set()
+        if self._task:
+            self._task.cancel()
+            self._task = None
         if self._running_thread:
             self._running_thread.join()
 
     def is_compatible(self, hook):
         return True
 
+    def merge(self, hook):
+        """
+        Add the callbacks of a compatible hook to this one
+        """
+        self.callbacks.update(hook.callbacks)
+
     def copy(self):
         new_h = copy_module.copy(self)
         new_h.callbacks = self.callbacks.copy()
         new_h._running_thread = None
+        new_h._task = None
         return new_h
 
     def __init__(self, callbacks=None, refresh=0, failure_refresh=0, *args, **kwargs):
@@ -80,6 +104,10 @@ class _Hook:
         #: time to wait between 2 failures
         self.failure_refresh = failure_refresh
 
+        #: runtime used to start the hook and call the callbacks. Set by the
+        #  pool when starting.
+        self.runtime = default_runtime
+
         #: event to stop the screen. _stop_event because _stop interfers with
         #  the Thread attribute
         self._stop_event = threading.Event()
@@ -87,81 +115,150 @@ class _Hook:
 
 
 class SubprocessHook(_Hook):
+    """
+    Run a command and notify each line it prints
+
+    The output is read by the reactor of the runtime, shared by all hooks, so
+    no thread is used per hook. The command is restarted when it exits.
+    """
     _subproc = None
+    _reader = None
+    #: pending restart of the command
+    _launch_timer = None
     _name = "Undefined"
+    #: time given to the command to exit once its output is closed, before
+    #  killing it
+    exit_timeout = 0.1
 
     def _init_subproc(self):
         """
-        Init a subproc to listen on an event
+        Launch the command to listen on
         """
-        if self._stop_event.is_set():
-            return None
-        process_dead = self._subproc is None or self._subproc.poll() is not None
-        if process_dead:
-            logger.debug("Launching {}".format(" ".join(self.cmd)))
-            return subprocess.Popen(
-                self.cmd, stdout=subprocess.PIPE, shell=self.shell, env=self.env
-            )
-        else:
-            return self._subproc
+        logger.debug("Launching {}".format(" ".join(self.cmd)))
+        self._last_line = None
+        return default_launcher.popen(
+            self.cmd, stdout=subprocess.PIPE, shell=self.shell, env=self.env
+        )
 
-    def run(self):
-        running = True
-        while not self._stop_event.is_set():
-            try:
-                self._subproc = self._init_subproc()
-                if self._subproc is None:
-                    splitted_sleep(self.failure_refresh, stop=self._stop_event.is_set)
-                    continue
-
-                notify_kwargs = self.parse_event("")
-                line = None
-                if not running:
-                    # Checks that the handler didn't crash by fetching a quick stdout.
-                    lines = select.select([self._subproc.stdout], [], [], 0.1)[0]
-                    if lines:
-                        line = lines[0].readline()
-                else:
-                    line = self._subproc.stdout.readline()
-                if line:
-                    notify_kwargs.update(
-                        self.parse_event(
-                            line.decode().replace("\n", "").replace("\r", "")
-                        )
-                    )
+    def start(self, *args, **kwargs):
+        if self.is_started():
+            raise threading.ThreadError("Hook already running")
+        self._stop_event.clear()
+        self._launch()
 
-                return_code = self._subproc.poll()
-                if return_code is not None and return_code not in self.return_codes:
-                    logger.error(
-                        "Handler %s failed with return code %s",
-                        self._name,
-                        return_code,
-                    )
-                    running = False
-                else:
-                    running = True
+    def _launch(self):
+        self._launch_timer = None
+        if self._stop_event.is_set() or self._subproc is not None:
+            # stopped, or already restarted in the meantime
+            return
+        try:
+            subproc = self._init_subproc()
+        except Exception as e:
+            logger.error("Error when launching {}: {}".format(self._name, e))
+            self._dispatch(run=False, **self.parse_event(""))
+            self._launch_later(self.failure_refresh)
+            return
+        self._subproc = subproc
+        self._reader = LineReader(subproc.stdout)
+        self._resume(subproc)
 
-                self.notify(run=running, **notify_kwargs)
-            except Exception as e:
-                logger.error("Error when reading line: {}".format(e))
-                try:
-                    self._subproc.kill()
-                except:
-                    pass
-            finally:
-                if not running:
-                    splitted_sleep(self.failure_refresh, stop=self._stop_event.is_set)
+    def _launch_later(self, delay):
+        self._launch_timer = self.runtime.call_later(delay, self._launch)
+
+    def _resume(self, subproc):
+        """
+        Watch the output of subproc
+        """
+        if subproc is self._subproc and not self._stop_event.is_set():
+            self.runtime.add_reader(
+                self._reader.fd,
+                functools.partial(self._on_readable, subproc, self._reader)
+            )
+
+    def _on_readable(self, subproc, reader):
+        """
+        Read and notify the lines printed by subproc, called by the reactor
+        """
+        if subproc is not self._subproc:
+            # stopped or restarted in the meantime: stop watching its output,
+            # as the reactor would call us again and again, unless its fd has
+            # been reused by the current process
+            current = self._reader if self._subproc is not None else None
+            if current is None or current.fd != reader.fd:
+                self.runtime.remove_reader(reader.fd)
+            return
         try:
-            self._subproc.kill()
-        except:
-            pass
+            lines = reader.readlines()
+        except OSError:
+            lines = []
+            reader.eof = True
+        for line in lines:
+            if not self._is_duplicate(line):
+                self._dispatch(run=True, **self.parse_event(line.decode()))
+
+        if reader.eof:
+            self._on_exit(subproc)
+        elif lines and self.refresh:
+            # stop reading until the end of refresh, lines wait in the pipe
+            self.runtime.remove_reader(reader.fd)
+            self.runtime.call_later(self.refresh, self._resume, subproc)
+
+    def _on_exit(self, subproc):
+        self.runtime.remove_reader(self._reader.fd)
+        self._subproc = None
+        subproc.stdout.close()
+        self._reap(subproc, time.monotonic())
+
+    def _reap(self, subproc, exited_at):
+        """
+        Wait for the end of subproc without blocking, then restart it
+
+        :param exited_at: time.monotonic() value when its output was closed
+        """
+        return_code = subproc.poll()
+        if return_code is None:
+            if time.monotonic() - exited_at > self.exit_timeout:
+                # closed its output but still running
+                subproc.kill()
+            self.runtime.call_later(0.01, self._reap, subproc, exited_at)
+            return
+        if self._stop_event.is_set():
+            return
+
+        running = return_code in self.return_codes
+        if not running:
+            logger.error(
+                "Handler %s failed with return code %s",
+                self._name,
+                return_code,
+            )
+        self._dispatch(run=running, **self.parse_event(""))
+        self._launch_later(0 if running else self.failure_refresh)
+
+    def _is_duplicate(self, line):
+        """
+        Check if line is identical to the previous one and has to be dropped
+
+        :param line: line read, as bytes
+        """
+        if self.drop_duplicates and line == self._last_line:
+            self.duplicates_dropped += 1
+            return True
+        self._last_line = line
+        return False
 
     def stop(self):
         self._stop_event.set()
+        if self._launch_timer is not None:
+            self._launch_timer.cancel()
+            self._launch_timer = None
+        subproc, self._subproc = self._subproc, None
         try:
-            if self._subproc:
-                self._subproc.terminate()
-                self._subproc.wait()
+            if subproc:
+                self.runtime.remove_reader(self._reader.fd)
+                subproc.terminate()
+                subproc.wait()
+                subproc.stdout.close()
         except Exception as e:
             logger.error("Error when shutting down {}: \n{}".format(self.__class__, e))
         super().stop()
@@ -171,14 +268,20 @@ class SubprocessHook(_Hook):
         if isinstance(cmd, str):
             cmd = shlex.split(cmd)
 
-        #: override environment variables to get the same output everywhere
-        self.env = dict(os.environ)
-        self.env["LANG"] = "en_US"
+        #: override environment variables to get the same output everywhere.
+        #  Starts as a copy of the environment shared by the launcher.
+        self.env = dict(default_launcher.env)
         self.cmd = cmd
         #: authorized return codes. By default, only 0 is accepted.
         self.return_codes = return_codes
         self.shell = False
 
+        #: ignore a line identical to the previous one
+        self.drop_duplicates = False
+        #: number of lines dropped because identical to the previous one
+        self.duplicates_dropped = 0
+        self._last_line = None
+
 
 class HooksPool:
     def propage_changes(self):
@@ -199,7 +302,7 @@ class HooksPool:
         else:
             self.hooks[hook_class] = []
         if compatible:
-            compatible.callbacks.update(h.callbacks)
+            compatible.merge(h)
         else:
             new_h = h.copy()
             self.hooks[hook_class].append(new_h)
@@ -238,15 +341,18 @@ class HooksPool:
         else:
             self.hooks[event] = []
         if compatible:
-            compatible.callbacks.add(callback)
+            compatible.merge(hook)
         else:
             self.hooks[event].append(hook)
         self.propage_changes()
 
     def start(self):
         if self.listen:
+            runtime = getattr(self.parent, "runtime", None)
             for h in (h for hook in self.hooks.values() for h in hook):
                 try:
+                    if runtime is not None:
+                        h.runtime = runtime
                     if not h.is_started():
                         h.start()
                 except Exception as e:
@@ -1,16 +1,110 @@
 #!/usr/bin/env python3
 
+from collections import namedtuple
 import logging
+import re
+import threading
 
 from . import SubprocessHook
 
 logger = logging.getLogger("barython")
 
+#: event sent by pactl subscribe. index is None for facilities without one.
+PulseAudioEvent = namedtuple(
+    "PulseAudioEvent", ("event", "facility", "index")
+)
+
+_EVENT_RE = re.compile(r"Event '([\w-]+)' on ([\w-]+)(?: #(\d+))?")
+
 
 class PulseAudioHook(SubprocessHook):
     """
     Listen on pulseaudio events with pactl
+
+    Lines are parsed in PulseAudioEvent. Callbacks only receive the events
+    matching the filters they subscribed with, and events on a same object
+    received during the debounce window are sent only once.
     """
+    def parse_event(self, event):
+        """
+        Parse event and return a kwargs meant be used by notify() then
+        """
+        match = _EVENT_RE.match(event)
+        if match is None:
+            return {"event": None}
+        name, facility, index = match.groups()
+        return {"event": PulseAudioEvent(
+            name, facility, int(index) if index is not None else None
+        )}
+
+    def _match(self, callback, event):
+        events, facilities = self.filters.get(callback, (None, None))
+        return (
+            (events is None or event.event in events) and
+            (facilities is None or event.facility in facilities)
+        )
+
+    def _deliver(self, event):
+        for c in self.callbacks:
+            if self._match(c, event):
+                self.dispatcher.submit(c, run=True, event=event)
+
+    def _flush(self, key):
+        with self._pending_lock:
+            event = self._pending.pop(key, None)
+        if event is not None:
+            self._deliver(event)
+
+    def _dispatch(self, run=True, event=None, *args, **kwargs):
+        if event is None:
+            if not run:
+                super()._dispatch(run=False, event=None)
+            return
+        if not any(self._match(c, event) for c in self.callbacks):
+            self.filtered += 1
+            return
+        if not self.debounce:
+            return self._deliver(event)
+
+        key = (event.facility, event.index)
+        with self._pending_lock:
+            scheduled = key in self._pending
+            # keep the last event of the burst
+            self._pending[key] = event
+        if scheduled:
+            self.debounced += 1
+        else:
+            self.runtime.call_later(self.debounce, self._flush, key)
+
+    def merge(self, hook):
+        super().merge(hook)
+        self.filters.update(hook.filters)
+
+    def copy(self):
+        new_h = super().copy()
+        new_h.filters = self.filters.copy()
+        new_h._pending = dict()
+        new_h._pending_lock = threading.Lock()
+        return new_h
+
     def __init__(self, cmd=["pactl", "subscribe", "-n", "barython"],
+                 events=None, facilities=None, debounce=0.05,
                  *args, **kwargs):
         super().__init__(*args, **kwargs, cmd=cmd)
+        #: events and facilities accepted by each callback. None accepts all.
+        self.filters = {
+            c: (
+                frozenset(events) if events is not None else None,
+                frozenset(facilities) if facilities is not None else None,
+            ) for c in self.callbacks
+        }
+        #: window during which events on a same object are merged
+        self.debounce = debounce
+
+        #: number of events not sent because no callback accepts them
+        self.filtered = 0
+        #: number of events merged with a previous one
+        self.debounced = 0
+        #: last event of each object, waiting for the end of the window
+        self._pending = dict()
+        self._pending_lock = threading.Lock()
@@ -1,44 +1,82 @@
 #!/usr/bin/env python3
 
-from collections import OrderedDict
+from collections import namedtuple
+import functools
 import logging
+import os
+import socket
+import threading
+from types import MappingProxyType
 
-from . import SubprocessHook
+from . import _Hook, SubprocessHook
 
 logger = logging.getLogger("barython")
 
+#: state of a monitor in a bspwm report. desktops is a tuple of the desktops
+#  names, prefixed by their state
+BspwmMonitor = namedtuple("BspwmMonitor", ("focused", "desktops", "layout"))
+
+_DESKTOP_PREFIXES = frozenset("OoFfUu")
+
+#: report sent when bspwm cannot be reached
+_EMPTY_REPORT = MappingProxyType(dict())
+
+
+def parse_report(report):
+    """
+    Parse a bspwm report
+
+    :return: immutable mapping of monitor names and BspwmMonitor
+    """
+    if not report:
+        return _EMPTY_REPORT
+
+    monitors = dict()
+    name = None
+    focused = False
+    desktops = []
+    layout = None
+    # remove the "W" at the begining of the status
+    for i in report[1:].split(":"):
+        prefix = i[:1]
+        if prefix in _DESKTOP_PREFIXES:
+            desktops.append(i)
+        elif prefix == "M" or prefix == "m":
+            if name is not None:
+                monitors[name] = BspwmMonitor(focused, tuple(desktops), layout)
+            name, focused, desktops, layout = i[1:], prefix == "M", [], None
+        elif prefix == "L":
+            layout = i[1:]
+    if name is not None:
+        monitors[name] = BspwmMonitor(focused, tuple(desktops), layout)
+    return MappingProxyType(monitors)
+
+
+def bspwm_socket_path():
+    """
+    Return the path of the bspwm socket, like bspc does
+    """
+    path = os.environ.get("BSPWM_SOCKET")
+    if path:
+        return path
+    host, _, display = os.environ.get("DISPLAY", "").rpartition(":")
+    number, _, screen = display.partition(".")
+    return "/tmp/bspwm{}_{}_{}-socket".format(host, number or 0, screen or 0)
+
 
 class BspwmHook(SubprocessHook):
     """
     Subscribe to bspwm
+
+    Reports identical to the previous one are dropped.
     """
     def parse_event(self, event):
         """
         Parse event and return a kwargs meant be used by notify() then
+
+        Monitors are an immutable mapping of monitor names and BspwmMonitor.
         """
-        monitors = OrderedDict()
-        if not event:
-            return {"monitors": monitors}
-
-        # remove the "W" at the begining of the status
-        status = event[1:]
-        parsed_status = status.split(":")
-        for i in parsed_status:
-            if i.startswith("M"):
-                # focused monitor
-                monitors[i[1:]] = {"focused": True, "desktops": []}
-            elif i.startswith("m"):
-                # unfocused monitor
-                monitors[i[1:]] = {"focused": False, "desktops": []}
-            elif i.startswith(("O", "o", "F", "f", "U", "u")):
-                # desktop
-                last_monitor = tuple(monitors.keys())[-1]
-                monitors[last_monitor]["desktops"].append(i)
-            elif i.startswith("L"):
-                # layout
-                last_monitor = tuple(monitors.keys())[-1]
-                monitors[last_monitor]["layout"] = i[1:]
-        return {"monitors": monitors}
+        return {"monitors": parse_report(event)}
 
     def __init__(self, bspwm_version="0.9", cmd=None, failure_refresh=1,
                  *args, **kwargs):
@@ -50,3 +88,197 @@ class BspwmHook(SubprocessHook):
         self.bspwm_version = bspwm_version
         super().__init__(*args, **kwargs, cmd=cmd,
                          failure_refresh=failure_refresh)
+        self.drop_duplicates = True
+
+
+class BspwmSocketHook(_Hook):
+    """
+    Subscribe to bspwm directly through its socket, without spawning bspc
+
+    Several topics can be subscribed on the same connection. Events which are
+    not reports are notified with the last report received. Reports
+    identical to the previous one are dropped.
+    """
+    #: maximum time to wait between 2 reconnections
+    max_failure_refresh = 30
+    _sock = None
+    #: pending reconnection
+    _connect_timer = None
+
+    def parse_event(self, event):
+        """
+        Parse event and return a kwargs meant be used by notify() then
+        """
+        if event.startswith("W"):
+            self._last_report = parse_report(event)
+            return {"monitors": self._last_report}
+        return {"monitors": self._last_report, "event": event}
+
+    def _subscribe_message(self):
+        return b"".join(
+            "{}\0".format(arg).encode()
+            for arg in ("subscribe", ) + tuple(self.topics)
+        )
+
+    def _parse_line(self, line):
+        """
+        Parse a line received from bspwm
+
+        :param line: line received, as bytes
+        :return: kwargs to notify, or None if the line has to be dropped
+        """
+        line = line.rstrip(b"\r\n")
+        if line.startswith(b"\x07"):
+            raise ConnectionError(line[1:].decode(errors="replace"))
+        if line.startswith(b"W"):
+            if line == self._last_line:
+                self.duplicates_dropped += 1
+                return None
+            self._last_line = line
+        elif not line:
+            return None
+        self._failures = 0
+        return self.parse_event(line.decode())
+
+    def start(self, *args, **kwargs):
+        if self.is_started():
+            raise threading.ThreadError("Hook already running")
+        self._stop_event.clear()
+        self._connect()
+
+    def _connect(self):
+        """
+        Subscribe to bspwm and listen on the socket through the reactor of
+        the runtime, retrying later on failure
+        """
+        self._connect_timer = None
+        if self._stop_event.is_set() or self._sock is not None:
+            return
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socket_path)
+            sock.sendall(self._subscribe_message())
+        except OSError as e:
+            sock.close()
+            self._on_failure(e)
+            return
+        sock.setblocking(False)
+        self._sock = sock
+        self._last_line = None
+        self._buffer = b""
+        logger.debug("Connected to {}".format(self.socket_path))
+        self._resume(sock)
+
+    def _resume(self, sock):
+        """
+        Watch the socket, unless it has been closed in the meantime
+        """
+        if sock is self._sock and not self._stop_event.is_set():
+            self.runtime.add_reader(
+                sock.fileno(), functools.partial(self._on_readable, sock)
+            )
+
+    def _read_lines(self, sock):
+        """
+        Read the lines available on the socket, without blocking
+
+        :return: the lines read, and if the socket has been closed
+        """
+        lines = []
+        while True:
+            try:
+                chunk = sock.recv(4096)
+            except BlockingIOError:
+                return lines, False
+            if not chunk:
+                break
+            *new_lines, self._buffer = (self._buffer + chunk).split(b"\n")
+            lines.extend(new_lines)
+        # the last line may not have been ended before closing
+        if self._buffer:
+            lines.append(self._buffer)
+            self._buffer = b""
+        return lines, True
+
+    def _on_readable(self, sock):
+        if sock is not self._sock:
+            # closed in the meantime, and its reader removed with it
+            return
+        notified = False
+        try:
+            lines, closed = self._read_lines(sock)
+            for line in lines:
+                notify_kwargs = self._parse_line(line)
+                if notify_kwargs is not None:
+                    self._dispatch(run=True, **notify_kwargs)
+                    notified = True
+            if closed:
+                raise ConnectionError("connection closed by bspwm")
+        except Exception as e:
+            self._close()
+            self._on_failure(e)
+            return
+        if notified and self.refresh:
+            # stop reading until the end of refresh, events wait in the socket
+            self.runtime.remove_reader(sock.fileno())
+            self.runtime.call_later(self.refresh, self._resume, sock)
+
+    def _on_failure(self, error):
+        """
+        Notify that bspwm cannot be reached and reconnect later
+        """
+        if self._stop_event.is_set():
+            return
+        logger.error("Error with the bspwm socket {}: {}".format(
+            self.socket_path, error
+        ))
+        self._dispatch(run=False, monitors=self._last_report)
+        self._connect_timer = self.runtime.call_later(
+            self._next_failure_refresh(), self._connect
+        )
+
+    def _next_failure_refresh(self):
+        """
+        Return the time to wait before reconnecting, doubled at each failure
+        """
+        self._failures += 1
+        return min(
+            self.failure_refresh * 2 ** (self._failures - 1),
+            self.max_failure_refresh
+        )
+
+    def _close(self):
+        sock, self._sock = self._sock, None
+        if sock is None:
+            return
+        self.runtime.remove_reader(sock.fileno())
+        sock.close()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._connect_timer is not None:
+            self._connect_timer.cancel()
+            self._connect_timer = None
+        self._close()
+        super().stop()
+
+    def is_compatible(self, hook):
+        return (self.socket_path == hook.socket_path and
+                self.topics == hook.topics)
+
+    def __init__(self, topics=("report", ), socket_path=None,
+                 failure_refresh=1, *args, **kwargs):
+        super().__init__(*args, **kwargs, failure_refresh=failure_refresh)
+        #: path of the bspwm socket. Default to the one used by bspc.
+        self.socket_path = socket_path or bspwm_socket_path()
+        #: topics to subscribe to, see `bspc subscribe`
+        self.topics = tuple(topics)
+
+        #: number of reports dropped because identical to the previous one
+        self.duplicates_dropped = 0
+        self._last_line = None
+        self._last_report = _EMPTY_REPORT
+        #: number of failures since the last event received
+        self._failures = 0
+        #: end of a line not received yet
+        self._buffer = b""
@@ -2,21 +2,98 @@
 
 import logging
 import mpd
-import select
+import os
+import socket
 
 from . import _Hook
-from barython.tools import splitted_sleep
-from . import SubprocessHook
+from barython.tools import cancellable_sleep
 
 logger = logging.getLogger("barython")
 
 
-class MPDHook(SubprocessHook):
+def fetch_state(client):
     """
-    Listen on MPD events
+    Fetch the status and the current song in one round trip
+
+    :param client: connected mpd.MPDClient
+    :return: tuple (status, current song)
     """
+    client.command_list_ok_begin()
+    client.status()
+    client.currentsong()
+    status, current = client.command_list_end()
+    return status, current
+
+
+class MPDHook(_Hook):
+    """
+    Listen on MPD events, through a connection kept in idle mode
+
+    Each notification sends the changed subsystems, with the status and the
+    current song fetched right after the change.
+    """
+    _client = None
+
+    def _connect(self):
+        client = mpd.MPDClient()
+        client.connect(self.host, self.port)
+        if self.password:
+            client.password(self.password)
+        return client
+
+    def run(self):
+        while not self._stop_event.is_set():
+            client = None
+            try:
+                self._client = client = self._connect()
+                subsystems = ()
+                while not self._stop_event.is_set():
+                    status, current = fetch_state(client)
+                    self.notify(
+                        run=True, subsystems=subsystems, status=status,
+                        current=current
+                    )
+                    subsystems = tuple(client.idle(*self.subsystems))
+            except Exception as e:
+                if not self._stop_event.is_set():
+                    logger.error("Error with MPD on {}:{}: {}".format(
+                        self.host, self.port, e
+                    ))
+            finally:
+                self._client = None
+                if client is not None:
+                    try:
+                        client.disconnect()
+                    except Exception:
+                        pass
+            if not self._stop_event.is_set():
+                self._dispatch(run=False)
+                cancellable_sleep(self.failure_refresh, self._stop_event)
+
+    def stop(self):
+        self._stop_event.set()
+        client = self._client
+        if client is not None:
+            try:
+                # wake up the thread waiting in idle
+                sock = socket.socket(fileno=os.dup(client.fileno()))
+                sock.shutdown(socket.SHUT_RDWR)
+                sock.close()
+            except Exception:
+                pass
+        super().stop()
 
-    _name = "mpd"
+    def is_compatible(self, hook):
+        return (
+            (self.host, self.port, self.password, self.subsystems) ==
+            (hook.host, hook.port, hook.password, hook.subsystems)
+        )
 
-    def __init__(self, cmd=["mpc", "idle"], failure_refresh=3, *args, **kwargs):
-        super().__init__(*args, **kwargs, cmd=cmd, failure_refresh=failure_refresh)
+    def __init__(self, host="localhost", port=6600, password=None,
+                 subsystems=(), failure_refresh=3, *args, **kwargs):
+        super().__init__(*args, **kwargs, failure_refresh=failure_refresh)
+        self.host = host
+        self.port = port
+        self.password = password
+        #: subsystems to listen on. Default to all of them.
+        self.subsystems = tuple(subsystems)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import xcffib
+import xcffib.randr
+
+from . import _Hook
+
+logger = logging.getLogger("barython")
+
+
+class RandrHook(_Hook):
+    """
+    Listen on RandR changes: outputs plugged, unplugged or moved
+
+    The X connection is read by the reactor of the runtime, so no thread is
+    used. Events read at once are notified once, with their number in
+    events. If the connection fails or is lost, it is opened again after
+    failure_refresh seconds and the callbacks are notified with no events.
+    """
+    _conn = None
+    _fd = None
+
+    #: RandR notifications listened on
+    notify_mask = (
+        xcffib.randr.NotifyMask.ScreenChange |
+        xcffib.randr.NotifyMask.CrtcChange |
+        xcffib.randr.NotifyMask.OutputChange
+    )
+
+    def start(self, *args, **kwargs):
+        if self.is_started():
+            raise threading.ThreadError("Hook already running")
+        self._stop_event.clear()
+        self._connect()
+
+    def _connect(self, notify=False):
+        """
+        Open the X connection and listen on it, retrying after
+        failure_refresh seconds on failure
+
+        :param notify: notify the callbacks once connected, as changes may
+                       have been missed
+        """
+        if self._stop_event.is_set() or self._conn is not None:
+            return
+        conn = None
+        try:
+            conn = self.connect()
+            conn.randr = conn(xcffib.randr.key)
+            root = conn.get_setup().roots[0].root
+            conn.randr.SelectInput(root, self.notify_mask)
+            conn.flush()
+        except Exception as e:
+            # only the first failure is reported, not each retry
+            log = logger.debug if notify else logger.error
+            log("Cannot listen on RandR events: {}".format(e))
+            if conn is not None:
+                try:
+                    conn.disconnect()
+                except Exception:
+                    pass
+            self.runtime.call_later(self.failure_refresh, self._connect, True)
+            return
+        self._conn = conn
+        self._fd = conn.get_file_descriptor()
+        self.runtime.add_reader(self._fd, self._on_readable)
+        if notify:
+            self._dispatch(run=True, events=0)
+
+    def _on_readable(self):
+        conn = self._conn
+        if conn is None:
+            return
+        events = 0
+        while True:
+            try:
+                event = conn.poll_for_event()
+            except xcffib.ConnectionException as e:
+                logger.error("Connection to X lost: {}".format(e))
+                self._close()
+                self.runtime.call_later(
+                    self.failure_refresh, self._connect, True
+                )
+                break
+            except Exception as e:
+                # X error sent as an event
+                logger.debug("Error in RandR events: {}".format(e))
+                continue
+            if event is None:
+                break
+            events += 1
+        if events:
+            self._dispatch(run=True, events=events)
+
+    def _close(self):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        self.runtime.remove_reader(self._fd)
+        try:
+            conn.disconnect()
+        except Exception:
+            pass
+
+    def stop(self):
+        self._stop_event.set()
+        self._close()
+        super().stop()
+
+    def is_compatible(self, hook):
+        return self.connect == hook.connect
+
+    def __init__(self, connect=None, failure_refresh=5, *args, **kwargs):
+        super().__init__(*args, failure_refresh=failure_refresh, **kwargs)
+        #: callable opening the X connection. Default to xcffib.connect.
+        self.connect = connect if connect is not None else xcffib.connect
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+
+import logging
+import socket
+import threading
+
+from . import _Hook
+
+logger = logging.getLogger("barython")
+
+NETLINK_KOBJECT_UEVENT = 15
+#: multicast group of the uevents sent by the kernel (udev uses the 2nd)
+UEVENT_KERNEL_GROUP = 1
+
+
+def parse_uevent(data):
+    """
+    Parse a kernel uevent message
+
+    Messages look like "change@/devices/...\\0ACTION=change\\0SUBSYSTEM=...".
+
+    :param data: message, as bytes
+    :return: dict of the uevent properties, None if it is not a kernel
+             uevent
+    """
+    header, *properties = data.decode(errors="replace").split("\0")
+    if "@" not in header:
+        return None
+    uevent = dict()
+    for p in properties:
+        key, sep, value = p.partition("=")
+        if sep:
+            uevent[key] = value
+    return uevent
+
+
+def netlink_uevent_socket():
+    """
+    Open a netlink socket receiving the uevents of the kernel
+    """
+    sock = socket.socket(
+        socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT
+    )
+    try:
+        sock.bind((0, UEVENT_KERNEL_GROUP))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+class UeventHook(_Hook):
+    """
+    Listen on the kernel uevents of a subsystem
+
+    The socket is read by the reactor of the runtime, so no thread is used.
+    Callbacks receive the action (add, remove, change…) in event, and all
+    properties in uevent. If some uevents were lost, event is None.
+    """
+    _sock = None
+
+    def start(self, *args, **kwargs):
+        if self.is_started():
+            raise threading.ThreadError("Hook already running")
+        self._stop_event.clear()
+        try:
+            self._sock = self.listener()
+        except OSError as e:
+            logger.error("Cannot listen on the uevents: {}".format(e))
+            return
+        self.runtime.add_reader(self._sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        sock = self._sock
+        while sock is not None:
+            try:
+                data = sock.recv(self.buffer_size, socket.MSG_DONTWAIT)
+            except BlockingIOError:
+                return
+            except OSError as e:
+                # ENOBUFS: the kernel dropped uevents, the state is unknown
+                logger.debug("Uevents lost: {}".format(e))
+                self._dispatch(run=True, event=None, uevent=None)
+                return
+            uevent = parse_uevent(data)
+            if uevent is None:
+                continue
+            if self.subsystem and uevent.get("SUBSYSTEM") != self.subsystem:
+                self.filtered += 1
+                continue
+            self._dispatch(
+                run=True, event=uevent.get("ACTION"), uevent=uevent
+            )
+
+    def stop(self):
+        self._stop_event.set()
+        sock, self._sock = self._sock, None
+        if sock is not None:
+            self.runtime.remove_reader(sock.fileno())
+            sock.close()
+        super().stop()
+
+    def is_compatible(self, hook):
+        return (
+            (self.subsystem, self.listener) ==
+            (hook.subsystem, hook.listener)
+        )
+
+    def __init__(self, subsystem=None, listener=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: only notify the uevents of this subsystem. None for all of them.
+        self.subsystem = subsystem
+        #: callable returning the socket-like object to read the uevents
+        #  from. Default to a netlink socket.
+        self.listener = (
+            listener if listener is not None else netlink_uevent_socket
+        )
+        #: maximum size of a uevent message
+        self.buffer_size = 8192
+        #: number of uevents ignored because of another subsystem
+        self.filtered = 0
@@ -4,7 +4,7 @@ import logging
 import xpybutil
 
 from . import _Hook
-from barython.tools import splitted_sleep
+from barython.tools import cancellable_sleep
 
 logger = logging.getLogger("xorg_hook")
 
@@ -42,7 +42,7 @@ class _XorgHook(_Hook):
             except Exception as e:
                 logger.error(e)
             finally:
-                splitted_sleep(self.refresh, stop=self._stop_event.is_set)
+                cancellable_sleep(self.refresh, self._stop_event)
 
     def is_compatible(self, hook):
         return True
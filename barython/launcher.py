@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+
+logger = logging.getLogger("barython")
+
+
+class _Flight:
+    """
+    Execution of a command, shared by all the callers of CommandCache.get()
+    """
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        #: time.monotonic() value at the end of the execution
+        self.end = None
+
+
+class CommandCache:
+    """
+    Share the output of identical commands
+
+    Concurrent calls of a same command wait for a single execution, and its
+    result is reused during a TTL.
+    """
+    def get(self, key, func, ttl=0):
+        """
+        Return the result of func(), shared by all calls with key
+
+        :param key: hashable identifying the command
+        :param ttl: time during which a result is reused, in seconds
+        """
+        owner = False
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None and flight.done.is_set():
+                if time.monotonic() - flight.end < ttl:
+                    self.hits += 1
+                    return flight.result
+                flight = None
+            if flight is not None:
+                self.joined += 1
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+                owner = True
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except Exception as e:
+            flight.error = e
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+            raise
+        finally:
+            flight.end = time.monotonic()
+            flight.done.set()
+        return flight.result
+
+    @property
+    def spawns_saved(self):
+        """
+        Number of executions avoided
+        """
+        return self.hits + self.joined
+
+    def __init__(self):
+        #: calls answered by a result in its TTL
+        self.hits = 0
+        #: calls which waited for an execution already running
+        self.joined = 0
+        #: calls which needed a new execution
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        #: last execution of each command
+        self._flights = dict()
+
+
+class Launcher:
+    """
+    Launch the commands of widgets and hooks
+
+    All commands share one prepared environment. Executables are resolved
+    once, and the short-lived commands of run() keep the file descriptors of
+    the process, so that subprocess can use posix_spawn instead of forking the
+    whole interpreter. Shell commands use it too, through /bin/sh.
+    """
+    def _executable(self, program):
+        try:
+            return self._executables[program]
+        except KeyError:
+            path = shutil.which(program, path=self.env.get("PATH"))
+            self._executables[program] = path
+            return path
+
+    def popen(self, cmd, shell=False, env=None, **kwargs):
+        """
+        Same as subprocess.Popen, using the fast path when possible
+
+        :param env: environment. Default to the shared one.
+        """
+        if not shell and not isinstance(cmd, str):
+            kwargs.setdefault("executable", self._executable(cmd[0]))
+        return subprocess.Popen(
+            cmd, shell=shell, env=env if env is not None else self.env,
+            **kwargs
+        )
+
+    def run(self, cmd, shell=False, env=None, ttl=0):
+        """
+        Run cmd and return the first line it prints, without its end of line
+
+        Identical commands running at the same time share one execution.
+        The command is terminated once its first line is read.
+
+        :param ttl: time during which the output is reused, in seconds
+        """
+        if env == self.env:
+            env = None
+        key = (
+            cmd if isinstance(cmd, str) else tuple(cmd), shell,
+            tuple(sorted(env.items())) if env is not None else None
+        )
+        return self.cache.get(
+            key, lambda: self._run(cmd, shell, env), ttl=ttl
+        )
+
+    def _run(self, cmd, shell, env):
+        # the command is terminated after its first line, so it can keep the
+        # fds of barython, which close_fds=True would check one by one and
+        # which prevents the use of posix_spawn
+        proc = self.popen(
+            cmd, shell=shell, env=env, stdout=subprocess.PIPE, close_fds=False
+        )
+        try:
+            return proc.stdout.readline().rstrip(b"\r\n")
+        finally:
+            if proc.poll() is None:
+                proc.terminate()
+            proc.wait()
+            proc.stdout.close()
+
+    def __init__(self, env=None):
+        #: environment shared by all commands. Override the locale to get the
+        #  same output everywhere.
+        self.env = dict(os.environ if env is None else env)
+        self.env["LANG"] = "en_US"
+
+        #: outputs of the commands run by run()
+        self.cache = CommandCache()
+        #: resolved path of each program
+        self._executables = dict()
+
+
+#: launcher shared by all widgets and hooks
+default_launcher = Launcher()
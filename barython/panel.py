@@ -4,9 +4,10 @@
 import logging
 import os
 import signal
-import threading
 
 from barython import _BarSpawner
+from barython.hooks.randr import RandrHook
+from barython.runtime import RUNTIMES
 from barython.screen import get_randr_screens
 
 
@@ -46,11 +47,31 @@ class Panel(_BarSpawner):
             )
             self._screens = new_screen_list
 
+    @property
+    def version(self):
+        """
+        Version of the content, changes when any screen content changes
+        """
+        return tuple((id(s), s.version) for s in self.screens)
+
+    def _gather_screen(self, screen):
+        """
+        Return the screen content, from the cache if still valid
+        """
+        version = screen.version
+        cached_version, content = self._screens_contents.get(
+            screen, (None, "")
+        )
+        if cached_version != version:
+            content = screen.gather()
+            self._screens_contents[screen] = (version, content)
+        return content
+
     def gather(self):
         """
         Gather all widgets content
         """
-        return "%{S+}".join(screen.gather() for screen in self.screens)
+        return "%{S+}".join(self._gather_screen(s) for s in self.screens)
 
     def clean_screens(self):
         """
@@ -64,10 +85,61 @@ class Panel(_BarSpawner):
                 if s.geometry:
                     yield s
         else:
-            nb_randr_screens = len(get_randr_screens())
+            nb_randr_screens = len(self.outputs)
             for screen, i in zip(self._screens, range(nb_randr_screens)):
                 yield screen
 
+    @property
+    def outputs(self):
+        """
+        Snapshot of the active outputs, by name: (width, height, x, y)
+
+        Kept up to date by the RandR events, so reading it never talks to the
+        X server once fetched.
+        """
+        outputs = self._outputs
+        if outputs is None:
+            outputs = self._outputs = get_randr_screens(cached=True)
+        return outputs
+
+    def _on_outputs_change(self, *args, **kwargs):
+        """
+        Handle outputs plugged, unplugged or moved
+
+        Starts or stops the screens appearing or disappearing, and only
+        restarts the bars of the screens whose geometry changed.
+        """
+        try:
+            previous = self.outputs
+            outputs = self._outputs = get_randr_screens()
+        except Exception as e:
+            logger.error("Cannot fetch the outputs: {}".format(e))
+            return
+        changed = {
+            name for name in set(previous) | set(outputs)
+            if previous.get(name) != outputs.get(name)
+        }
+        if not changed or self._stop.is_set():
+            return
+        logger.info("Outputs changed: {}".format(", ".join(sorted(changed))))
+
+        for s in self._screens:
+            if s.name in changed:
+                s.reset_geometry()
+        active = set(self.screens)
+        for s in self._screens:
+            started = not s._stop.is_set()
+            if s not in active:
+                if started:
+                    s.stop()
+            elif not started:
+                self.runtime.spawn(s.start)
+            elif self.instance_per_screen and s.name in changed:
+                s.restart_bar()
+        if not self.instance_per_screen:
+            # lemonbar only looks for the monitors when starting
+            self.restart_bar()
+
     def start(self):
         logging.debug("Starts the panel")
         try:
@@ -77,6 +149,17 @@ class Panel(_BarSpawner):
             # Probably launched in a thread, so ignoring it
             pass
 
+        self.runtime.run(self._start)
+
+    def _start(self):
+        try:
+            # snapshot compared with the outputs at each RandR change
+            self._outputs = get_randr_screens()
+        except Exception as e:
+            logger.debug("Cannot fetch the outputs: {}".format(e))
+        if not self.keep_unplugged_screens:
+            # screens are detected with RandR, follow the outputs changes
+            self.hooks.subscribe(self._on_outputs_change, RandrHook)
         super().start()
 
         # update to force drawing the bar
@@ -84,11 +167,7 @@ class Panel(_BarSpawner):
             self.update(no_wait=True)
 
         for screen in self.screens:
-            threading.Thread(
-                target=screen.start
-            ).start()
-
-        self._stop.wait()
+            self.runtime.spawn(screen.start)
 
     def stop(self, *args, **kwargs):
         super().stop(*args, **kwargs)
@@ -102,19 +181,32 @@ class Panel(_BarSpawner):
                 screen.stop()
             except:
                 continue
+        self.runtime.stop()
 
     def _handler_signal(self, *args, **kwargs):
         self.stop()
         os.sys.exit(0)
 
     def __init__(self, instance_per_screen=True, geometry=None, refresh=0.1,
-                 screens=None, keep_unplugged_screens=False, *args, **kwargs):
+                 screens=None, keep_unplugged_screens=False, runtime="thread",
+                 *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        #: runtime used to run hooks, widgets and redraws. Either "thread"
+        #  (one thread for each), "asyncio" (one event loop) or a runtime
+        #  instance.
+        self.runtime = (
+            RUNTIMES[runtime]() if isinstance(runtime, str) else runtime
+        )
+
         self.hooks.listen = True
+        #: active outputs, see outputs
+        self._outputs = None
 
         #: screens attached to this panel
         self._screens = []
+        #: last content gathered of each screen, with its version
+        self._screens_contents = dict()
         if screens:
             self.add_screen(*screens)
 
@@ -0,0 +1,703 @@
+#!/usr/bin/env python3
+
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import heapq
+import logging
+import os
+import selectors
+import threading
+import time
+
+
+logger = logging.getLogger("barython")
+
+
+class Dispatcher:
+    """
+    Bounded pool of workers calling callbacks in background
+
+    Calls of a same callback are serialized: a callback never runs twice at
+    the same time, its pending calls are run one after the other.
+    """
+    def submit(self, callback, *args, **kwargs):
+        """
+        Queue a call to callback
+
+        :return: False if the queue is full and the call has been dropped
+        """
+        return self._submit(callback, args, kwargs)
+
+    def submit_if_idle(self, callback, *args, **kwargs):
+        """
+        Queue a call to callback, unless it is already queued or running
+
+        :return: False if the call has been skipped or dropped
+        """
+        return self._submit(callback, args, kwargs, if_idle=True)
+
+    def _submit(self, callback, args, kwargs, if_idle=False):
+        with self._lock:
+            if if_idle and callback in self._busy:
+                return False
+            if self.queue_depth >= self.maxsize:
+                self.dropped += 1
+                logger.debug("Dispatcher full, drop call to {}".format(
+                    callback
+                ))
+                return False
+            self._pending[callback].append((args, kwargs))
+            self.queue_depth += 1
+            if callback not in self._busy:
+                self._busy.add(callback)
+                self._schedule(callback)
+        return True
+
+    def _schedule(self, callback, from_worker=False):
+        """
+        Have the next pending call of callback done. Called with the lock.
+
+        :param from_worker: called by a worker, which will pick it
+        """
+        self._ready.append(callback)
+        if from_worker:
+            return
+        if not self._idle and self._workers < self.max_workers:
+            self._workers += 1
+            threading.Thread(target=self._work, daemon=True).start()
+        self._lock.notify()
+
+    def join(self, timeout=None):
+        """
+        Wait until all queued calls are done
+
+        :return: False if the timeout expired
+        """
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._busy, timeout)
+
+    def _next_call(self):
+        with self._lock:
+            while not self._ready:
+                self._idle += 1
+                notified = self._lock.wait(self.idle_timeout)
+                self._idle -= 1
+                if not notified and not self._ready:
+                    self._workers -= 1
+                    return None
+            callback = self._ready.popleft()
+            args, kwargs = self._pending[callback].popleft()
+            self.queue_depth -= 1
+            return callback, args, kwargs
+
+    def _done(self, callback):
+        with self._lock:
+            self.dispatched += 1
+            if self._pending[callback]:
+                self._schedule(callback, from_worker=True)
+            else:
+                del self._pending[callback]
+                self._busy.discard(callback)
+            self._lock.notify_all()
+
+    def _work(self):
+        while True:
+            call = self._next_call()
+            if call is None:
+                return
+            callback, args, kwargs = call
+            try:
+                callback(*args, **kwargs)
+            except Exception as e:
+                logger.error("Error in callback {}: {}".format(callback, e))
+            finally:
+                self._done(callback)
+
+    def __init__(self, max_workers=4, maxsize=256, idle_timeout=60):
+        #: maximum number of threads calling callbacks
+        self.max_workers = max_workers
+        #: maximum number of pending calls. Newer calls are dropped.
+        self.maxsize = maxsize
+        #: time before an idle worker exits
+        self.idle_timeout = idle_timeout
+
+        #: number of pending calls
+        self.queue_depth = 0
+        #: number of calls dropped because the queue was full
+        self.dropped = 0
+        #: number of calls done
+        self.dispatched = 0
+
+        self._lock = threading.Condition()
+        #: pending args and kwargs by callback
+        self._pending = collections.defaultdict(collections.deque)
+        #: callbacks waiting for a worker
+        self._ready = collections.deque()
+        #: callbacks queued or running
+        self._busy = set()
+        self._workers = 0
+        self._idle = 0
+
+
+class AsyncioDispatcher(Dispatcher):
+    """
+    Dispatcher calling the callbacks through the loop of an asyncio runtime
+
+    Coroutine functions are run as tasks of the loop, blocking callables in
+    a threads pool, by default the one of the runtime. Calls are serialized and bounded the
+    same way as with Dispatcher. While the loop is not running, calls are
+    done by threads workers.
+    """
+    def _schedule(self, callback, from_worker=False):
+        loop = self.runtime.loop
+        try:
+            loop.call_soon_threadsafe(self._call, callback)
+        except (AttributeError, RuntimeError):
+            # loop not started or already closed
+            super()._schedule(callback)
+
+    def _call(self, callback):
+        with self._lock:
+            args, kwargs = self._pending[callback].popleft()
+            self.queue_depth -= 1
+        try:
+            if asyncio.iscoroutinefunction(callback):
+                future = asyncio.ensure_future(callback(*args, **kwargs))
+            else:
+                future = self.runtime.loop.run_in_executor(
+                    self.executor,
+                    functools.partial(callback, *args, **kwargs)
+                )
+        except Exception as e:
+            logger.error("Error in callback {}: {}".format(callback, e))
+            return self._done(callback)
+        future.add_done_callback(functools.partial(self._call_done, callback))
+
+    def _call_done(self, callback, future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Error in callback {}: {}".format(
+                callback, future.exception()
+            ))
+        self._done(callback)
+
+    def __init__(self, runtime, executor=None, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: asyncio runtime whose loop calls the callbacks
+        self.runtime = runtime
+        #: threads pool running the blocking callables. Default to the one
+        #  of the runtime.
+        self._executor = executor
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            return self.runtime._executor
+        return self._executor
+
+
+class Timer:
+    """
+    Call scheduled by a runtime, that can be cancelled
+    """
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if not self.cancelled:
+            self.callback(*self.args)
+
+    def __lt__(self, other):
+        return self.deadline < other.deadline
+
+    def __init__(self, deadline, callback, args=()):
+        #: time.monotonic() value when the callback has to be called
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+
+class Scheduler:
+    """
+    Call functions at a given time, all from a single thread
+
+    Scheduled functions are meant to be quick: a long call delays all the
+    following ones.
+    """
+    _thread = None
+
+    def call_at(self, deadline, callback, *args):
+        """
+        Call callback when time.monotonic() reaches deadline
+
+        :return: the Timer, to be able to cancel it
+        """
+        timer = Timer(deadline, callback, args)
+        with self._lock:
+            heapq.heappush(self._timers, timer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            if self._timers[0] is timer:
+                self._lock.notify()
+        return timer
+
+    def call_later(self, delay, callback, *args):
+        return self.call_at(time.monotonic() + delay, callback, *args)
+
+    def _next_timer(self):
+        with self._lock:
+            while True:
+                if not self._timers:
+                    self._lock.wait()
+                    self.wakeups += 1
+                    continue
+                timeout = self._timers[0].deadline - time.monotonic()
+                if timeout <= 0:
+                    return heapq.heappop(self._timers)
+                self._lock.wait(timeout)
+                self.wakeups += 1
+
+    def _run(self):
+        while True:
+            timer = self._next_timer()
+            try:
+                timer.run()
+            except Exception as e:
+                logger.error("Error in scheduled call {}: {}".format(
+                    timer.callback, e
+                ))
+
+    def __init__(self):
+        #: number of times the thread has been woken up
+        self.wakeups = 0
+
+        self._lock = threading.Condition()
+        #: heap of timers, sorted by deadline
+        self._timers = []
+
+
+class Reactor:
+    """
+    Watch file descriptors from a single thread
+
+    Callbacks are called from this thread when their file descriptor is
+    readable, and are meant to be quick.
+    """
+    _thread = None
+
+    def add_reader(self, fd, callback):
+        """
+        Call callback() each time fd is readable
+        """
+        self._change(fd, callback)
+
+    def remove_reader(self, fd):
+        self._change(fd, None)
+
+    def _change(self, fd, callback):
+        # the selector is only modified from the reactor thread
+        with self._lock:
+            self._changes.append((fd, callback))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        os.write(self._wakeup_w, b"\0")
+
+    def _apply_changes(self):
+        with self._lock:
+            changes, self._changes = self._changes, []
+        for fd, callback in changes:
+            try:
+                self._selector.unregister(fd)
+            except (KeyError, ValueError):
+                pass
+            if callback is None:
+                continue
+            try:
+                self._selector.register(fd, selectors.EVENT_READ, callback)
+            except OSError as e:
+                # closed before its registration was applied
+                logger.debug("Cannot watch fd {}: {}".format(fd, e))
+
+    def _run(self):
+        while True:
+            self._apply_changes()
+            events = self._selector.select()
+            if any(key.fd == self._wakeup_r for key, _ in events):
+                os.read(self._wakeup_r, 4096)
+                self._apply_changes()
+            fd_map = self._selector.get_map()
+            for key, _ in events:
+                if key.fd == self._wakeup_r or fd_map.get(key.fd) is not key:
+                    # removed or replaced in the meantime
+                    continue
+                self.wakeups += 1
+                try:
+                    key.data()
+                except Exception as e:
+                    logger.error("Error in reader {}: {}".format(key.data, e))
+
+    def __init__(self):
+        #: number of callbacks calls
+        self.wakeups = 0
+
+        self._lock = threading.Lock()
+        #: pending (fd, callback) registrations. callback is None to remove.
+        self._changes = []
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        os.set_blocking(self._wakeup_w, False)
+        self._selector.register(self._wakeup_r, selectors.EVENT_READ)
+
+
+class _TickGroup:
+    """
+    Callbacks of a timer wheel sharing a same period
+    """
+    def __init__(self, period):
+        self.period = period
+        self.callbacks = []
+        #: next scheduled tick
+        self.timer = None
+
+
+class TimerWheel:
+    """
+    Call functions periodically, grouped by period
+
+    Ticks are scheduled through the runtime (so all from the same thread) and
+    aligned on multiples of their period. Functions sharing a same period are
+    submitted to the dispatcher in the same tick, so that their changes land
+    in one redraw, and each runs on its own so a slow one does not delay the
+    others. A function still queued or running from a previous tick is
+    skipped, so slow functions do not pile up in the dispatcher.
+    """
+    #: minimum period, to avoid looping without any pause
+    min_period = 0.01
+
+    def add(self, callback, period):
+        """
+        Call callback now, then every period seconds
+
+        :return: False if the callback was already registered
+        """
+        period = max(period, self.min_period)
+        with self._lock:
+            if callback in self._periods:
+                return False
+            group = self._groups.get(period)
+            if group is None:
+                group = self._groups[period] = _TickGroup(period)
+                self._schedule(group)
+            group.callbacks.append(callback)
+            self._periods[callback] = period
+        self.dispatcher.submit(callback)
+        return True
+
+    def remove(self, callback):
+        with self._lock:
+            period = self._periods.pop(callback, None)
+            if period is None:
+                return
+            group = self._groups[period]
+            group.callbacks.remove(callback)
+            if not group.callbacks:
+                group.timer.cancel()
+                del self._groups[period]
+
+    def _schedule(self, group):
+        now = time.monotonic()
+        next_tick = (now // group.period + 1) * group.period
+        group.timer = self.runtime.call_later(
+            next_tick - now, self._tick, group
+        )
+
+    def _tick(self, group):
+        with self._lock:
+            if self._groups.get(group.period) is not group:
+                return
+            self.ticks += 1
+            self._schedule(group)
+            callbacks = tuple(group.callbacks)
+        for callback in callbacks:
+            if not self.dispatcher.submit_if_idle(callback):
+                self.skipped += 1
+
+    def __init__(self, runtime, dispatcher=None):
+        self.runtime = runtime
+        #: dispatcher calling the callbacks of each tick. Default to the
+        #  updates dispatcher of the runtime.
+        self.dispatcher = (
+            dispatcher if dispatcher is not None
+            else runtime.update_dispatcher
+        )
+
+        #: number of ticks done
+        self.ticks = 0
+        #: number of calls skipped, as still pending from a previous tick
+        self.skipped = 0
+
+        self._lock = threading.Lock()
+        #: tick groups, by period
+        self._groups = dict()
+        #: period of each registered callback
+        self._periods = dict()
+
+
+class ThreadRuntime:
+    """
+    Default runtime: screens, widgets starts and blocking hooks run in their
+    own thread
+
+    Timers and file descriptors are watched by threads shared by all
+    runtimes. Hooks callbacks and periodic updates are called by the workers
+    of two distinct dispatchers.
+    """
+    def spawn(self, target, *args, **kwargs):
+        """
+        Run target in background
+
+        :param target: callable to run
+        """
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs)
+        thread.start()
+        return thread
+
+    def call_later(self, delay, callback, *args):
+        """
+        Call callback after delay seconds, from the shared scheduler thread
+
+        :return: a Timer, to be able to cancel it
+        """
+        return default_scheduler.call_later(delay, callback, *args)
+
+    def add_reader(self, fd, callback):
+        """
+        Call callback() each time fd is readable, from the shared reactor
+        thread
+        """
+        default_reactor.add_reader(fd, callback)
+
+    def remove_reader(self, fd):
+        default_reactor.remove_reader(fd)
+
+    def add_periodic(self, callback, period):
+        """
+        Call callback now, then every period seconds, from the timer wheel
+        """
+        return self.wheel.add(callback, period)
+
+    def remove_periodic(self, callback):
+        self.wheel.remove(callback)
+
+    def start_hook(self, hook, *args, **kwargs):
+        """
+        Start listening on a hook
+
+        :return: the thread running the hook
+        """
+        thread = threading.Thread(
+            target=hook.run, args=args, kwargs=kwargs, daemon=hook.daemon
+        )
+        thread.start()
+        return thread
+
+    def start_widget(self, widget):
+        self.spawn(widget.start)
+
+    def run(self, main):
+        """
+        Call main() then block until stop() is called
+
+        A stop() called before, even before run(), is not lost: run() returns
+        right after main().
+
+        :param main: function starting the panel
+        """
+        main()
+        self._stopped.wait()
+        self._stopped.clear()
+
+    def stop(self):
+        self._stopped.set()
+
+    def __init__(self, dispatcher=None, update_dispatcher=None):
+        #: set when the runtime is stopped
+        self._stopped = threading.Event()
+
+        #: calls the hooks callbacks
+        self.dispatcher = (
+            dispatcher if dispatcher is not None else default_dispatcher
+        )
+        #: calls the periodic updates, which may block on commands or
+        #  sockets, apart from the hooks callbacks so they cannot starve them
+        self.update_dispatcher = (
+            update_dispatcher if update_dispatcher is not None
+            else default_update_dispatcher
+        )
+        #: drives the periodic widgets
+        self.wheel = TimerWheel(self)
+
+
+class AsyncioRuntime(ThreadRuntime):
+    """
+    Run hooks, widgets and redraws as tasks of a single event loop
+
+    Blocking calls (widgets starts, hooks callbacks, periodic updates…) are
+    run in a small pool of reused threads instead of a new thread each time.
+    """
+    #: event loop, only set while the runtime is running
+    loop = None
+
+    def spawn(self, target, *args, **kwargs):
+        """
+        Run target in background
+
+        :param target: coroutine function, scheduled on the loop, or blocking
+                       callable, run in the threads pool
+        """
+        if asyncio.iscoroutinefunction(target):
+            return asyncio.run_coroutine_threadsafe(
+                target(*args, **kwargs), self.loop
+            )
+        return self._executor.submit(target, *args, **kwargs)
+
+    def call_blocking(self, target, *args, **kwargs):
+        """
+        Run a blocking callable in the threads pool and return an awaitable
+        """
+        return self.loop.run_in_executor(
+            self._executor, functools.partial(target, *args, **kwargs)
+        )
+
+    def call_later(self, delay, callback, *args):
+        """
+        Call callback after delay seconds, from the loop
+        """
+        loop = self.loop
+        if loop is None:
+            return super().call_later(delay, callback, *args)
+        timer = Timer(time.monotonic() + delay, callback, args)
+        try:
+            loop.call_soon_threadsafe(loop.call_later, delay, timer.run)
+        except RuntimeError:
+            # loop closed in the meantime
+            return super().call_later(delay, callback, *args)
+        return timer
+
+    def add_reader(self, fd, callback):
+        """
+        Call callback() each time fd is readable, from the loop
+        """
+        loop = self.loop
+        if loop is None:
+            return super().add_reader(fd, callback)
+        try:
+            loop.call_soon_threadsafe(loop.add_reader, fd, callback)
+        except RuntimeError:
+            # loop closed in the meantime
+            return super().add_reader(fd, callback)
+
+    def remove_reader(self, fd):
+        loop = self.loop
+        if loop is None:
+            return super().remove_reader(fd)
+        try:
+            loop.call_soon_threadsafe(loop.remove_reader, fd)
+        except RuntimeError:
+            # loop closed in the meantime, the reader went with it
+            pass
+
+    def start_hook(self, hook, *args, **kwargs):
+        """
+        Start listening on a hook
+
+        Hooks able to run on the loop (with an arun() coroutine) are
+        scheduled as a task, others are run in a thread.
+
+        :return: the thread running the hook, or None
+        """
+        if not hasattr(hook, "arun"):
+            return super().start_hook(hook, *args, **kwargs)
+        hook._task = self.spawn(hook.arun, *args, **kwargs)
+        return None
+
+    async def _main(self, main):
+        self._wakeup = asyncio.Event()
+        main()
+        if not self._stopped.is_set():
+            await self._wakeup.wait()
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def run(self, main):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._main(main))
+            tasks = asyncio.all_tasks(self.loop)
+            for t in tasks:
+                t.cancel()
+            if tasks:
+                self.loop.run_until_complete(
+                    asyncio.gather(*tasks, return_exceptions=True)
+                )
+        finally:
+            self.loop.close()
+            self.loop = None
+            self._wakeup = None
+            self._stopped.clear()
+            asyncio.set_event_loop(None)
+
+    def stop(self):
+        # checked by _main() if the loop is not running yet
+        self._stopped.set()
+        loop = self.loop
+        try:
+            loop.call_soon_threadsafe(self._wake)
+        except (AttributeError, RuntimeError):
+            # loop not started or already closed
+            pass
+
+    def __init__(self, max_workers=4, max_update_workers=8):
+        super().__init__(
+            dispatcher=AsyncioDispatcher(self),
+            update_dispatcher=AsyncioDispatcher(
+                self, concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max_update_workers,
+                    thread_name_prefix="barython-update"
+                )
+            )
+        )
+        #: set on the loop to wake _main() up when stopped
+        self._wakeup = None
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="barython"
+        )
+
+
+#: available runtimes for the panel
+RUNTIMES = {
+    "thread": ThreadRuntime,
+    "asyncio": AsyncioRuntime,
+}
+
+#: dispatcher shared by all thread runtimes to call the hooks callbacks
+default_dispatcher = Dispatcher()
+
+#: dispatcher shared by all thread runtimes to call the periodic updates
+default_update_dispatcher = Dispatcher(max_workers=8)
+
+#: scheduler shared by all thread runtimes
+default_scheduler = Scheduler()
+
+#: reactor shared by all thread runtimes
+default_reactor = Reactor()
+
+#: runtime used by objects not attached to a panel
+default_runtime = ThreadRuntime()
@@ -9,41 +9,138 @@ import xcffib.xproto
 import xcffib.randr
 
 from barython import _BarSpawner
+from barython.runtime import default_runtime
 
 
 logger = logging.getLogger("barython")
 
 
-def get_randr_screens():
-    conn = xcffib.connect()
-    conn.randr = conn(xcffib.randr.key)
+class RandrScreens:
+    """
+    Query the outputs geometries through a long-lived X connection
 
-    window = conn.get_setup().roots[0].root
-    resources = conn.randr.GetScreenResourcesCurrent(window).reply()
-    outputs = OrderedDict()
+    The requests of a query are all sent before waiting for any reply, and
+    the result is kept until the RandR configuration changes.
+    """
+    #: outputs of the last query, by name: (width, height, x, y)
+    outputs = None
 
-    for rroutput in resources.outputs:
-        try:
-            cookie = conn.randr.GetOutputInfo(
-                rroutput, resources.config_timestamp
-            )
-            info = cookie.reply()
-            name = "".join(map(chr, info.name))
-            cookie = conn.randr.GetCrtcInfo(
-                info.crtc, resources.config_timestamp
-            )
-            info = cookie.reply()
-            if info:
-                outputs[name] = (info.width, info.height, info.x, info.y)
-        except Exception as e:
-            logger.debug("Error when trying to fetch screens infos")
-            logger.debug(e)
-            continue
-    return outputs
+    def _connect(self):
+        conn = xcffib.connect()
+        conn.randr = conn(xcffib.randr.key)
+        self._root = conn.get_setup().roots[0].root
+        self._conn = conn
+        self.connections += 1
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        conn, self._conn = self._conn, None
+        self._timestamps = None
+        if conn is not None:
+            try:
+                conn.disconnect()
+            except Exception:
+                pass
+
+    def _query(self):
+        randr = self._conn.randr
+        resources = randr.GetScreenResourcesCurrent(self._root).reply()
+        # timestamp changes with the crtcs configuration, config_timestamp
+        # with the outputs
+        timestamps = (resources.timestamp, resources.config_timestamp)
+        if timestamps == self._timestamps:
+            return self.outputs
+        config_timestamp = resources.config_timestamp
+
+        # send every request of the batch, then wait for the replies
+        output_cookies = [
+            (rroutput, randr.GetOutputInfo(rroutput, config_timestamp))
+            for rroutput in resources.outputs
+        ]
+        crtc_cookies = [
+            (crtc, randr.GetCrtcInfo(crtc, config_timestamp))
+            for crtc in resources.crtcs
+        ]
+        self._conn.flush()
+
+        crtcs = dict()
+        for crtc, cookie in crtc_cookies:
+            try:
+                crtcs[crtc] = cookie.reply()
+            except Exception as e:
+                logger.debug("Error when fetching crtc {}: {}".format(crtc, e))
+        outputs = OrderedDict()
+        for rroutput, cookie in output_cookies:
+            try:
+                info = cookie.reply()
+            except Exception as e:
+                logger.debug("Error when trying to fetch screens infos")
+                logger.debug(e)
+                continue
+            crtc = crtcs.get(info.crtc)
+            if crtc:
+                name = "".join(map(chr, info.name))
+                outputs[name] = (crtc.width, crtc.height, crtc.x, crtc.y)
+
+        self.outputs = outputs
+        self._timestamps = timestamps
+        self.queries += 1
+        return outputs
+
+    def get(self, cached=False):
+        """
+        Return the outputs geometries, by name
+
+        :param cached: return the result of the last query, if any, without
+                       talking to the X server
+        :return: OrderedDict {name: (width, height, x, y)}
+        """
+        with self._lock:
+            if not (cached and self.outputs is not None):
+                try:
+                    if self._conn is None:
+                        self._connect()
+                    self._query()
+                except xcffib.ConnectionException:
+                    # X server restarted, or connection lost
+                    self._close()
+                    self._connect()
+                    self._query()
+            return OrderedDict(self.outputs)
+
+    def __init__(self):
+        self._conn = None
+        self._root = None
+        #: (timestamp, config_timestamp) of the last query
+        self._timestamps = None
+        self._lock = threading.Lock()
+
+        #: number of X connections opened
+        self.connections = 0
+        #: number of queries not answered by the cache
+        self.queries = 0
+
+
+#: outputs of the X server, shared by all screens
+default_randr = RandrScreens()
+
+
+def get_randr_screens(cached=False):
+    """
+    Return the outputs geometries, by name
+
+    :param cached: see RandrScreens.get()
+    """
+    return default_randr.get(cached=cached)
 
 
 class Screen(_BarSpawner):
     _bspwm_monitor_name = None
+    #: the geometry has been fetched from RandR
+    _randr_geometry = False
 
     @property
     def geometry(self):
@@ -54,8 +151,11 @@ class Screen(_BarSpawner):
             return self._geometry
         elif self.name:
             try:
-                x, y, px, py = get_randr_screens().get(self.name, None)
+                x, y, px, py = get_randr_screens(cached=True).get(
+                    self.name, None
+                )
                 self._geometry = (x, self.height, px, py)
+                self._randr_geometry = True
             except (ValueError, TypeError):
                 logger.error(
                     "Properties of screen {} could not be fetched. Please "
@@ -66,6 +166,24 @@ class Screen(_BarSpawner):
     @geometry.setter
     def geometry(self, value):
         self._geometry = value
+        self._randr_geometry = False
+
+    def reset_geometry(self):
+        """
+        Forget the geometry fetched from RandR, to fetch it again
+
+        A geometry set manually is kept.
+        """
+        if self._randr_geometry:
+            self.geometry = None
+
+    @property
+    def runtime(self):
+        """
+        Runtime of the panel
+        """
+        panel = getattr(self, "panel", None)
+        return panel.runtime if panel else default_runtime
 
     @property
     def bspwm_monitor_name(self):
@@ -96,22 +214,65 @@ class Screen(_BarSpawner):
             )
         for w in self._widgets[alignment]:
             w.screens.add(self)
+            self._widgets_alignments.setdefault(w, set()).add(alignment)
             self.hooks.merge(w.hooks)
+        self.invalidate_alignment(alignment)
 
-    def gather(self):
+    def invalidate_alignment(self, alignment):
         """
-        Gather all widgets content
+        Mark the cached segment of an alignment as outdated
         """
-        return "".join(
-            "%{{{}}}{}".format(
+        with self._segments_lock:
+            self._alignments_versions[alignment] += 1
+            self.version += 1
+
+    def invalidate(self, widget):
+        """
+        Mark the segments containing widget as outdated
+
+        Called when the widget content changes, so only its alignments are
+        gathered again.
+        """
+        for alignment in self._widgets_alignments.get(widget, ()):
+            self.invalidate_alignment(alignment)
+
+    def _gather_alignment(self, alignment):
+        """
+        Return the segment of an alignment, from the cache if still valid
+        """
+        version = self._alignments_versions[alignment]
+        cached_version, segment = self._segments.get(alignment, (None, ""))
+        if cached_version == version:
+            return segment
+        widgets = self._widgets[alignment]
+        if widgets:
+            segment = "%{{{}}}{}".format(
                 alignment, "".join([
                     str(widget.content) if widget.content is not None
                     else "" for widget in widgets
                 ])
-            ) for alignment, widgets in self._widgets.items() if widgets
+            )
+        else:
+            segment = ""
+        # if invalidated in the meantime, the version will not match and the
+        # segment will be gathered again at the next draw
+        self._segments[alignment] = (version, segment)
+        return segment
+
+    def gather(self):
+        """
+        Gather all widgets content
+
+        Only the alignments invalidated since the last gather are rebuilt.
+        """
+        return "".join(
+            self._gather_alignment(alignment) for alignment in self._widgets
         )
 
     def update(self, *args, **kwargs):
+        if self.panel is None:
+            # not attached to a panel, nothing to draw
+            return
         if self.panel.instance_per_screen:
             return super().update(*args, **kwargs)
         else:
@@ -130,15 +291,15 @@ class Screen(_BarSpawner):
 
         If the global panel set that there might be one instance per screen,
         starts a local lemonbar.
-        Starts all widgets in there own threads. They will callback a screen
-        update in case of any change.
+        Starts all widgets through the panel runtime. They will callback a
+        screen update in case of any change.
         """
         super().start()
 
         attached_widgets = list(itertools.chain(*self._widgets.values()))
 
         if not self.panel.instance_per_screen and len(attached_widgets) == 0:
-            # No widget attached, no need to keep this thread opened
+            # No widget attached, no need to keep it started
             # TODO: Add a test for it
             self.content = ""
             self.stop()
@@ -146,11 +307,7 @@ class Screen(_BarSpawner):
         self.update(no_wait=True)
 
         for widget in attached_widgets:
-            threading.Thread(
-                target=widget.start
-            ).start()
-
-        self._stop.wait()
+            self.runtime.start_widget(widget)
 
     def stop(self, *args, **kwargs):
         super().stop(*args, **kwargs)
@@ -195,6 +352,17 @@ class Screen(_BarSpawner):
 
         #: widgets to show on this screen
         self._widgets = OrderedDict([("l", []), ("c", []), ("r", [])])
+        #: alignments of each widget
+        self._widgets_alignments = dict()
+
+        #: cached segment of each alignment, with the version used to
+        #  build it
+        self._segments = dict()
+        #: incremented each time an alignment content changes
+        self._alignments_versions = {a: 0 for a in self._widgets}
+        #: incremented each time the screen content changes
+        self.version = 0
+        self._segments_lock = threading.Lock()
 
         #: only useful with bspwm. Used by Bspwm*DesktopWidget
         self.bspwm_monitor_name = bspwm_monitor_name
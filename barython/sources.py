@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+"""
+Data sources, collecting data once for all the widgets showing it
+
+A widget showing the battery on 3 screens, with different colors, is 3 widget
+instances. They all render the snapshot of a same source, so the battery is
+read once whatever the number of screens.
+"""
+
+import logging
+import threading
+
+from barython.runtime import default_runtime
+
+
+logger = logging.getLogger("barython")
+
+
+class DataSource:
+    """
+    Collect data and publish it to its subscribers
+
+    Subclasses implement collect(). The source is updated every refresh
+    seconds, the smallest refresh of its subscribers, as long as it has some.
+    """
+    #: last data published. None until the first update.
+    snapshot = None
+
+    def collect(self):
+        """
+        Collect the data and return it
+
+        Override this method. The returned snapshot is shared by all
+        subscribers, which must not modify it.
+        """
+        raise NotImplementedError()
+
+    def publish(self, snapshot):
+        """
+        Keep snapshot and send it to all subscribers
+        """
+        self.snapshot = snapshot
+        with self._lock:
+            callbacks = tuple(self._subscribers)
+        for callback in callbacks:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                logger.error("Error when rendering {}: {}".format(
+                    callback, e
+                ))
+
+    def update(self):
+        """
+        Collect the data and publish it
+
+        :return: the new snapshot
+        """
+        snapshot = self.collect()
+        self.publish(snapshot)
+        return snapshot
+
+    def _periodic_update(self):
+        try:
+            self.update()
+        except Exception as e:
+            logger.error(e)
+
+    def subscribe(self, callback, refresh=None, runtime=None):
+        """
+        Call callback(snapshot) at each update
+
+        The first subscriber starts the source.
+
+        :param refresh: wished refresh rate. None to not update the source
+                        periodically.
+        :param runtime: runtime driving the periodic updates
+        """
+        with self._lock:
+            first = not self._subscribers
+            self._subscribers[callback] = refresh
+            if runtime is not None:
+                self._runtime = runtime
+            rescheduled = self._schedule()
+        if rescheduled:
+            # updated now by _start_periodic()
+            return
+        if first:
+            self._periodic_update()
+        elif self.snapshot is not None:
+            callback(self.snapshot)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling callback. The last subscriber stops the source.
+        """
+        with self._lock:
+            self._subscribers.pop(callback, None)
+            self._schedule()
+
+    def is_subscribed(self, callback):
+        return callback in self._subscribers
+
+    def _schedule(self):
+        """
+        Update the source every smallest refresh of its subscribers
+
+        :return: True if the periodic update has been (re)scheduled
+        """
+        period = min(
+            (r for r in self._subscribers.values() if r is not None),
+            default=None
+        )
+        if period == self._period:
+            return False
+        if self._period is not None:
+            self._stop_periodic()
+        self._period = period
+        self._periodic_runtime = self._runtime
+        if period is None:
+            return False
+        self._start_periodic(period)
+        return True
+
+    def _start_periodic(self, period):
+        """
+        Update the source now, then every period seconds
+
+        Uses the timer wheel of the runtime. Override it, with
+        _stop_periodic(), to schedule the updates differently.
+        """
+        self._periodic_runtime.add_periodic(self._periodic_update, period)
+
+    def _stop_periodic(self):
+        self._periodic_runtime.remove_periodic(self._periodic_update)
+
+    def __init__(self):
+        #: wished refresh of each subscriber, by callback
+        self._subscribers = dict()
+        self._lock = threading.RLock()
+
+        #: runtime to use for the periodic updates
+        self._runtime = default_runtime
+        #: runtime currently running the periodic updates
+        self._periodic_runtime = None
+        #: current period of the updates, None if not periodic
+        self._period = None
+
+
+#: sources shared by widgets, by class and parameters
+_sources = dict()
+_sources_lock = threading.Lock()
+
+
+def get_source(source_class, *args, **kwargs):
+    """
+    Return the source shared by all widgets using the same parameters
+
+    :param source_class: DataSource subclass to use
+    :param *args, **kwargs: parameters to build the source. Have to be
+                            hashable.
+    """
+    key = (source_class, args, tuple(sorted(kwargs.items())))
+    with _sources_lock:
+        source = _sources.get(key)
+        if source is None:
+            source = _sources[key] = source_class(*args, **kwargs)
+    return source
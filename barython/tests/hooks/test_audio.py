@@ -0,0 +1,57 @@
+import time
+
+from barython.hooks import HooksPool
+from barython.hooks.audio import PulseAudioEvent, PulseAudioHook
+
+
+def test_pulseaudio_hook_parse_event():
+    hook = PulseAudioHook()
+    assert hook.parse_event("Event 'change' on sink #12")["event"] == (
+        PulseAudioEvent("change", "sink", 12)
+    )
+    assert hook.parse_event("Event 'new' on sink-input #3")["event"] == (
+        PulseAudioEvent("new", "sink-input", 3)
+    )
+    assert hook.parse_event("Event 'change' on server")["event"] == (
+        PulseAudioEvent("change", "server", None)
+    )
+    assert hook.parse_event("")["event"] is None
+
+
+def test_pulseaudio_hook_filters(mocker):
+    sink_callback, all_callback = mocker.stub(), mocker.stub()
+    hp = HooksPool()
+    hp.subscribe(
+        sink_callback, PulseAudioHook, events=("change", ),
+        facilities=("sink", )
+    )
+    hp.subscribe(all_callback, PulseAudioHook)
+    hook = hp.hooks[PulseAudioHook][0]
+    hook.debounce = 0
+
+    for line in ("Event 'change' on sink #0", "Event 'new' on client #4"):
+        hook.notify(run=True, **hook.parse_event(line))
+    hook.dispatcher.join()
+
+    sink_callback.assert_called_once_with(
+        run=True, event=PulseAudioEvent("change", "sink", 0)
+    )
+    assert all_callback.call_count == 2
+
+
+def test_pulseaudio_hook_debounce(mocker):
+    callback = mocker.stub()
+    hook = PulseAudioHook(
+        callbacks={callback, }, facilities=("sink", ), debounce=0.05
+    )
+    lines = ["Event 'change' on sink #0"] * 20 + [
+        "Event 'change' on sink #1", "Event 'change' on sink-input #8"
+    ]
+    for line in lines:
+        hook.notify(run=True, **hook.parse_event(line))
+    time.sleep(0.2)
+    hook.dispatcher.join()
+
+    assert callback.call_count == 2
+    assert hook.debounced == 19
+    assert hook.filtered == 1
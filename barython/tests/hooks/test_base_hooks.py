@@ -6,7 +6,9 @@ import threading
 from barython.panel import Panel
 from barython.screen import Screen
 from barython.widgets.base import Widget
-from barython.hooks import HooksPool, _Hook
+from barython.hooks import HooksPool, SubprocessHook, _Hook
+from barython.runtime import AsyncioRuntime
+from barython.tests.tools import wait_for
 
 
 class TestHook(_Hook):
@@ -21,6 +23,7 @@ def test_base_hook_notify(mocker):
     stub = mocker.stub()
     hook = _Hook(callbacks={stub, })
     hook.notify()
+    hook.dispatcher.join()
     stub.assert_called_once_with()
 
 
@@ -83,3 +86,107 @@ def test_base_hooks_with_panel(mocker):
     p.add_screen(s)
 
     assert p.hooks.hooks[_Hook][0].callbacks == {callback0, callback1}
+
+
+def test_subprocess_hook_reactor(mocker):
+    """
+    Test that SubprocessHook notifies each line, and restarts the command
+    """
+    callback = mocker.stub()
+    hook = SubprocessHook(
+        cmd=["printf", "first\\r\\nsecond\\n"], callbacks={callback, }
+    )
+    hook.start()
+    try:
+        assert wait_for(lambda: callback.call_count >= 6)
+    finally:
+        hook.stop()
+    hook.dispatcher.join()
+
+    assert callback.call_args_list[:3] == [
+        mocker.call(run=True, event="first"),
+        mocker.call(run=True, event="second"),
+        mocker.call(run=True, event=""),
+    ]
+
+
+def test_subprocess_hook_restart_pending(mocker):
+    """
+    A restart pending when the hook is stopped and started again should not
+    launch the command twice
+    """
+    hook = SubprocessHook(cmd=["sleep", "10"], failure_refresh=0.05)
+    init_subproc = mocker.spy(hook, "_init_subproc")
+    hook.start()
+    hook._launch_later(0.05)
+    hook.stop()
+    hook.start()
+    hook._launch_later(0)
+    try:
+        time.sleep(0.15)
+        assert init_subproc.call_count == 2
+    finally:
+        hook.stop()
+
+
+def test_subprocess_hook_stale_reader(mocker):
+    """
+    The output of a process replaced in the meantime should not be watched
+    anymore
+    """
+    hook = SubprocessHook(cmd=["true"])
+    remove_reader = mocker.patch.object(hook.runtime, "remove_reader")
+    reader = mocker.Mock(fd=42)
+    hook._on_readable(mocker.sentinel.old_subproc, reader)
+    remove_reader.assert_called_once_with(42)
+
+
+def test_subprocess_hook_exit_without_blocking(mocker):
+    """
+    A command closing its output but still running is reaped later
+    """
+    callback = mocker.stub()
+    hook = SubprocessHook(
+        cmd=["sh", "-c", "exec >&-; sleep 0.3"], callbacks={callback, }
+    )
+    hook.exit_timeout = 10
+    hook.start()
+    try:
+        time.sleep(0.1)
+        # the output is closed, the process is waited for in background
+        assert hook._subproc is None
+        assert not callback.called
+        assert wait_for(lambda: callback.called)
+    finally:
+        hook.stop()
+
+
+def test_subprocess_hooks_share_reactor(mocker):
+    """
+    Test that hooks do not start a thread each
+    """
+    hooks = [SubprocessHook(cmd=["sleep", "5"]) for _ in range(20)]
+    nb_threads = threading.active_count()
+    for h in hooks:
+        h.start()
+    try:
+        assert threading.active_count() <= nb_threads + 1
+    finally:
+        for h in hooks:
+            h.stop()
+
+
+def test_subprocess_hook_asyncio_runtime(mocker):
+    """
+    Test SubprocessHook reading its output from the loop of the asyncio
+    runtime
+    """
+    callback = mocker.stub()
+    hook = SubprocessHook(cmd="echo test", callbacks={callback, })
+    hook.runtime = runtime = AsyncioRuntime()
+    threading.Timer(0.2, runtime.stop).start()
+
+    runtime.run(hook.start)
+    hook.stop()
+    hook.dispatcher.join()
+    callback.assert_any_call(run=True, event="test")
@@ -1,8 +1,28 @@
-
 from collections import OrderedDict
 import pytest
+import socket
+import threading
+import time
+
+from barython.hooks.bspwm import (
+    BspwmHook, BspwmMonitor, BspwmSocketHook, bspwm_socket_path
+)
+from barython.runtime import AsyncioRuntime
+from barython.tests.tools import FakeBspwmServer, wait_for
+
+
+REPORTS = [
+    "WMHDMI-0:Oa:fb:LT", "WMHDMI-0:Oa:fb:LT", "node_focus 0x1 0x2 0x3",
+    "WMHDMI-0:oa:Fb:LT",
+]
 
-from barython.hooks.bspwm import BspwmHook
+
+@pytest.fixture
+def bspwm_server(tmpdir):
+    server = FakeBspwmServer(str(tmpdir.join("bspwm-socket")), REPORTS)
+    server.start()
+    yield server
+    server.stop()
 
 
 def test_bspwm_hook_parse_event():
@@ -10,13 +30,128 @@ def test_bspwm_hook_parse_event():
     status = ("WmHDMI-0:Ou:LT:MDVI-D-0:fo:f7:fDesktop2:os:Of:fp:oq:fi:LT:"
               "mDVI-I-0:Od:LT")
     expected = OrderedDict([
-        ('HDMI-0', {'desktops': ['Ou'], 'focused': False, 'layout': 'T'}),
-        ('DVI-D-0', {
-            'desktops': ['fo', 'f7', 'fDesktop2', 'os', 'Of', 'fp', 'oq',
-                         'fi'],
-            'focused': True, 'layout': 'T'
-        }),
-        ('DVI-I-0', {'desktops': ['Od'], 'focused': False, 'layout': 'T'})
+        ('HDMI-0', BspwmMonitor(False, ('Ou',), 'T')),
+        ('DVI-D-0', BspwmMonitor(
+            True, ('fo', 'f7', 'fDesktop2', 'os', 'Of', 'fp', 'oq', 'fi'), 'T'
+        )),
+        ('DVI-I-0', BspwmMonitor(False, ('Od',), 'T'))
     ])
 
-    assert expected == bh.parse_event(status)["monitors"]
+    monitors = bh.parse_event(status)["monitors"]
+    assert expected == monitors
+    assert list(expected.keys()) == list(monitors.keys())
+    with pytest.raises(TypeError):
+        monitors["HDMI-0"] = None
+
+
+def test_bspwm_hook_parse_event_empty():
+    bh = BspwmHook()
+    assert not bh.parse_event("")["monitors"]
+
+
+def test_bspwm_hook_drop_duplicates(mocker):
+    bh = BspwmHook(cmd=[
+        "printf", "WMHDMI-0:Oa:LT\\nWMHDMI-0:Oa:LT\\nWMHDMI-0:oa:Fb:LT\\n"
+    ])
+    dispatch = mocker.patch.object(bh, "_dispatch")
+    bh.start()
+    try:
+        # wait for the end of the command
+        assert wait_for(lambda: dispatch.call_count >= 3)
+    finally:
+        bh.stop()
+
+    assert bh.duplicates_dropped >= 1
+    reports = [
+        c[1]["monitors"] for c in dispatch.call_args_list[:3]
+    ]
+    assert [r["HDMI-0"].desktops for r in reports[:2]] == [
+        ("Oa", ), ("oa", "Fb")
+    ]
+    assert not reports[2]
+
+
+def test_bspwm_socket_path(monkeypatch):
+    monkeypatch.delenv("BSPWM_SOCKET", raising=False)
+    monkeypatch.setenv("DISPLAY", ":1")
+    assert bspwm_socket_path() == "/tmp/bspwm_1_0-socket"
+    monkeypatch.setenv("DISPLAY", "host:0.2")
+    assert bspwm_socket_path() == "/tmp/bspwmhost_0_2-socket"
+    monkeypatch.setenv("BSPWM_SOCKET", "/run/bspwm")
+    assert bspwm_socket_path() == "/run/bspwm"
+
+
+def test_bspwm_socket_hook_run(bspwm_server, mocker):
+    callback = mocker.stub()
+    bh = BspwmSocketHook(
+        topics=("report", "node_focus"), socket_path=bspwm_server.path,
+        callbacks={callback, }
+    )
+    bh.start()
+    try:
+        assert wait_for(lambda: callback.call_count == 3)
+    finally:
+        bh.stop()
+
+    assert bspwm_server.messages == [b"subscribe\0report\0node_focus\0"]
+    assert bh.duplicates_dropped == 1
+    events = [c[1] for c in callback.call_args_list]
+    assert events[0]["monitors"]["HDMI-0"].desktops == ("Oa", "fb")
+    assert events[1]["event"] == "node_focus 0x1 0x2 0x3"
+    assert events[1]["monitors"] == events[0]["monitors"]
+    assert events[2]["monitors"]["HDMI-0"].desktops == ("oa", "Fb")
+
+
+def test_bspwm_socket_hook_reconnect(bspwm_server, mocker):
+    bspwm_server.close_after_replay = True
+    callback = mocker.stub()
+    bh = BspwmSocketHook(
+        socket_path=bspwm_server.path, failure_refresh=0.01,
+        callbacks={callback, }
+    )
+    bh.start()
+    try:
+        assert wait_for(lambda: len(bspwm_server.messages) >= 3)
+    finally:
+        bh.stop()
+    bh.dispatcher.join()
+
+    runs = [c[1]["run"] for c in callback.call_args_list]
+    assert False in runs
+    # the connection is new, so its first report is not a duplicate
+    assert runs.count(True) >= 6
+
+
+def test_bspwm_socket_hook_asyncio_runtime(bspwm_server, mocker):
+    callback = mocker.stub()
+    bh = BspwmSocketHook(
+        socket_path=bspwm_server.path, callbacks={callback, }
+    )
+    bh.runtime = runtime = AsyncioRuntime()
+
+    def stop_when_notified():
+        wait_for(lambda: callback.call_count >= 3)
+        runtime.stop()
+
+    threading.Thread(target=stop_when_notified).start()
+    runtime.run(bh.start)
+    bh.stop()
+    bh.dispatcher.join()
+    assert callback.call_count == 3
+
+
+def test_bspwm_socket_hook_partial_line():
+    """
+    A line not ended before the socket is closed should still be read
+    """
+    bh = BspwmSocketHook(socket_path="/nonexistent")
+    server, client = socket.socketpair()
+    client.setblocking(False)
+    try:
+        server.sendall(b"WMHDMI-0:Oa:LT\nWMHDMI-0:oa:LT")
+        assert bh._read_lines(client) == ([b"WMHDMI-0:Oa:LT"], False)
+        server.close()
+        assert bh._read_lines(client) == ([b"WMHDMI-0:oa:LT"], True)
+    finally:
+        server.close()
+        client.close()
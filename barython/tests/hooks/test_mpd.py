@@ -0,0 +1,53 @@
+import pytest
+
+from barython.hooks.mpd import MPDHook
+from barython.tests.tools import FakeMPDServer, wait_for
+
+
+@pytest.fixture
+def mpd_server():
+    server = FakeMPDServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_mpd_hook_idle(mpd_server, mocker):
+    callback = mocker.stub()
+    hook = MPDHook(
+        host=mpd_server.host, port=mpd_server.port, callbacks={callback, }
+    )
+    hook.start()
+    try:
+        assert wait_for(lambda: "idle" in mpd_server.commands)
+        mpd_server.objects["status"] = {"state": "pause"}
+        mpd_server.trigger("player", "mixer")
+        assert wait_for(lambda: callback.call_count == 2)
+    finally:
+        hook.stop()
+
+    first, second = (c[1] for c in callback.call_args_list)
+    assert first["subsystems"] == ()
+    assert first["status"] == {"state": "play"}
+    assert second["subsystems"] == ("mixer", "player")
+    assert second["status"] == {"state": "pause"}
+    assert second["current"] == {"artist": "artist", "title": "title"}
+    # one connection, kept in idle between the events
+    assert mpd_server.connections == 1
+    assert mpd_server.commands[:10] == [
+        "command_list_ok_begin", "status", "currentsong", "command_list_end",
+        "idle"
+    ] * 2
+
+
+def test_mpd_hook_unreachable(mocker):
+    callback = mocker.stub()
+    hook = MPDHook(
+        host="127.0.0.1", port=1, failure_refresh=10, callbacks={callback, }
+    )
+    hook.start()
+    try:
+        assert wait_for(lambda: callback.call_count == 1)
+    finally:
+        hook.stop()
+    callback.assert_called_once_with(run=False)
@@ -0,0 +1,80 @@
+
+import pytest
+
+from barython.hooks.randr import RandrHook
+from barython.runtime import default_dispatcher
+from barython.tests.tools import FakeRandrConnection, wait_for
+
+
+@pytest.fixture
+def randr_conn():
+    conn = FakeRandrConnection({"DVI-I-0": (1920, 1080, 0, 0)})
+    yield conn
+    conn.close()
+
+
+def test_randr_hook_events(randr_conn, mocker):
+    callback = mocker.stub()
+    hook = RandrHook(connect=lambda: randr_conn, callbacks={callback, })
+    hook.start()
+    try:
+        assert randr_conn.selected_mask == RandrHook.notify_mask
+        randr_conn.send_event()
+        randr_conn.send_event("OutputChangeNotify")
+        assert wait_for(lambda: sum(
+            c[1]["events"] for c in callback.call_args_list
+        ) == 2)
+        assert default_dispatcher.join(timeout=1)
+    finally:
+        hook.stop()
+    assert randr_conn.disconnected
+
+
+def test_randr_hook_no_x_server(randr_conn, mocker):
+    """
+    Test that the hook retries until the X server is ready
+    """
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionRefusedError()
+        return randr_conn
+
+    callback = mocker.stub()
+    hook = RandrHook(
+        connect=connect, callbacks={callback, }, failure_refresh=0.01
+    )
+    hook.start()
+    try:
+        assert wait_for(lambda: callback.called)
+        assert len(attempts) == 3
+        callback.assert_called_once_with(run=True, events=0)
+    finally:
+        hook.stop()
+
+
+def test_randr_hook_connection_lost(mocker):
+    conns = [
+        FakeRandrConnection({"DVI-I-0": (1920, 1080, 0, 0)}) for _ in range(2)
+    ]
+    callback = mocker.stub()
+    hook = RandrHook(
+        connect=iter(conns).__next__, callbacks={callback, },
+        failure_refresh=0.01
+    )
+    hook.start()
+    try:
+        conns[0].lose()
+        # reconnected, and notified as changes may have been missed
+        assert wait_for(lambda: callback.called)
+        callback.assert_called_once_with(run=True, events=0)
+        assert conns[0].disconnected
+        conns[1].send_event()
+        assert wait_for(lambda: callback.call_count == 2)
+        callback.assert_called_with(run=True, events=1)
+    finally:
+        hook.stop()
+        for c in conns:
+            c.close()
@@ -0,0 +1,69 @@
+import socket
+
+import pytest
+
+from barython.hooks.uevent import UeventHook, parse_uevent
+from barython.runtime import default_dispatcher
+from barython.tests.tools import wait_for
+
+
+def uevent(action, subsystem, **properties):
+    """
+    Build a kernel uevent message
+    """
+    properties = {"ACTION": action, "SUBSYSTEM": subsystem, **properties}
+    return "\0".join(
+        ["{}@/devices/test".format(action)] +
+        ["{}={}".format(k, v) for k, v in properties.items()]
+    ).encode()
+
+
+@pytest.fixture
+def uevent_socketpair():
+    listener, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    yield listener, sender
+    sender.close()
+
+
+def test_parse_uevent():
+    assert parse_uevent(
+        uevent("change", "power_supply", POWER_SUPPLY_NAME="AC")
+    ) == {
+        "ACTION": "change", "SUBSYSTEM": "power_supply",
+        "POWER_SUPPLY_NAME": "AC",
+    }
+    # udev messages start with a binary header
+    assert parse_uevent(b"libudev\0\xfe\xed\xca\xfe") is None
+
+
+def test_uevent_hook_filter_subsystem(uevent_socketpair, mocker):
+    listener, sender = uevent_socketpair
+    callback = mocker.stub()
+    hook = UeventHook(
+        subsystem="power_supply", listener=lambda: listener,
+        callbacks={callback, }
+    )
+    hook.start()
+    try:
+        sender.send(uevent("add", "usb"))
+        sender.send(uevent("change", "power_supply", POWER_SUPPLY_NAME="AC"))
+        assert wait_for(lambda: callback.call_count == 1)
+        assert default_dispatcher.join(timeout=1)
+    finally:
+        hook.stop()
+
+    assert callback.call_count == 1
+    kwargs = callback.call_args[1]
+    assert kwargs["event"] == "change"
+    assert kwargs["uevent"]["POWER_SUPPLY_NAME"] == "AC"
+    assert hook.filtered == 1
+    assert listener.fileno() == -1
+
+
+def test_uevent_hook_listener_error(mocker):
+    def listener():
+        raise PermissionError("netlink not allowed")
+
+    hook = UeventHook(listener=listener)
+    hook.start()
+    hook.stop()
@@ -0,0 +1,113 @@
+import threading
+import time
+
+import pytest
+
+from barython.launcher import CommandCache, Launcher
+
+
+def test_launcher_run_first_line():
+    launcher = Launcher()
+    start = time.monotonic()
+    # does not wait for the end of the command
+    assert launcher.run("echo first; sleep 5", shell=True) == b"first"
+    assert launcher.run("echo 'unbalanced", shell=True) == b""
+    assert time.monotonic() - start < 2
+
+
+def test_launcher_run_shell_concurrent():
+    launcher = Launcher()
+    slow = threading.Thread(
+        target=launcher.run, args=("sleep 0.5; echo slow",),
+        kwargs={"shell": True}
+    )
+    slow.start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    # unrelated commands do not wait for each other
+    assert launcher.run("echo fast", shell=True) == b"fast"
+    assert time.monotonic() - start < 0.4
+    slow.join()
+
+
+def test_launcher_shared_env(mocker):
+    launcher = Launcher(env={"PATH": "/usr/bin:/bin", "FOO": "bar"})
+    assert launcher.run("echo $FOO $LANG", shell=True) == b"bar en_US"
+    assert launcher.run(["sh", "-c", "echo $FOO"]) == b"bar"
+
+
+def test_launcher_popen_fast_path(mocker):
+    launcher = Launcher()
+    popen = mocker.patch("subprocess.Popen")
+    launcher.popen(["sh", "-c", "true"])
+
+    kwargs = popen.call_args[1]
+    assert kwargs["executable"].endswith("/sh")
+    # long-running commands do not inherit the fds of barython
+    assert "close_fds" not in kwargs
+    assert kwargs["env"] is launcher.env
+
+
+def test_launcher_run_fast_path(mocker):
+    launcher = Launcher()
+    popen = mocker.patch.object(launcher, "popen")
+    popen.return_value.stdout.readline.return_value = b"out\n"
+    assert launcher.run(["true"], env=dict(launcher.env)) == b"out"
+
+    kwargs = popen.call_args[1]
+    assert kwargs["close_fds"] is False
+    # a copy of the shared environment is spawned and cached as it
+    assert kwargs["env"] is None
+
+
+def test_command_cache_single_flight():
+    cache = CommandCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def func():
+        calls.append(1)
+        started.set()
+        release.wait(1)
+        return b"result"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get("k", func)))
+        for _ in range(3)
+    ]
+    threads[0].start()
+    started.wait(1)
+    for t in threads[1:]:
+        t.start()
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert results == [b"result"] * 3
+    assert (cache.misses, cache.joined, cache.spawns_saved) == (1, 2, 2)
+
+
+def test_command_cache_ttl():
+    cache = CommandCache()
+    assert cache.get("k", lambda: 1, ttl=0.1) == 1
+    assert cache.get("k", lambda: 2, ttl=0.1) == 1
+    time.sleep(0.1)
+    assert cache.get("k", lambda: 3, ttl=0.1) == 3
+    assert (cache.hits, cache.misses) == (1, 2)
+
+    with pytest.raises(ValueError):
+        cache.get("error", lambda: int("a"))
+    # errors are not cached
+    assert cache.get("error", lambda: 4) == 4
+
+
+def test_launcher_run_cache():
+    launcher = Launcher()
+    first = launcher.run(["sh", "-c", "echo $$"], ttl=10)
+    assert launcher.run(["sh", "-c", "echo $$"], ttl=10) == first
+    assert launcher.run(["sh", "-c", "echo $$"], ttl=0) != first
+    assert launcher.cache.hits == 1
@@ -1,13 +1,17 @@
 
+from collections import OrderedDict
 import pytest
 import threading
 import time
 
 import barython.screen
+import barython.runtime
+from barython.hooks.randr import RandrHook
 from barython.panel import Panel
+from barython.runtime import AsyncioRuntime
 from barython.screen import Screen
 from barython.widgets import ClockWidget
-from barython.widgets.base import TextWidget
+from barython.widgets.base import SubprocessWidget, TextWidget
 from barython.tests.tools import disable_spawn_bar
 
 
@@ -127,6 +131,26 @@ def test_panel_gather_multiple_screens():
     assert p.gather() == "%{l}test%{S+}%{l}test"
 
 
+def test_panel_gather_reuse_screens_content(mocker):
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    w, w1 = TextWidget(text="test"), TextWidget(text="test1")
+    s, s1 = Screen(), Screen()
+    p.add_screen(s, s1)
+    s.add_widget("l", w)
+    s1.add_widget("l", w1)
+    w.update()
+    w1.update()
+    assert p.gather() == "%{l}test%{S+}%{l}test1"
+
+    mocker.spy(s, "gather")
+    mocker.spy(s1, "gather")
+    w1.text = "updated"
+    w1.update()
+    assert p.gather() == "%{l}test%{S+}%{l}updated"
+    assert s.gather.call_count == 0
+    assert s1.gather.call_count == 1
+
+
 def test_panel_clean_screens(monkeypatch):
     def mock_get_randr_screens(*args, **kwargs):
         return {"DVI-I-0": (1920, 1080, 50, 60)}
@@ -211,3 +235,155 @@ def test_panel_no_useless_init_bar(fixture_useful_screens, mocker):
         assert s1.init_bar.call_count == 0
     finally:
         p.stop()
+
+
+def test_panel_start_asyncio_runtime(fixture_useful_screens):
+    p, s0, s1 = fixture_useful_screens
+    p.runtime = AsyncioRuntime()
+    p.instance_per_screen = False
+    clock = ClockWidget()
+    s0.add_widget("l", clock)
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.3)
+        assert p.runtime.loop is not None
+        assert p.init_bar.call_count == 1
+        assert s0.start.call_count == 1
+        assert s1.start.call_count == 0
+        assert clock.content
+    finally:
+        p.stop()
+    time.sleep(0.1)
+    assert p.runtime.loop is None
+
+
+def test_panel_asyncio_runtime_stream_widgets(fixture_useful_screens):
+    """
+    Stream widgets should not hold the threads pool of the asyncio runtime
+    """
+    p, s0, s1 = fixture_useful_screens
+    p.runtime = AsyncioRuntime(max_workers=2)
+    p.instance_per_screen = False
+    streams = [
+        SubprocessWidget("echo {}; sleep 10".format(i), stream=True)
+        for i in range(4)
+    ]
+    text = TextWidget(text="after")
+    s0.add_widget("r", *streams, text)
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.3)
+        assert text.content == "after"
+        assert all(w.content for w in streams)
+    finally:
+        p.stop()
+
+
+def test_panel_idle_wakeups(fixture_useful_screens, mocker):
+    """
+    Count the wakeups of an idle panel over a fixed window
+    """
+    p, s0, s1 = fixture_useful_screens
+    p.instance_per_screen = False
+    s0.add_widget("l", ClockWidget(refresh=60))
+    s0.add_widget("r", SubprocessWidget("echo test", refresh=60))
+    mocker.spy(barython.tools.time, "sleep")
+    scheduler = barython.runtime.default_scheduler
+    try:
+        threading.Thread(target=p.start).start()
+        # let the panel draw its first frames
+        scheduler_event = threading.Event()
+        scheduler_event.wait(0.3)
+        wakeups = scheduler.wakeups
+        scheduler_event.wait(1)
+        # tolerate a tick of the 60s refresh landing in the window, and the
+        # redraw it triggers
+        assert scheduler.wakeups - wakeups <= 2
+        assert barython.tools.time.sleep.call_count == 0
+    finally:
+        p.stop()
+
+
+@pytest.fixture
+def hotplug_outputs(monkeypatch):
+    """
+    Outputs returned by RandR, to modify to simulate a hotplug
+    """
+    outputs = OrderedDict([
+        ("DVI-I-0", (1920, 1080, 0, 0)), ("DVI-I-1", (1280, 1024, 1920, 0)),
+    ])
+    calls = []
+
+    def mock_get_randr_screens(*args, **kwargs):
+        calls.append(kwargs)
+        return OrderedDict(outputs)
+
+    monkeypatch.setattr(barython.panel, "get_randr_screens",
+                        mock_get_randr_screens)
+    monkeypatch.setattr(barython.screen, "get_randr_screens",
+                        mock_get_randr_screens)
+    return outputs, calls
+
+
+def test_panel_outputs_change(hotplug_outputs, mocker):
+    outputs, _ = hotplug_outputs
+    disable_spawn_bar(Panel)
+    disable_spawn_bar(Screen)
+    p = Panel(instance_per_screen=True)
+    screens = [Screen(name) for name in ("DVI-I-0", "DVI-I-1", "HDMI-0")]
+    for s in screens:
+        s.add_widget("l", TextWidget(text=s.name))
+        mocker.spy(s, "restart_bar")
+    p.add_screen(*screens)
+    s0, s1, s2 = screens
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert [s._stop.is_set() for s in screens] == [False, False, True]
+
+        # DVI-I-1 moved, HDMI-0 plugged
+        outputs["DVI-I-1"] = (1280, 1024, 0, 1080)
+        outputs["HDMI-0"] = (1920, 1080, 1920, 0)
+        p._on_outputs_change()
+        time.sleep(0.1)
+        assert s0.restart_bar.call_count == 0
+        assert s1.restart_bar.call_count == 1
+        assert s1.geometry == (1280, 18, 0, 1080)
+        assert not s2._stop.is_set()
+
+        # DVI-I-1 unplugged
+        del outputs["DVI-I-1"]
+        p._on_outputs_change()
+        assert s1._stop.is_set()
+        assert not s0._stop.is_set()
+        assert s1.restart_bar.call_count == 1
+    finally:
+        p.stop()
+
+
+def test_panel_gather_no_x_request(hotplug_outputs):
+    """
+    Test that drawing a frame in single bar mode uses the outputs snapshot
+    """
+    _, calls = hotplug_outputs
+    p = Panel(instance_per_screen=False)
+    disable_spawn_bar(p)
+    s0, s1 = Screen("DVI-I-0"), Screen("DVI-I-1")
+    s0.add_widget("l", TextWidget(text="0"))
+    s1.add_widget("l", TextWidget(text="1"))
+    p.add_screen(s0, s1)
+    for _ in range(3):
+        p.gather()
+    assert calls == [{"cached": True}]
+
+
+@pytest.mark.parametrize("keep_unplugged_screens", (False, True))
+def test_panel_randr_hook(keep_unplugged_screens, mocker):
+    """
+    Test that the outputs are only followed when screens are detected
+    """
+    p = Panel(keep_unplugged_screens=keep_unplugged_screens)
+    mocker.patch("barython.panel.get_randr_screens", return_value={})
+    mocker.patch.object(p.hooks, "start")
+    p._start()
+    assert (RandrHook in p.hooks.hooks) is not keep_unplugged_screens
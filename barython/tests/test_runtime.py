@@ -0,0 +1,279 @@
+
+import os
+import threading
+import time
+
+from barython.runtime import (
+    AsyncioRuntime, Dispatcher, Reactor, Scheduler, ThreadRuntime, TimerWheel,
+    default_dispatcher
+)
+
+
+def test_dispatcher_submit(mocker):
+    callback = mocker.stub()
+    dispatcher = Dispatcher()
+    dispatcher.submit(callback, 1, a=2)
+    assert dispatcher.join(timeout=1)
+    callback.assert_called_once_with(1, a=2)
+    assert dispatcher.dispatched == 1
+    assert dispatcher.queue_depth == 0
+
+
+def test_dispatcher_serialize_callback():
+    """
+    Test that a callback never runs twice at the same time
+    """
+    running = []
+    max_running = []
+
+    def callback(i):
+        running.append(i)
+        max_running.append(len(running))
+        time.sleep(0.01)
+        running.remove(i)
+
+    dispatcher = Dispatcher(max_workers=4)
+    for i in range(10):
+        dispatcher.submit(callback, i)
+    assert dispatcher.join(timeout=2)
+    assert max(max_running) == 1
+    assert dispatcher.dispatched == 10
+
+
+def test_dispatcher_bounded_workers():
+    lock = threading.Event()
+    dispatcher = Dispatcher(max_workers=2)
+    callbacks = [lambda: lock.wait() for i in range(5)]
+    for c in callbacks:
+        dispatcher.submit(c)
+    try:
+        time.sleep(0.1)
+        assert dispatcher._workers == 2
+        assert dispatcher.queue_depth == 3
+    finally:
+        lock.set()
+    assert dispatcher.join(timeout=1)
+
+
+def test_dispatcher_drop_when_full():
+    lock = threading.Event()
+    dispatcher = Dispatcher(max_workers=1, maxsize=2)
+
+    def callback():
+        lock.wait()
+
+    try:
+        for i in range(5):
+            dispatcher.submit(callback)
+            # let the worker take the first call
+            time.sleep(0.05)
+        assert dispatcher.queue_depth == 2
+        assert dispatcher.dropped == 2
+    finally:
+        lock.set()
+    assert dispatcher.join(timeout=1)
+    assert dispatcher.dispatched == 3
+
+
+def test_dispatcher_submit_if_idle(mocker):
+    release = threading.Event()
+    dispatcher = Dispatcher()
+    callback = mocker.Mock(side_effect=lambda: release.wait(1))
+    assert dispatcher.submit_if_idle(callback)
+    assert not dispatcher.submit_if_idle(callback)
+    release.set()
+    assert dispatcher.join(timeout=1)
+    assert dispatcher.submit_if_idle(callback)
+    assert dispatcher.join(timeout=1)
+    assert callback.call_count == 2
+
+
+def test_asyncio_dispatcher():
+    """
+    Test that the asyncio runtime calls the callbacks through its loop
+    """
+    threads = dict()
+    runtime = AsyncioRuntime()
+    assert runtime.dispatcher is not default_dispatcher
+    assert runtime.wheel.dispatcher is runtime.update_dispatcher
+
+    def blocking(value):
+        threads[value] = threading.current_thread()
+
+    async def coroutine(value):
+        threads[value] = threading.current_thread()
+
+    def main():
+        runtime.dispatcher.submit(blocking, "blocking")
+        runtime.dispatcher.submit(coroutine, "coroutine")
+        runtime.call_later(0.1, runtime.stop)
+
+    runtime.run(main)
+    assert runtime.dispatcher.join(timeout=1)
+    assert threads["coroutine"] is threading.current_thread()
+    assert threads["blocking"].name.startswith("barython")
+    assert runtime.dispatcher.dispatched == 2
+    assert (
+        runtime.update_dispatcher.executor is not runtime.dispatcher.executor
+    )
+
+
+def test_runtime_stop_before_run():
+    """
+    A stop requested before the runtime runs should not be lost
+    """
+    for runtime in (ThreadRuntime(), AsyncioRuntime()):
+        runtime.stop()
+        done = threading.Event()
+        threading.Thread(
+            target=lambda: (runtime.run(lambda: None), done.set()),
+            daemon=True
+        ).start()
+        assert done.wait(1)
+
+
+def test_slow_updates_do_not_starve_hooks():
+    """
+    Hooks callbacks should be called while periodic updates are stuck
+    """
+    runtime = ThreadRuntime(
+        dispatcher=Dispatcher(max_workers=1),
+        update_dispatcher=Dispatcher(max_workers=1)
+    )
+    release = threading.Event()
+    called = threading.Event()
+    def stuck():
+        release.wait(1)
+
+    runtime.add_periodic(stuck, 60)
+    runtime.dispatcher.submit(called.set)
+    try:
+        assert called.wait(0.5)
+    finally:
+        runtime.remove_periodic(stuck)
+        release.set()
+
+
+def test_scheduler_call_later(mocker):
+    callback = mocker.stub()
+    scheduler = Scheduler()
+    scheduler.call_later(0.05, callback, 1)
+    scheduler.call_later(0.01, callback, 0)
+    time.sleep(0.1)
+    assert callback.call_args_list == [mocker.call(0), mocker.call(1)]
+
+
+def test_scheduler_cancel(mocker):
+    callback = mocker.stub()
+    scheduler = Scheduler()
+    timer = scheduler.call_later(0.05, callback)
+    timer.cancel()
+    time.sleep(0.1)
+    assert not callback.called
+
+
+def test_timer_wheel_group_same_period(mocker):
+    """
+    Test that callbacks sharing a period are called in the same tick
+    """
+    calls = []
+    wheel = TimerWheel(ThreadRuntime())
+    callbacks = [
+        lambda i=i: calls.append(i) for i in range(3)
+    ]
+    for c in callbacks:
+        assert wheel.add(c, 0.05)
+    assert not wheel.add(callbacks[0], 0.05)
+    assert len(wheel._groups) == 1
+
+    time.sleep(0.12)
+    for c in callbacks:
+        wheel.remove(c)
+    assert not wheel._groups
+    wheel.dispatcher.join(timeout=1)
+    # each callback is called when added, then at each tick
+    assert wheel.ticks >= 2
+    assert len(calls) == 3 * (wheel.ticks + 1)
+
+
+def test_timer_wheel_slow_callback():
+    """
+    Test that a slow callback neither piles up nor delays its group
+    """
+    slow_calls, fast_calls = [], []
+    release = threading.Event()
+    wheel = TimerWheel(ThreadRuntime(), dispatcher=Dispatcher())
+
+    def slow():
+        slow_calls.append(1)
+        release.wait(1)
+
+    def fast():
+        fast_calls.append(1)
+
+    wheel.add(slow, 0.02)
+    wheel.add(fast, 0.02)
+    time.sleep(0.15)
+    wheel.remove(slow)
+    wheel.remove(fast)
+    release.set()
+    assert wheel.dispatcher.join(timeout=1)
+
+    assert len(slow_calls) == 1
+    assert len(fast_calls) >= 5
+    assert wheel.skipped >= 5
+    assert wheel.dispatcher.queue_depth == 0
+
+
+def test_timer_wheel_remove(mocker):
+    callback = mocker.stub()
+    wheel = TimerWheel(ThreadRuntime())
+    wheel.add(callback, 0.02)
+    wheel.remove(callback)
+    time.sleep(0.05)
+    callback.assert_called_once_with()
+
+
+def test_reactor_add_remove_reader():
+    reactor = Reactor()
+    r, w = os.pipe()
+    received = []
+    readable = threading.Event()
+
+    def on_readable():
+        received.append((os.read(r, 10), threading.current_thread()))
+        readable.set()
+
+    reactor.add_reader(r, on_readable)
+    os.write(w, b"a")
+    assert readable.wait(1)
+    assert received[0][0] == b"a"
+    assert received[0][1] is reactor._thread
+
+    reactor.remove_reader(r)
+    readable.clear()
+    os.write(w, b"b")
+    assert not readable.wait(0.1)
+    os.close(r)
+    os.close(w)
+
+
+def test_reactor_reader_closed_before_registration():
+    """
+    A reader closed before the reactor watches it should not stop the reactor
+    """
+    reactor = Reactor()
+    with reactor._lock:
+        # registrations are applied once the lock is released
+        closed_r, closed_w = os.pipe()
+        reactor._changes.append((closed_r, lambda: None))
+        os.close(closed_r)
+        os.close(closed_w)
+    r, w = os.pipe()
+    readable = threading.Event()
+    reactor.add_reader(r, readable.set)
+    os.write(w, b"a")
+    assert readable.wait(1)
+    reactor.remove_reader(r)
+    os.close(r)
+    os.close(w)
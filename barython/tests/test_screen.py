@@ -1,9 +1,14 @@
 
+from collections import OrderedDict
 import pytest
+import threading
+import time
+import xcffib
 
 from barython.panel import Panel
-from barython.screen import Screen
+from barython.screen import RandrScreens, Screen
 from barython.widgets.base import Widget, TextWidget
+from barython.tests.tools import FakeRandrConnection, disable_spawn_bar
 import barython.screen
 
 
@@ -120,3 +125,164 @@ def test_screen_gather_multiple_widgets():
 
     content = s.gather()
     assert content == "%{l}testtest1%{c}testtest1%{r}testtest1"
+
+
+def test_screen_gather_only_invalidated_alignment():
+    """
+    Test that a widget change only rebuilds its own alignment
+    """
+    class CountingTextWidget(TextWidget):
+        reads = 0
+
+        @property
+        def content(self):
+            self.reads += 1
+            return self._content
+
+    p = Panel(keep_unplugged_screens=True)
+    s = Screen()
+    p.add_screen(s)
+    w, w1 = CountingTextWidget(text="test"), CountingTextWidget(text="test1")
+    s.add_widget("l", w)
+    s.add_widget("r", w1)
+    w.update()
+    w1.update()
+    assert s.gather() == "%{l}test%{r}test1"
+
+    version = s.version
+    w1_reads = w1.reads
+    w.text = "updated"
+    w.update()
+    assert s.version == version + 1
+    assert s.gather() == "%{l}updated%{r}test1"
+    assert w1.reads == w1_reads
+
+
+def test_screen_update_coalesce(mocker):
+    """
+    Test that updates asked during a frame are merged in one draw
+    """
+    disable_spawn_bar(Screen)
+    p = Panel(refresh=0.1, keep_unplugged_screens=True)
+    s = Screen()
+    p.add_screen(s)
+    mocker.spy(s, "draw")
+    s._stop.clear()
+
+    s.update(no_wait=True)
+    begin = time.monotonic()
+    for i in range(10):
+        s.update()
+    # updates never wait for the next frame
+    assert time.monotonic() - begin < 0.05
+    assert s.draw.call_count == 1
+
+    time.sleep(0.15)
+    assert s.draw.call_count == 2
+    assert s.frames_drawn == 2
+    assert s.update_requests == 11
+    assert s.updates_coalesced == 9
+
+
+def test_screen_draw_blocked(mocker):
+    """
+    Test that a blocked draw keeps the timers running and is followed by
+    another one drawing the changes done in the meantime
+    """
+    disable_spawn_bar(Screen)
+    p = Panel(refresh=0, keep_unplugged_screens=True)
+    s = Screen()
+    p.add_screen(s)
+    s._stop.clear()
+    release = threading.Event()
+    draws = []
+
+    def draw():
+        draws.append(time.monotonic())
+        release.wait(1)
+
+    mocker.patch.object(s, "draw", side_effect=draw)
+    s.update()
+    timer_called = threading.Event()
+    s.runtime.call_later(0.05, timer_called.set)
+    assert timer_called.wait(0.5)
+    assert len(draws) == 1
+
+    s.update()
+    s.update()
+    time.sleep(0.05)
+    release.set()
+    assert p.runtime.update_dispatcher.join(timeout=1)
+    assert len(draws) == 2
+
+
+@pytest.fixture
+def fake_randr(monkeypatch):
+    conn = FakeRandrConnection(OrderedDict([
+        ("DVI-I-0", (1920, 1080, 0, 0)), ("HDMI-0", None),
+        ("DVI-I-1", (1280, 1024, 1920, 0)),
+    ]))
+    connect = []
+
+    def fake_connect():
+        connect.append(conn)
+        return conn
+
+    monkeypatch.setattr(barython.screen.xcffib, "connect", fake_connect)
+    randr = RandrScreens()
+    monkeypatch.setattr(barython.screen, "default_randr", randr)
+    yield conn, randr, connect
+
+
+def test_randr_screens_pipelined(fake_randr):
+    conn, randr, _ = fake_randr
+    assert randr.get() == OrderedDict([
+        ("DVI-I-0", (1920, 1080, 0, 0)), ("DVI-I-1", (1280, 1024, 1920, 0)),
+    ])
+    requests = conn.requests[2:]
+    # all requests of the batch are sent before waiting for a reply
+    actions = [action for action, _ in requests]
+    assert actions == ["send"] * 6 + ["flush"] + ["reply"] * 6
+
+
+def test_randr_screens_cache(fake_randr):
+    conn, randr, connect = fake_randr
+    outputs = randr.get()
+    conn.requests.clear()
+    assert randr.get() == outputs
+    assert conn.requests == [
+        ("send", "GetScreenResourcesCurrent"),
+        ("reply", "GetScreenResourcesCurrent"),
+    ]
+
+    conn.requests.clear()
+    assert randr.get(cached=True) == outputs
+    assert conn.requests == []
+
+    conn.outputs["HDMI-0"] = (1920, 1080, 3200, 0)
+    conn.config_timestamp += 1
+    assert "HDMI-0" in randr.get()
+    assert (randr.queries, randr.connections, len(connect)) == (2, 1, 1)
+
+
+def test_randr_screens_reconnect(fake_randr, monkeypatch):
+    conn, randr, connect = fake_randr
+    randr.get()
+    get_resources = conn.GetScreenResourcesCurrent
+
+    def connection_lost(*args, **kwargs):
+        monkeypatch.setattr(conn, "GetScreenResourcesCurrent", get_resources)
+        raise xcffib.ConnectionException(0)
+
+    monkeypatch.setattr(conn, "GetScreenResourcesCurrent", connection_lost)
+    assert len(randr.get()) == 2
+    assert conn.disconnected
+    assert randr.connections == 2
+
+
+def test_screen_geometry_from_cache(fake_randr):
+    conn, randr, _ = fake_randr
+    randr.get()
+    conn.requests.clear()
+    assert Screen("DVI-I-1", height=18).geometry == (1280, 18, 1920, 0)
+    assert conn.requests == []
@@ -0,0 +1,77 @@
+import time
+
+from barython.runtime import default_update_dispatcher
+from barython.screen import Screen
+from barython.sources import DataSource, get_source
+from barython.widgets.base import SourceWidget
+
+
+class CounterSource(DataSource):
+    def collect(self):
+        self.collected += 1
+        return str(self.collected)
+
+    def __init__(self, start=0):
+        super().__init__()
+        self.collected = start
+
+
+def test_get_source_shared():
+    assert get_source(CounterSource) is get_source(CounterSource)
+    assert get_source(CounterSource, start=1) is not get_source(CounterSource)
+
+
+def test_source_widgets_share_collection():
+    """
+    Test that widgets on several screens collect the data once
+    """
+    source = CounterSource()
+    widgets = []
+    for i, fg in enumerate(("#FFF", "#000", "#F00")):
+        w = SourceWidget(source=source, fg=fg, refresh=60, infinite=True)
+        Screen(name="screen{}".format(i)).add_widget("l", w)
+        widgets.append(w)
+    for w in widgets:
+        w.start()
+    try:
+        # first update, done by the timer wheel
+        assert default_update_dispatcher.join(timeout=1)
+        assert source.collected == 1
+        source.update()
+        assert source.collected == 2
+        assert [w.content for w in widgets] == [
+            "%{F#FFF}2%{F-}", "%{F#000}2%{F-}", "%{F#F00}2%{F-}"
+        ]
+    finally:
+        for w in widgets:
+            w.stop()
+
+
+def test_source_periodic_update():
+    source = CounterSource()
+    fast = SourceWidget(source=source, refresh=0.05, infinite=True)
+    slow = SourceWidget(source=source, refresh=60, infinite=True)
+    for w in (fast, slow):
+        w.start()
+    try:
+        # the smallest refresh is used
+        time.sleep(0.3)
+        assert source.collected >= 3
+        assert slow.content == source.snapshot
+    finally:
+        fast.stop()
+    collected = source.collected
+    time.sleep(0.15)
+    # only the slow widget remains
+    assert source.collected - collected <= 1
+
+    slow.stop()
+    assert not source.is_subscribed(slow.render)
+    assert source._period is None
+
+
+def test_source_widget_update_not_started():
+    source = CounterSource()
+    w = SourceWidget(source=source)
+    w.update()
+    assert w.content == "1"
@@ -1,9 +1,16 @@
 
 import logging
+import os
+import pytest
+import resource
 import subprocess
+import threading
+import time
 
 import barython.tools
-from barython.tools import lemonbar, splitted_sleep
+from barython.tools import (
+    LineReader, cancellable_sleep, lemonbar, splitted_sleep
+)
 
 
 logging.basicConfig(level=logging.DEBUG)
@@ -36,3 +43,61 @@ def test_splitted_sleep(mocker):
     mocker.spy(barython.tools.time, "sleep")
     splitted_sleep(2, 0.5)
     assert barython.tools.time.sleep.call_count == 4
+
+
+def test_cancellable_sleep():
+    stop = threading.Event()
+    begin = time.monotonic()
+    assert not cancellable_sleep(0.1, stop)
+    assert time.monotonic() - begin >= 0.1
+
+
+def test_cancellable_sleep_stop():
+    """
+    Test that the sleep is interrupted as soon as the event is set
+    """
+    stop = threading.Event()
+    threading.Timer(0.05, stop.set).start()
+    begin = time.monotonic()
+    assert cancellable_sleep(10, stop)
+    assert time.monotonic() - begin < 1
+
+
+def test_line_reader():
+    r, w = os.pipe()
+    reader = LineReader(r)
+    os.write(w, b"first\nsec")
+    assert reader.readline() == b"first"
+    assert reader.readline(timeout=0.05) is None
+
+    os.write(w, b"ond\r\nthird\nfourth\n")
+    assert reader.readline() == b"second"
+    assert reader.readlines() == [b"third", b"fourth"]
+
+    os.write(w, b"last")
+    os.close(w)
+    assert reader.readline() == b"last"
+    assert reader.readline() is None
+    assert reader.eof
+    os.close(r)
+
+
+def test_line_reader_high_fd():
+    """
+    Test a fd above the 1024 limit of select()
+    """
+    r, w = os.pipe()
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if max(soft, hard) <= 2048:
+        pytest.skip("not enough file descriptors allowed")
+    if soft <= 2048:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    high_r = os.dup2(r, 2000)
+    os.close(r)
+    try:
+        reader = LineReader(high_r)
+        os.write(w, b"line\n")
+        assert reader.readline(timeout=1) == b"line"
+    finally:
+        os.close(high_r)
+        os.close(w)
@@ -1,3 +1,22 @@
+from types import SimpleNamespace
+import os
+import socket
+import threading
+import time
+import xcffib
+
+
+def wait_for(predicate, timeout=2):
+    """
+    Wait until predicate() is true, or until the end of timeout
+
+    :return: the last value returned by predicate()
+    """
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
 
 def disable_spawn_bar(obj):
     """
@@ -18,3 +37,243 @@ def disable_spawn_bar(obj):
 
     obj.init_bar = mock_init_bar
     obj._write_in_bar = mock_write_in_bar
+
+
+class FakeBspwmServer:
+    """
+    Fake bspwm socket, replaying reports to each client subscribing
+    """
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            with conn:
+                self.messages.append(conn.recv(4096))
+                for line in self.lines:
+                    conn.sendall(line.encode() + b"\n")
+                if not self.close_after_replay:
+                    # keep the connection open until the client leaves
+                    conn.recv(1)
+
+    def start(self):
+        self._sock.listen(1)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def stop(self):
+        self._sock.close()
+
+    def __init__(self, path, lines, close_after_replay=False):
+        self.path = path
+        #: lines sent after each subscription
+        self.lines = lines
+        #: close the connection once all lines have been sent
+        self.close_after_replay = close_after_replay
+        #: subscribe messages received
+        self.messages = []
+
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.bind(path)
+
+
+class FakeMPDServer:
+    """
+    Fake MPD server, answering status, currentsong, command lists and idle
+    """
+    def trigger(self, *subsystems):
+        """
+        Simulate changes in subsystems, sent to idling clients
+        """
+        with self._changes_cond:
+            for changes in self._changes:
+                changes.update(subsystems)
+            self._changes_cond.notify_all()
+
+    def _send_object(self, conn, obj):
+        conn.sendall("".join(
+            "{}: {}\n".format(k, v) for k, v in obj.items()
+        ).encode())
+
+    def _idle(self, conn, changes):
+        with self._changes_cond:
+            while not changes and not self._closed:
+                self._changes_cond.wait(0.05)
+            for subsystem in sorted(changes):
+                conn.sendall("changed: {}\n".format(subsystem).encode())
+            changes.clear()
+
+    def _handle(self, conn):
+        changes = set()
+        with self._changes_cond:
+            self._changes.append(changes)
+        command_list = None
+        try:
+            conn.sendall(b"OK MPD 0.21.0\n")
+            for line in conn.makefile("rb"):
+                command = line.decode().strip().split(" ", 1)[0]
+                self.commands.append(command)
+                if command == "command_list_ok_begin":
+                    command_list = []
+                    continue
+                elif command == "command_list_end":
+                    for c in command_list:
+                        self._send_object(conn, self.objects.get(c, {}))
+                        conn.sendall(b"list_OK\n")
+                    command_list = None
+                elif command_list is not None:
+                    command_list.append(command)
+                    continue
+                elif command == "idle":
+                    self._idle(conn, changes)
+                elif command == "close":
+                    return
+                else:
+                    self._send_object(conn, self.objects.get(command, {}))
+                conn.sendall(b"OK\n")
+        except OSError:
+            pass
+        finally:
+            conn.close()
+            with self._changes_cond:
+                self._changes.remove(changes)
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            self.connections += 1
+            threading.Thread(
+                target=self._handle, args=(conn, ), daemon=True
+            ).start()
+
+    def start(self):
+        self._sock.listen(5)
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def stop(self):
+        self._closed = True
+        self._sock.close()
+
+    def __init__(self, status=None, current=None):
+        #: answers of the commands, by command
+        self.objects = {
+            "status": status or {"state": "play"},
+            "currentsong": current or {"artist": "artist", "title": "title"},
+        }
+        #: commands received, by all clients
+        self.commands = []
+        #: number of connections received
+        self.connections = 0
+
+        self._closed = False
+        #: pending changes of each idling client
+        self._changes = []
+        self._changes_cond = threading.Condition()
+        self._sock = socket.socket()
+        self._sock.bind(("127.0.0.1", 0))
+        self.host, self.port = self._sock.getsockname()
+
+
+class _FakeCookie:
+    def reply(self):
+        self._conn.requests.append(("reply", self._name))
+        return self._value
+
+    def __init__(self, conn, name, value):
+        self._conn = conn
+        self._name = name
+        self._value = value
+
+
+class FakeRandrConnection:
+    """
+    Fake X connection answering the RandR requests
+
+    Outputs are given by name, with their geometry or None if disconnected.
+    Output ids start at 1, and the crtc of output i is 100 + i.
+    """
+    def __call__(self, extension_key):
+        # conn(xcffib.randr.key) returns the extension
+        return self
+
+    def get_setup(self):
+        return SimpleNamespace(roots=[SimpleNamespace(root=1)])
+
+    def flush(self):
+        self.requests.append(("flush", None))
+
+    def disconnect(self):
+        self.disconnected = True
+
+    def _send(self, name, value):
+        self.requests.append(("send", name))
+        return _FakeCookie(self, name, value)
+
+    def GetScreenResourcesCurrent(self, window):
+        ids = range(1, len(self.outputs) + 1)
+        return self._send("GetScreenResourcesCurrent", SimpleNamespace(
+            timestamp=self.timestamp, config_timestamp=self.config_timestamp,
+            outputs=list(ids), crtcs=[100 + i for i in ids]
+        ))
+
+    def GetOutputInfo(self, output, config_timestamp):
+        name, geometry = list(self.outputs.items())[output - 1]
+        return self._send("GetOutputInfo", SimpleNamespace(
+            name=list(map(ord, name)), crtc=100 + output if geometry else 0
+        ))
+
+    def GetCrtcInfo(self, crtc, config_timestamp):
+        geometry = list(self.outputs.values())[crtc - 101] or (0, 0, 0, 0)
+        return self._send("GetCrtcInfo", SimpleNamespace(
+            **dict(zip(("width", "height", "x", "y"), geometry))
+        ))
+
+    def SelectInput(self, window, enable):
+        self.selected_mask = enable
+
+    def get_file_descriptor(self):
+        return self._events_r
+
+    def poll_for_event(self):
+        if self.lost:
+            raise xcffib.ConnectionException(1)
+        if not self._events:
+            return None
+        os.read(self._events_r, 1)
+        return self._events.pop(0)
+
+    def send_event(self, event="ScreenChangeNotify"):
+        """
+        Queue an event, making the connection readable
+        """
+        self._events.append(event)
+        os.write(self._events_w, b"\0")
+
+    def lose(self):
+        """
+        Break the connection, making it readable
+        """
+        self.lost = True
+        os.write(self._events_w, b"\0")
+
+    def close(self):
+        os.close(self._events_r)
+        os.close(self._events_w)
+
+    def __init__(self, outputs, timestamp=1, config_timestamp=1):
+        #: geometry of each output, by name
+        self.outputs = outputs
+        self.timestamp = timestamp
+        self.config_timestamp = config_timestamp
+        #: (action, request name) sent or waited, in order
+        self.requests = []
+        self.disconnected = False
+        #: poll_for_event() raises a ConnectionException
+        self.lost = False
+        #: RandR notifications selected
+        self.selected_mask = None
+        self._events = []
+        self._events_r, self._events_w = os.pipe()
@@ -0,0 +1,51 @@
+import pytest
+
+from barython.widgets import audio
+from barython.widgets.audio import PulseAudioBackend, PulseAudioWidget
+
+
+class FakePulseAudioBackend(PulseAudioBackend):
+    def get_volume(self):
+        self.calls += 1
+        return self.volume, self.mute
+
+    def __init__(self, volume=42, mute=False):
+        self.volume = volume
+        self.mute = mute
+        self.calls = 0
+
+
+def test_pulseaudio_widget_backend(mocker):
+    backend = FakePulseAudioBackend()
+    pa = PulseAudioWidget(backend=backend, icon="V")
+    trigger = mocker.patch.object(pa, "trigger_global_update")
+    popen = mocker.patch("subprocess.Popen")
+
+    pa.update()
+    trigger.assert_called_once_with("V 42")
+
+    backend.mute = True
+    pa.update()
+    trigger.assert_called_with("V")
+    assert backend.calls == 2
+    assert not popen.called
+
+
+def test_pulseaudio_widget_subprocess_fallback(mocker):
+    mocker.patch.object(audio, "pulsectl", None)
+    pa = PulseAudioWidget(cmd=["echo", "12 false"], shell=False)
+    assert pa.backend is None
+
+    trigger = mocker.patch.object(pa, "trigger_global_update")
+    pa.update()
+    trigger.assert_called_once_with("12")
+
+
+def test_pulseaudio_widget_explicit_cmd(mocker):
+    """
+    Test that a cmd given explicitly is not replaced by pulsectl
+    """
+    backend = mocker.patch.object(audio, "PulsectlBackend")
+    mocker.patch.object(audio, "pulsectl", object())
+    assert PulseAudioWidget(cmd=["echo", "12 false"]).backend is None
+    assert PulseAudioWidget().backend is backend.return_value
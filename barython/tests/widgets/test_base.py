@@ -2,12 +2,12 @@
 import pytest
 import threading
 import time
-import timeit
 
+from barython.launcher import default_launcher
 from barython.screen import Screen
 from barython.panel import Panel
 from barython.widgets.base import SubprocessWidget, TextWidget, Widget
-from barython.tests.tools import disable_spawn_bar
+from barython.tests.tools import disable_spawn_bar, wait_for
 
 
 def test_base_widget_construction():
@@ -84,6 +84,36 @@ def test_base_widget_decorate_self_attributes():
             w.decorate("test", font=1, **kwargs))
 
 
+def test_base_widget_decorate_self_attributes_compiled(mocker):
+    """
+    Test that the decoration is compiled once, until an attribute changes
+    """
+    w = Widget(fg="#FFFF11", bg="#FF9021", padding=2, fonts=[1, ],
+               actions={1: "firefox"})
+    mocker.spy(w, "_compile_decoration")
+
+    expected = w.decorate("test", fg=w.fg, bg=w.bg, padding=2, font=1,
+                          actions=w.actions)
+    assert w.decorate_with_self_attributes("test") == expected
+    assert w.decorate_with_self_attributes("test") == expected
+    # one call by decorate(), one to compile the self attributes
+    assert w._compile_decoration.call_count == 2
+    # no padding around an empty text
+    assert w.decorate_with_self_attributes("") == w.decorate(
+        "", fg=w.fg, bg=w.bg, padding=2, font=1, actions=w.actions
+    )
+
+    w.fg = "#FF0000"
+    assert w.decorate_with_self_attributes("test") == w.decorate(
+        "test", fg="#FF0000", bg=w.bg, padding=2, font=1, actions=w.actions
+    )
+
+    # other attributes do not recompile the decoration
+    w.refresh = 1
+    w.decorate_with_self_attributes("test")
+    assert w._compile_decoration.call_count == 5
+
+
 def test_base_lock_update(mocker):
     """
     Test that only one update is running at a time by widget
@@ -105,6 +135,28 @@ def test_base_lock_update(mocker):
         p.stop()
 
 
+def test_base_widgets_share_tick(mocker):
+    """
+    Test that periodic widgets with the same refresh share a timer wheel tick
+    """
+    disable_spawn_bar(Panel)
+    p = Panel(instance_per_screen=False, keep_unplugged_screens=True)
+    s = Screen()
+    widgets = [Widget(refresh=0.2, infinite=True) for i in range(4)]
+    s.add_widget("l", *widgets)
+    p.add_screen(s)
+
+    try:
+        threading.Thread(target=p.start).start()
+        time.sleep(0.1)
+        assert len(p.runtime.wheel._groups) == 1
+        group = p.runtime.wheel._groups[0.2]
+        assert len(group.callbacks) == 4
+    finally:
+        p.stop()
+    assert not p.runtime.wheel._groups
+
+
 def test_base_textwidget():
     tw = TextWidget(text="Test")
     tw.update()
@@ -120,10 +172,104 @@ def test_base_subprocesswidget_init_subprocess():
     assert subproc.stdout.readline() == b"Test\n"
 
 
-def test_base_subprocesswidget_notify():
-    sw = SubprocessWidget(cmd="echo test", subscribe_cmd="sleep 0.5")
-    total_time = timeit.timeit(sw.notify, number=2)
-    assert int(total_time) == 1
+def test_base_subprocesswidget_cache_ttl():
+    """
+    Test that the default TTL follows the refresh of the screens
+    """
+    sw = SubprocessWidget(cmd="echo test")
+    assert sw.cache_ttl == 0
+    screen = Screen(refresh=1)
+    screen.add_widget("l", sw)
+    assert sw.cache_ttl == 0.1
+    screen.refresh = 0.1
+    assert sw.cache_ttl == 0.05
+    assert SubprocessWidget(cmd="echo test", cache_ttl=1).cache_ttl == 1
+
+
+def test_base_subprocesswidget_share_spawn(mocker):
+    screen = Screen(refresh=1)
+    widgets = [SubprocessWidget(cmd=["echo", "shared"]) for _ in range(3)]
+    screen.add_widget("l", *widgets)
+    run = mocker.spy(default_launcher, "_run")
+    for w in widgets:
+        w.update()
+    assert run.call_count == 1
+    assert all(w.content == "shared" for w in widgets)
+
+
+def test_base_subprocesswidget_env():
+    screen = Screen(refresh=1)
+    sw = SubprocessWidget(cmd="echo $FOO", shell=True)
+    screen.add_widget("l", sw)
+    sw.env["FOO"] = "bar"
+    sw.update()
+    assert sw.content == "bar"
+    assert "FOO" not in default_launcher.env
+
+
+def test_base_subprocesswidget_stream(mocker):
+    sw = SubprocessWidget(
+        cmd=["sh", "-c", "echo first; echo second; sleep 0.1"],
+        stream=True, failure_refresh=0.05
+    )
+    init_subprocess = mocker.spy(sw, "_init_subprocess")
+    results = []
+    mocker.patch.object(
+        sw, "trigger_global_update", side_effect=results.append
+    )
+
+    t = threading.Thread(target=sw.start)
+    t.start()
+    wait_for(lambda: len(results) >= 3)
+    sw.stop()
+    t.join()
+
+    # started once, then restarted when it exited
+    assert init_subprocess.call_count == 2
+    assert results[:3] == ["first", "second", "first"]
+
+
+def test_base_subprocesswidget_stream_shell():
+    """
+    A string command run in a shell should not be splitted
+    """
+    sw = SubprocessWidget(cmd="echo first second; sleep 10", stream=True,
+                          shell=True)
+    sw.start()
+    try:
+        wait_for(lambda: sw.content is not None)
+        assert sw.content == "first second"
+    finally:
+        sw.stop()
+
+
+def test_base_subprocesswidget_stale_reader(mocker):
+    """
+    The output of a replaced process should not be watched anymore
+    """
+    sw = SubprocessWidget(cmd=["sh", "-c", "echo Test"], stream=True)
+    sw._periodic_runtime = sw.runtime
+    remove_reader = mocker.patch.object(sw.runtime, "remove_reader")
+    stale = mocker.Mock()
+    stale.fd = -1
+    sw._on_stream_readable(mocker.Mock(), stale)
+    remove_reader.assert_called_once_with(-1)
+
+
+def test_base_subprocesswidget_stream_start():
+    """
+    Starting a stream widget should not block until the command exits
+    """
+    sw = SubprocessWidget(cmd=["sh", "-c", "echo Test; sleep 10"], stream=True)
+    start = time.monotonic()
+    sw.start()
+    try:
+        assert time.monotonic() - start < 1
+        wait_for(lambda: sw.content is not None)
+        assert sw.content == "Test"
+    finally:
+        sw.stop()
+    assert sw._subproc is None
 
 
 def test_base_subprocesswidget_start():
@@ -2,9 +2,11 @@
 import pytest
 
 import barython.widgets.battery
+from barython.hooks.uevent import UeventHook
 from barython.panel import Panel
+from barython.runtime import default_update_dispatcher
 from barython.screen import Screen
-from barython.widgets.battery import BatteryWidget
+from barython.widgets.battery import BatterySource, BatteryWidget
 
 
 BATTERIES = {
@@ -123,3 +125,73 @@ def test_battery_widget_update(one_battery_dir):
     bw.update()
 
     assert bw._content == organized_result
+
+
+def test_battery_widgets_share_source(one_battery_dir, mocker):
+    widgets = [BatteryWidget(fg="#FFF"), BatteryWidget(fg="#000")]
+    source = widgets[0].source
+    assert widgets[1].source is source
+    read_battery_infos = mocker.spy(source, "read_battery_infos")
+    for w in widgets:
+        w.start()
+    try:
+        assert default_update_dispatcher.join(timeout=1)
+        assert read_battery_infos.call_count == 1
+        assert widgets[0].content == "%{F#FFF}95% - 2:18%{F-}"
+        assert widgets[1].content == "%{F#000}95% - 2:18%{F-}"
+    finally:
+        for w in widgets:
+            w.stop()
+
+
+def test_battery_source_reuse_files(one_battery_dir):
+    source = BatterySource()
+    try:
+        assert source.collect()["BAT0"]["capacity"] == 95
+        one_battery_dir.join("BAT0", "capacity").write("94")
+        assert source.collect()["BAT0"]["capacity"] == 94
+        assert source.discoveries == 1
+
+        # a new battery changes the power supply directory
+        battery_dir = one_battery_dir.mkdir("BAT1")
+        for key, val in BATTERIES["BAT1"].items():
+            battery_dir.join(key).write(val)
+        assert sorted(source.collect()) == ["BAT0", "BAT1"]
+        assert source.discoveries == 2
+    finally:
+        source.close()
+
+
+def test_battery_source_missing_file(one_battery_dir):
+    one_battery_dir.join("BAT0", "energy_now").remove()
+    one_battery_dir.join("BAT0", "charge_now").write("1000")
+    source = BatterySource()
+    try:
+        assert source.collect()["BAT0"]["energy_now"] == 1000
+    finally:
+        source.close()
+
+
+def test_battery_source_handler(one_battery_dir, mocker):
+    source = BatterySource()
+    publish = mocker.patch.object(source, "publish")
+    try:
+        source.handler(event="change")
+        assert source.discoveries == 1
+        publish.assert_called_once()
+
+        # a new power supply device is discovered
+        source.handler(event="add")
+        assert source.discoveries == 2
+    finally:
+        source.close()
+
+
+def test_battery_widget_uevent_hook():
+    bw = BatteryWidget()
+    assert bw.refresh == barython.widgets.battery.FALLBACK_REFRESH
+    hook, = bw.hooks.hooks[UeventHook]
+    assert hook.subsystem == "power_supply"
+    assert hook.callbacks == {bw.source.handler}
+
+    assert BatteryWidget(uevents=False).refresh == 10
@@ -1,8 +1,13 @@
 
 import datetime
+import time
+
 import pytest
 
-from barython.widgets.clock import ClockWidget
+from barython.runtime import default_update_dispatcher
+from barython.widgets.clock import (
+    ClockSource, ClockWidget, format_granularity, next_boundary
+)
 
 
 class MockDatetime(datetime.datetime):
@@ -25,3 +30,117 @@ def test_clock_widget_content(mocker):
 
     cw.update()
     assert cw.content == str(now)
+
+
+@pytest.fixture
+def timezone(monkeypatch):
+    """
+    Set the timezone, restored after the test
+    """
+    def set_timezone(tz):
+        monkeypatch.setenv("TZ", tz)
+        time.tzset()
+    yield set_timezone
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_format_granularity():
+    assert format_granularity("%c") == 1
+    assert format_granularity("%H:%M") == 60
+    assert format_granularity("%-I%p") == 3600
+    assert format_granularity("%a %d %b") == 86400
+    assert format_granularity("100%% sure") == 86400
+
+
+def test_next_boundary(timezone):
+    timezone("UTC")
+    assert next_boundary(60, now=1000.5) == 1020
+    assert next_boundary(1, now=1000.5) == 1001
+    # UTC+5:30: hours flip at half past in UTC
+    timezone("Asia/Kolkata")
+    assert next_boundary(3600, now=0) == 1800
+    assert next_boundary(60, now=1000.5) == 1020
+
+
+def test_clock_widget_refresh():
+    assert ClockWidget(date_format="%H:%M").refresh == 60
+    assert ClockWidget(date_format="%H:%M", refresh=1).refresh == 1
+
+
+def test_clock_source_tzset(timezone, mocker):
+    source = ClockSource()
+    tzset = mocker.spy(time, "tzset")
+    source.collect()
+    source.collect()
+    assert tzset.call_count == 1
+
+    timezone("Asia/Kolkata")
+    tzset.reset_mock()
+    source.collect()
+    assert tzset.call_count == 1
+
+
+def test_clock_widgets_share_ticks():
+    source = ClockSource()
+    collected = []
+    collect = source.collect
+
+    def collect_now():
+        collected.append(time.time())
+        return collect()
+
+    source.collect = collect_now
+    widgets = [
+        ClockWidget(date_format=date_format)
+        for date_format in ("%H:%M:%S", "%H:%M")
+    ]
+    for w in widgets:
+        w.source = source
+        w.start()
+    try:
+        # first update, then the next second
+        deadline = time.time() + 2
+        while len(collected) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        assert default_update_dispatcher.join(timeout=1)
+    finally:
+        for w in widgets:
+            w.stop()
+
+    assert source.ticks == 1
+    assert len(collected) >= 2
+    # updated right after the second flipped
+    assert collected[1] % 1 < 0.05
+    assert widgets[0].content.endswith(
+        datetime.datetime.fromtimestamp(collected[1]).strftime(":%S")
+    )
+
+
+def test_clock_source_max_wait(mocker):
+    """
+    Test that a wait is capped, so a suspend delays the tick by max_wait
+    """
+    source = ClockSource()
+    runtime = mocker.Mock()
+    source._periodic_runtime = runtime
+    source._tick_token = token = object()
+
+    source._schedule_tick(token, time.time() + 86400)
+    delay, tick, *args = runtime.call_later.call_args[0]
+    assert delay == source.max_wait
+
+    # woken up before the boundary: wait again
+    runtime.reset_mock()
+    tick(*args)
+    assert runtime.call_later.call_args[0][0] == source.max_wait
+    assert source.ticks == 0
+
+    # woken up after a resume, past the boundary
+    runtime.reset_mock()
+    source._period = 86400
+    source._tick(token, time.time() - 1)
+    assert source.ticks == 1
+    runtime.update_dispatcher.submit.assert_called_once_with(
+        source._periodic_update
+    )
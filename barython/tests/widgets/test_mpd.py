@@ -0,0 +1,65 @@
+import pytest
+
+from barython.tests.tools import FakeMPDServer
+from barython.widgets.mpd import MPDWidget
+
+
+@pytest.fixture
+def mpd_server():
+    server = FakeMPDServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_mpd_widget_update(mpd_server, mocker):
+    mpd_widget = MPDWidget(
+        host=mpd_server.host, port=mpd_server.port,
+        icon={"play": ">", "pause": "|"}
+    )
+    trigger = mocker.patch.object(mpd_widget, "trigger_global_update")
+    mpd_widget.update()
+
+    trigger.assert_called_once_with("> artist - title")
+    # status and current song fetched in one command list, icon included
+    assert mpd_server.commands == [
+        "command_list_ok_begin", "status", "currentsong", "command_list_end"
+    ]
+
+
+def test_mpd_widget_share_connection(mpd_server, mocker):
+    widgets = [
+        MPDWidget(host=mpd_server.host, port=mpd_server.port)
+        for _ in range(3)
+    ]
+    for w in widgets:
+        mocker.patch.object(w, "trigger_global_update")
+        w.update()
+
+    assert mpd_server.connections == 1
+    assert mpd_server.commands.count("status") == 3
+
+
+def test_mpd_widget_connection_password():
+    """
+    Widgets with different passwords should not share their connection
+    """
+    widgets = [
+        MPDWidget(host="localhost", port=6600, password=password)
+        for password in (None, "secret", "secret")
+    ]
+    assert widgets[0].source.connection is not widgets[1].source.connection
+    assert widgets[1].source.connection is widgets[2].source.connection
+    assert widgets[1].source.connection.password == "secret"
+
+
+def test_mpd_widget_handler_use_hook_state(mpd_server, mocker):
+    mpd_widget = MPDWidget(host=mpd_server.host, port=mpd_server.port)
+    trigger = mocker.patch.object(mpd_widget, "trigger_global_update")
+    mpd_widget.handler(
+        run=True, status={"state": "play"},
+        current={"artist": "a", "title": "t"}
+    )
+
+    trigger.assert_called_once_with("a - t")
+    assert mpd_server.commands == []
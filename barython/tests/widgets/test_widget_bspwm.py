@@ -2,8 +2,11 @@
 from collections import OrderedDict
 import pytest
 
+from barython.hooks.bspwm import BspwmMonitor
 from barython.screen import Screen
-from barython.widgets.bspwm import BspwmDesktopWidget, BspwmDesktopPoolWidget
+from barython.widgets.bspwm import (
+    BspwmDesktopWidget, BspwmDesktopPoolWidget, segments_cache_info
+)
 
 
 @pytest.fixture
@@ -70,6 +73,25 @@ def test_bspwm_desktop_widget_parse_desktop(basic_bspwm_desktop_widget):
         assert expected == "".join(bspwm._parse_desktop(p + "q", "_"))
 
 
+def test_bspwm_desktop_widget_parse_desktop_shared_cache(
+        basic_bspwm_desktop_widget):
+    """
+    Test that decorated desktops are shared between widgets
+    """
+    other_bspwm = BspwmDesktopWidget(
+        fg_focused_occupied="#FF000004", bg_focused_occupied="#FFFFFF04",
+        padding=1, refresh=0
+    )
+    result = basic_bspwm_desktop_widget._parse_desktop("Ocache_test", "m")
+    info = segments_cache_info()
+    assert other_bspwm._parse_desktop("Ocache_test", "m") == result
+
+    new_info = segments_cache_info()
+    assert new_info["hits"] == info["hits"] + 1
+    assert new_info["misses"] == info["misses"]
+    assert 0 < new_info["hit_rate"] <= 1
+
+
 def test_bspwm_desktop_widget_sort_fixed_order(basic_bspwm_desktop_widget):
     bspwm = basic_bspwm_desktop_widget
     desktops = ["us", "fqsd", "Oq", "ff"]
@@ -81,13 +103,12 @@ def test_bspwm_desktop_widget_sort_fixed_order(basic_bspwm_desktop_widget):
 def test_bspwm_desktop_widget_organize_result(basic_bspwm_desktop_widget):
     bspwm = basic_bspwm_desktop_widget
     monitors = OrderedDict([
-        ('HDMI-0',
-            {'desktops': ['Of'], 'layout': 'T', 'focused': True}),
-        ('DVI-D-0',
-            {'desktops':
-                ['fo', 'f7', 'fDesktop2', 'os', 'oq', 'fp', 'fi', 'Ou'],
-             'layout': 'T', 'focused': False}),
-        ('DVI-I-0', {'desktops': ['Od'], 'layout': 'T', 'focused': False})
+        ('HDMI-0', BspwmMonitor(True, ('Of',), 'T')),
+        ('DVI-D-0', BspwmMonitor(
+            False, ('fo', 'f7', 'fDesktop2', 'os', 'oq', 'fp', 'fi', 'Ou'),
+            'T'
+        )),
+        ('DVI-I-0', BspwmMonitor(False, ('Od',), 'T'))
     ])
 
     expected = (
@@ -161,6 +182,54 @@ def test_bspwm_desktop_widget_organize_result(basic_bspwm_desktop_widget):
     assert expected == "".join(bspwm.organize_result(monitors))
 
 
+def test_bspwm_desktop_widget_organize_result_diff(
+        basic_bspwm_desktop_widget, mocker):
+    """
+    Test that only the monitors which changed are rendered again
+    """
+    bspwm = basic_bspwm_desktop_widget
+    monitors = OrderedDict([
+        ("HDMI-0", BspwmMonitor(True, ("Oa", "fb"), "T")),
+        ("DVI-D-0", BspwmMonitor(False, ("Oc", "fd", "oe"), "T")),
+    ])
+    expected = bspwm.organize_result(monitors)
+
+    parse_desktop = mocker.spy(bspwm, "_parse_desktop")
+    assert bspwm.organize_result(monitors) == expected
+    assert parse_desktop.call_count == 0
+
+    monitors["HDMI-0"] = BspwmMonitor(True, ("oa", "Fb"), "T")
+    assert bspwm.organize_result(monitors) != expected
+    assert parse_desktop.call_count == 2
+
+    # changing an attribute renders everything again
+    bspwm.fg_free = "#FF000008"
+    bspwm.organize_result(monitors)
+    assert parse_desktop.call_count == 7
+
+
+def test_bspwm_desktop_pool_widget_organize_result_diff(
+        basic_bspwm_desktop_pool_widget, mocker):
+    """
+    Test that only the desktops which changed are rendered again
+    """
+    bspwm = basic_bspwm_desktop_pool_widget
+    monitors = OrderedDict([
+        ("HDMI-0", BspwmMonitor(True, ("Oa", "fb"), "T")),
+        ("DVI-D-0", BspwmMonitor(False, ("Oc", "fd", "oe"), "T")),
+    ])
+    bspwm.fixed_order = ["e", "d", "c", "b", "a"]
+    bspwm.organize_result(monitors)
+
+    parse_desktop = mocker.spy(bspwm, "_parse_desktop")
+    monitors["DVI-D-0"] = BspwmMonitor(False, ("fc", "Fd", "oe"), "T")
+    result = bspwm.organize_result(monitors)
+    assert parse_desktop.call_count == 2
+
+    bspwm._rendered.clear()
+    assert bspwm.organize_result(monitors) == result
+
+
 def test_bspwm_desktop_pool_widget_actions_desktop_no_screen(
         basic_bspwm_desktop_pool_widget):
     bspwm = basic_bspwm_desktop_pool_widget
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import logging
+import os
+import select
 import subprocess
 import time
 
@@ -41,15 +43,113 @@ def lemonbar(bar_cmd="lemonbar", geometry=None, fonts=None, fg=None, bg=None,
         cmd.extend(("-a", "{}".format(clickable)))
     if others:
         cmd.extend(others)
+    # imported here, as the launcher uses the tools
+    from barython.launcher import default_launcher
+
     logging.debug("Launch {}".format(cmd))
-    bar = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    bar = default_launcher.popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE
+    )
     try:
-        subprocess.Popen("bash", stdin=bar.stdout, stdout=subprocess.PIPE)
+        default_launcher.popen(
+            ["bash"], stdin=bar.stdout, stdout=subprocess.PIPE
+        )
     except AttributeError:
         pass
     return bar
 
 
+class LineReader:
+    """
+    Read lines from a pipe, without blocking on partial lines
+
+    The pipe is set as non blocking and read in chunks. Lines are returned
+    without their end of line.
+    """
+    #: maximum size read at once
+    chunk_size = 65536
+
+    def _fill(self, timeout=None):
+        """
+        Read what is available in the pipe, waiting up to timeout seconds
+
+        :return: False if nothing has been received before the timeout
+        """
+        # poll() rather than select(), limited to the fds below 1024
+        if not self._poll.poll(None if timeout is None else timeout * 1000):
+            return False
+        try:
+            chunk = os.read(self.fd, self.chunk_size)
+        except BlockingIOError:
+            return True
+        if chunk:
+            self._buffer += chunk
+        else:
+            self.eof = True
+        return True
+
+    def readline(self, timeout=None):
+        """
+        Return the next line, waiting up to timeout seconds for it
+
+        :return: the line, or None if the pipe is closed or if the timeout
+                 expired
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while b"\n" not in self._buffer:
+            if self.eof:
+                line, self._buffer = self._buffer, b""
+                return line or None
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+            self._fill(remaining)
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line.rstrip(b"\r")
+
+    def readlines(self):
+        """
+        Return all the complete lines already received, without waiting
+        """
+        while not self.eof and self._fill(0):
+            pass
+        *lines, self._buffer = self._buffer.split(b"\n")
+        if self.eof and self._buffer:
+            lines.append(self._buffer)
+            self._buffer = b""
+        return [l.rstrip(b"\r") for l in lines]
+
+    def __init__(self, pipe):
+        """
+        :param pipe: file object or file descriptor to read
+        """
+        self.fd = pipe if isinstance(pipe, int) else pipe.fileno()
+        os.set_blocking(self.fd, False)
+        self._poll = select.poll()
+        self._poll.register(self.fd, select.POLLIN)
+        #: set when the other side of the pipe is closed
+        self.eof = False
+        self._buffer = b""
+
+
+def cancellable_sleep(time_sleep, stop_event):
+    """
+    Sleep for time_sleep seconds, unless stop_event is set in the meantime
+
+    Contrary to splitted_sleep(), the thread is not woken up until the end of
+    the sleep or until stop_event is set.
+
+    :param time_sleep: time to sleep, in seconds
+    :param stop_event: threading.Event interrupting the sleep when set
+    :return: True if the sleep has been interrupted
+    """
+    if time_sleep <= 0:
+        return stop_event.is_set()
+    return stop_event.wait(time_sleep)
+
+
 def splitted_sleep(time_sleep, interval=0.5, stop=None,
                    stop_args=[], stop_kwargs={}):
     """
@@ -62,6 +162,9 @@ def splitted_sleep(time_sleep, interval=0.5, stop=None,
     .. warning:: If stop() takes a long time, the function will sleep more
                  time that what you actually want!
 
+    .. note:: Wakes up every interval. Prefer cancellable_sleep() when the
+              stop condition is a threading.Event.
+
     :param time_sleep: time to sleep in total
     :param interval: interval between each time.sleep(), in seconds.
                      Default to 0.5 seconds.
@@ -2,21 +2,83 @@
 
 from bisect import bisect_left
 import logging
+import threading
 
 from .base import SubprocessWidget, protect_handler
-from barython.tools import splitted_sleep
 from barython.hooks.audio import PulseAudioHook
 
+try:
+    import pulsectl
+except ImportError:
+    pulsectl = None
+
 
 logger = logging.getLogger("barython")
 
 
+class PulseAudioBackend:
+    """
+    Give the volume and the mute state of the default sink
+
+    Subclass it to talk with PulseAudio in another way.
+    """
+    def get_volume(self):
+        """
+        :return: tuple (volume in percent, output mute)
+        """
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class PulsectlBackend(PulseAudioBackend):
+    """
+    Keep a connection to PulseAudio, through pulsectl
+    """
+    _pulse = None
+
+    def get_volume(self):
+        with self._lock:
+            try:
+                if self._pulse is None:
+                    self._pulse = pulsectl.Pulse("barython")
+                sink = self._pulse.get_sink_by_name(
+                    self._pulse.server_info().default_sink_name
+                )
+            except pulsectl.PulseError:
+                # reconnect at the next call
+                self._close()
+                raise
+        return round(sink.volume.value_flat * 100), bool(sink.mute)
+
+    def _close(self):
+        if self._pulse is not None:
+            self._pulse.close()
+            self._pulse = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def __init__(self):
+        if pulsectl is None:
+            raise ImportError("pulsectl is required by PulsectlBackend")
+        #: the pulsectl client cannot be used by several threads at once
+        self._lock = threading.Lock()
+
+
 class PulseAudioWidget(SubprocessWidget):
     """
     Show the current volume
 
-    Requires pamixer to work
+    Talk with PulseAudio through a backend if any, which is pulsectl by
+    default when installed and no cmd is given. Otherwise, run cmd, which
+    requires pamixer by default.
     """
+    #: command run without backend
+    default_cmd = ["echo $(pamixer --get-volume) $(pamixer --get-mute)"]
+
     _icon = None
     _volume = 0
     _input_mute = False
@@ -35,25 +97,29 @@ class PulseAudioWidget(SubprocessWidget):
             return volume_icons[bisect_left(keys, self._volume, lo=1) - 1][1]
 
     @protect_handler
-    def handler(self, event, *args, **kwargs):
+    def handler(self, event=None, run=True, *args, **kwargs):
         """
-        Filter events sent by notifications
+        Update on changes of a sink, already filtered by the hook
         """
-        # Only notify if there is something changes in pulseaudio
-        event_change_msg = "Event 'change' on sink"
-        if event_change_msg in event:
-            logger.debug("PA: line \"{}\" catched.".format(event))
-            with self._lock_update:
-                self.update()
-                splitted_sleep(self.refresh, stop=self._stop.is_set)
+        if not run:
+            return
+        logger.debug("PA: event {} catched.".format(event))
+        with self._lock_update:
+            self.update()
 
     def organize_result(self, output, *args, **kwargs):
         """
-        Override this method to change the infos to print
+        Parse the output of cmd
         """
         volume, output_mute = output.split()
-        self._volume = int(volume)
-        self._output_mute = output_mute == "true"
+        return self.organize_volume(int(volume), output_mute == "true")
+
+    def organize_volume(self, volume, output_mute, *args, **kwargs):
+        """
+        Override this method to change the infos to print
+        """
+        self._volume = volume
+        self._output_mute = output_mute
         if self.icon:
             return (
                 "{} {}".format(self.icon, self._volume)
@@ -62,10 +128,34 @@ class PulseAudioWidget(SubprocessWidget):
         else:
             return "{}".format(self._volume)
 
-    def __init__(self,
-                 cmd=["echo $(pamixer --get-volume) $(pamixer --get-mute)"],
-                 shell=True, *args, **kwargs):
-        super().__init__(*args, **kwargs, cmd=cmd, infinite=False, shell=shell)
+    def update(self, *args, **kwargs):
+        if self.backend is None:
+            return super().update(*args, **kwargs)
+        with self._lock_update:
+            self.trigger_global_update(
+                self.organize_volume(*self.backend.get_volume())
+            )
+
+    def stop(self, *args, **kwargs):
+        super().stop(*args, **kwargs)
+        if self.backend is not None:
+            self.backend.close()
+
+    def __init__(self, cmd=None, shell=True, backend="auto", *args, **kwargs):
+        super().__init__(
+            *args, **kwargs, cmd=cmd if cmd is not None else self.default_cmd,
+            infinite=False, shell=shell
+        )
+
+        if backend == "auto":
+            # a cmd given explicitly is run instead of pulsectl
+            use_pulsectl = pulsectl is not None and cmd is None
+            backend = PulsectlBackend() if use_pulsectl else None
+        #: PulseAudioBackend giving the volume. If None, run cmd instead.
+        self.backend = backend
 
         # Update the widget when PA volume changes
-        self.hooks.subscribe(self.handler, PulseAudioHook)
+        self.hooks.subscribe(
+            self.handler, PulseAudioHook, events=("change", ),
+            facilities=("sink", )
+        )
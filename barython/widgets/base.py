@@ -1,14 +1,15 @@
 #!/usr/bin/env python3
 
-import fcntl
+import functools
 import logging
-import os
 import shlex
 import subprocess
 import threading
 
 from barython.hooks import HooksPool
-from barython.tools import splitted_sleep
+from barython.launcher import default_launcher
+from barython.runtime import default_runtime
+from barython.tools import LineReader
 
 logger = logging.getLogger("barython")
 
@@ -37,6 +38,12 @@ class Widget():
     _content = None
     _icon = None
     _refresh = -1
+    #: runtime driving the widget updates, if registered in its timer wheel
+    _periodic_runtime = None
+    #: decoration compiled from the self attributes. Setting fg, bg, padding,
+    #  fonts or actions will recompile it. Note that changing actions in place
+    #  (without setting a new dict) is not detected.
+    _decoration = None
 
     @property
     def content(self):
@@ -61,16 +68,68 @@ class Widget():
     def refresh(self, value):
         self._refresh = value
 
-    def decorate(self, text, fg=None, bg=None, padding=0, font=None, icon=None,
-                 actions=None):
+    @property
+    def runtime(self):
         """
-        Decorate a text with custom properties
+        Runtime of the screens (and so, of the panel)
+        """
+        for screen in self.screens:
+            return screen.runtime
+        return default_runtime
 
-        :param fg: foreground
-        :param bg: background
-        :param padding: padding around the text
-        :param font: index of font to use
-        :param actions: dict of actions
+    @property
+    def bg(self):
+        return self._bg
+
+    @bg.setter
+    def bg(self, value):
+        self._bg = value
+        self._decoration = None
+
+    @property
+    def fg(self):
+        return self._fg
+
+    @fg.setter
+    def fg(self, value):
+        self._fg = value
+        self._decoration = None
+
+    @property
+    def fonts(self):
+        return self._fonts
+
+    @fonts.setter
+    def fonts(self, value):
+        self._fonts = value
+        self._decoration = None
+
+    @property
+    def actions(self):
+        return self._actions
+
+    @actions.setter
+    def actions(self, value):
+        self._actions = value
+        self._decoration = None
+
+    @property
+    def padding(self):
+        return self._padding
+
+    @padding.setter
+    def padding(self, value):
+        self._padding = value
+        self._decoration = None
+
+    @staticmethod
+    def _compile_decoration(fg=None, bg=None, padding=0, font=None,
+                            actions=None):
+        """
+        Compile a decoration in a prefix and a suffix to put around a text
+
+        :return: tuple (prefix, suffix, prefix_no_padding, suffix_no_padding),
+                 the padding being only added around a non empty text
         """
         try:
             joined_actions = "".join(
@@ -78,30 +137,70 @@ class Widget():
             )
         except (TypeError, AttributeError):
             joined_actions = ""
-        # if colors are reset in text, padding will not have the good colors
-        if padding and text:
-            padding_str = self.decorate(padding * " ", fg=fg, bg=bg, font=font)
-        else:
-            padding_str = ""
-        return (12*"{}").format(
-            joined_actions,
-            padding_str,
+        opening = "".join((
             "%{{B{}}}".format(bg) if bg else "",
             "%{{F{}}}".format(fg) if fg else "",
             "%{{T{}}}".format(font) if font else "",
-            icon + " " if icon else "",
-            text,
-            "%{{T-}}".format(font) if font else "",
+        ))
+        closing = "".join((
+            "%{T-}" if font else "",
             "%{F-}" if fg else "",
             "%{B-}" if bg else "",
-            padding_str,
-            "%{A}" * len(actions) if actions else "",
+        ))
+        closing_actions = "%{A}" * len(actions) if actions else ""
+        # if colors are reset in text, padding will not have the good colors
+        padding_str = (
+            opening + padding * " " + closing if padding else ""
+        )
+        return (
+            joined_actions + padding_str + opening,
+            closing + padding_str + closing_actions,
+            joined_actions + opening,
+            closing + closing_actions,
+        )
+
+    def decorate(self, text, fg=None, bg=None, padding=0, font=None, icon=None,
+                 actions=None):
+        """
+        Decorate a text with custom properties
+
+        :param fg: foreground
+        :param bg: background
+        :param padding: padding around the text
+        :param font: index of font to use
+        :param actions: dict of actions
+        """
+        decoration = self._compile_decoration(
+            fg=fg, bg=bg, padding=padding, font=font, actions=actions
         )
+        return self._apply_decoration(decoration, text, icon)
+
+    @staticmethod
+    def _apply_decoration(decoration, text, icon=None):
+        prefix, suffix, prefix_no_padding, suffix_no_padding = decoration
+        if not text:
+            prefix, suffix = prefix_no_padding, suffix_no_padding
+        if icon:
+            return "".join((prefix, icon, " ", str(text), suffix))
+        return "".join((prefix, str(text), suffix))
 
     def decorate_with_self_attributes(self, text, *args, **kwargs):
         """
         Return self.decorate but uses self attributes for default values
+
+        Without any other parameter than text, uses the decoration compiled
+        from the self attributes, kept until one of them changes.
         """
+        if not args and not kwargs:
+            decoration = self._decoration
+            if decoration is None:
+                decoration = self._decoration = self._compile_decoration(
+                    fg=self.fg, bg=self.bg, padding=self.padding,
+                    font=self.fonts[0] if self.fonts else None,
+                    actions=self.actions
+                )
+            return self._apply_decoration(decoration, text)
+
         d_kwargs = {
             "fg": self.fg, "bg": self.bg, "padding": self.padding,
             "font": self.fonts[0] if self.fonts else None,
@@ -124,7 +223,6 @@ class Widget():
         """
         with self._lock_update:
             self.update()
-            splitted_sleep(self.refresh, stop=self._stop.is_set)
 
     def organize_result(self, *args, **kwargs):
         """
@@ -143,15 +241,29 @@ class Widget():
         if self._content != new_content:
             self._content = new_content
             for screen in self.screens:
-                threading.Thread(target=screen.update).start()
+                screen.invalidate(self)
+                screen.update()
+
+    def _periodic_update(self):
+        """
+        Called by the timer wheel every refresh seconds
+        """
+        try:
+            self.update()
+        except Exception as e:
+            logger.error(e)
 
     def continuous_update(self):
-        while not self._stop.is_set():
-            try:
-                self.update()
-            except Exception as e:
-                logger.error(e)
-            splitted_sleep(self.refresh, stop=self._stop.is_set)
+        """
+        Update the widget every refresh seconds
+
+        Registers the widget in the timer wheel of the runtime, so all
+        widgets sharing a same refresh rate are updated in the same tick.
+        """
+        self._periodic_runtime = self.runtime
+        self._periodic_runtime.add_periodic(
+            self._periodic_update, self.refresh
+        )
 
     def update(self):
         pass
@@ -170,7 +282,8 @@ class Widget():
             if not self._lock_start.acquire(blocking=False):
                 return
             if self.infinite:
-                self.continuous_update()
+                if self._periodic_runtime is None:
+                    self.continuous_update()
             else:
                 self.update()
         finally:
@@ -182,6 +295,9 @@ class Widget():
 
     def stop(self):
         self._stop.set()
+        if self._periodic_runtime is not None:
+            self._periodic_runtime.remove_periodic(self._periodic_update)
+            self._periodic_runtime = None
 
     def __init__(self, bg=None, fg=None, padding=0, fonts=None, icon="",
                  actions=None, refresh=-1, screens=None, infinite=False):
@@ -243,26 +359,86 @@ class TextWidget(Widget):
         self.infinite = False
 
 
+class SourceWidget(Widget):
+    """
+    Show the data collected by a source
+
+    The source can be shared with other widgets (see
+    barython.sources.get_source), so the data is collected once and each
+    widget only renders it with its own decoration.
+    """
+    def render(self, snapshot):
+        """
+        Show a snapshot of the source
+
+        Override this method if organize_result() needs another signature.
+        """
+        self.trigger_global_update(self.organize_result(snapshot))
+
+    def _show(self, snapshot):
+        """
+        Render snapshot if the source did not already do it
+        """
+        if not self.source.is_subscribed(self.render):
+            self.render(snapshot)
+
+    def update(self, *args, **kwargs):
+        """
+        Force an update of the source
+        """
+        self._show(self.source.update())
+
+    def start(self, *args, **kwargs):
+        self._stop.clear()
+        self.source.subscribe(
+            self.render, refresh=self.refresh if self.infinite else None,
+            runtime=self.runtime
+        )
+
+    def stop(self):
+        super().stop()
+        self.source.unsubscribe(self.render)
+
+    def __init__(self, source, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: source of the data to show
+        self.source = source
+
+
+def _reap(subproc):
+    """
+    Wait for the end of subproc, which closed its output, and close it
+    """
+    try:
+        subproc.wait(timeout=0.1)
+    except subprocess.TimeoutExpired:
+        # closed its output but still running
+        subproc.kill()
+        subproc.wait()
+    subproc.stdout.close()
+
+
 class SubprocessWidget(Widget):
     """
     Run a subprocess in a loop
+
+    In stream mode, the subprocess is started once and each line it prints
+    updates the widget.
     """
     _subscribe_subproc = None
+    _subscribe_reader = None
     _subproc = None
+    _stream_reader = None
 
-    def _no_blocking_read(self, output):
-        """
-        Set the output to be non blockant and read it
-        """
-        fd = output.fileno()
-        fl = fcntl.fcntl(fd, fcntl.F_GETFL)
-        fcntl.fcntl(fd, fcntl.F_SETFL, fl | os.O_NONBLOCK)
-        try:
-            result = output.read()
-        except:
-            result = b""
-        fcntl.fcntl(fd, fcntl.F_SETFL, fl)
-        return result
+    @property
+    def cache_ttl(self):
+        if self._cache_ttl is None:
+            return max(0, min(0.1, self.refresh / 2))
+        return self._cache_ttl
+
+    @cache_ttl.setter
+    def cache_ttl(self, value):
+        self._cache_ttl = value
 
     def _init_subprocess(self, cmd):
         """
@@ -271,9 +447,12 @@ class SubprocessWidget(Widget):
         if self._stop.is_set():
             return None
         if isinstance(cmd, str):
-            cmd = shlex.split(cmd)
-        logger.debug("Launching {}".format(" ".join(cmd)))
-        return subprocess.Popen(
+            logger.debug("Launching {}".format(cmd))
+            if not self.shell:
+                cmd = shlex.split(cmd)
+        else:
+            logger.debug("Launching {}".format(" ".join(cmd)))
+        return default_launcher.popen(
             cmd, stdout=subprocess.PIPE, shell=self.shell, env=self.env
         )
 
@@ -286,67 +465,180 @@ class SubprocessWidget(Widget):
             self._subscribe_subproc = self._init_subprocess(
                 self.subscribe_cmd
             )
+            if self._subscribe_subproc is not None:
+                self._subscribe_reader = LineReader(
+                    self._subscribe_subproc.stdout
+                )
 
-    def notify(self, *args, **kwargs):
-        if self.subscribe_cmd:
-            self._init_subscribe_subproc()
-            self._subscribe_subproc.stdout.readline()
-            # hack to flush the stdout
-            try:
-                self._no_blocking_read(self._subscribe_subproc.stdout)
-            except:
-                pass
-        return True
+    def _launch_stream(self):
+        """
+        Start cmd and update the widget with each line it prints
 
-    def continuous_update(self):
-        while not self._stop.is_set():
+        The output is read by the reactor of the runtime, so no thread is
+        blocked on it. The command is restarted after failure_refresh seconds
+        when it exits.
+        """
+        if self._stop.is_set():
+            return
+        try:
+            subproc = self._init_subprocess(self.cmd)
+        except Exception as e:
+            logger.error("Error when launching {}: {}".format(self.cmd, e))
+            subproc = None
+        if subproc is None:
+            if not self._stop.is_set():
+                self._periodic_runtime.call_later(
+                    self.failure_refresh, self._launch_stream
+                )
+            return
+        self._subproc = subproc
+        reader = self._stream_reader = LineReader(subproc.stdout)
+        self._periodic_runtime.add_reader(
+            reader.fd,
+            functools.partial(self._on_stream_readable, subproc, reader)
+        )
+
+    def _forget_reader(self, reader, current):
+        """
+        Stop watching the output of a process replaced in the meantime, as
+        the reactor would call us again and again, unless its fd has been
+        reused by the current process
+        """
+        if current is None or current.fd != reader.fd:
+            self._periodic_runtime.remove_reader(reader.fd)
+
+    def _on_stream_readable(self, subproc, reader):
+        if subproc is not self._subproc:
+            # stopped or restarted in the meantime
+            return self._forget_reader(
+                reader, self._stream_reader if self._subproc else None
+            )
+        try:
+            lines = reader.readlines()
+        except OSError:
+            lines = []
+            reader.eof = True
+        for line in lines:
             try:
-                self.update()
+                self.trigger_global_update(
+                    self.organize_result(line.decode())
+                )
             except Exception as e:
                 logger.error(e)
-                try:
-                    self._subproc.terminate()
-                except:
-                    pass
-            finally:
-                splitted_sleep(self.refresh, stop=self._stop.is_set)
-                self.notify()
+        if not reader.eof:
+            return
+
+        self._subproc = None
+        self._periodic_runtime.remove_reader(reader.fd)
+        _reap(subproc)
+        if not self._stop.is_set():
+            logger.debug("{} exited, restarting it".format(self.cmd))
+            self._periodic_runtime.call_later(
+                self.failure_refresh, self._launch_stream
+            )
+
+    def _watch_subscribe(self, subproc=None):
+        """
+        Wait for a line of subscribe_cmd, without blocking a thread
+
+        :param subproc: subscribe_cmd process to keep watching. A new one is
+                        started if it is not running anymore.
+        """
+        if self._stop.is_set():
+            return
+        if subproc is None or subproc is not self._subscribe_subproc:
+            try:
+                self._init_subscribe_subproc()
+            except Exception as e:
+                logger.error("Error when launching {}: {}".format(
+                    self.subscribe_cmd, e
+                ))
+            subproc = self._subscribe_subproc
+            if subproc is None or subproc.poll() is not None:
+                if not self._stop.is_set():
+                    self._periodic_runtime.call_later(
+                        self.failure_refresh, self._watch_subscribe
+                    )
+                return
+        reader = self._subscribe_reader
+        self._periodic_runtime.add_reader(
+            reader.fd,
+            functools.partial(self._on_subscribe_readable, subproc, reader)
+        )
+
+    def _on_subscribe_readable(self, subproc, reader):
+        if subproc is not self._subscribe_subproc:
+            return self._forget_reader(
+                reader,
+                self._subscribe_reader if self._subscribe_subproc else None
+            )
+        self._periodic_runtime.remove_reader(reader.fd)
         try:
-            self._subproc.terminate()
-        except:
-            pass
+            # one update is enough for all the lines queued
+            reader.readlines()
+        except OSError:
+            reader.eof = True
+        if reader.eof:
+            # the next watch starts a new one
+            self._subscribe_subproc = None
+            _reap(subproc)
+        self._periodic_runtime.update_dispatcher.submit(self._periodic_update)
+        self._periodic_runtime.call_later(
+            self.refresh, self._watch_subscribe, self._subscribe_subproc
+        )
+
+    def continuous_update(self):
+        if not self.stream and not self.subscribe_cmd:
+            return super().continuous_update()
+        self._periodic_runtime = self.runtime
+        if self.stream:
+            return self._launch_stream()
+        # the subscribe command decides when to update
+        self._periodic_runtime.update_dispatcher.submit(self._periodic_update)
+        self._watch_subscribe()
 
     def update(self, *args, **kwargs):
         with self._lock_update:
-            self._subproc = self._init_subprocess(self.cmd)
-            output = self._subproc.stdout.readline()
+            if self._stop.is_set():
+                return
+            cmd = self.cmd
+            if isinstance(cmd, str) and not self.shell:
+                cmd = shlex.split(cmd)
+            output = default_launcher.run(
+                cmd, shell=self.shell, env=self.env, ttl=self.cache_ttl
+            )
             if output != b"":
-                self.trigger_global_update(self.organize_result(
-                    output.decode().replace('\n', '').replace('\r', '')
-                ))
-            if self._subproc.poll() is not None:
-                self._subproc = self._subproc.terminate()
+                self.trigger_global_update(
+                    self.organize_result(output.decode())
+                )
 
     def stop(self, *args, **kwargs):
+        runtime = self._periodic_runtime
         super().stop(*args, **kwargs)
-        try:
-            self._subscribe_subproc.terminate()
-            self._subscribe_subproc = self._subscribe_subproc.wait()
-        except:
-            pass
-        try:
-            self._subproc = self._subproc.terminate()
-            self._subproc = self._subproc.wait()
-        except:
-            pass
+        subscribe_subproc, self._subscribe_subproc = (
+            self._subscribe_subproc, None
+        )
+        subproc, self._subproc = self._subproc, None
+        for p, reader in ((subscribe_subproc, self._subscribe_reader),
+                          (subproc, self._stream_reader)):
+            if p is None:
+                continue
+            if runtime is not None and reader is not None:
+                runtime.remove_reader(reader.fd)
+            try:
+                p.terminate()
+            except OSError:
+                pass
+            _reap(p)
 
     def __init__(self, cmd, subscribe_cmd=None, shell=False, infinite=True,
+                 stream=False, failure_refresh=1, cache_ttl=None,
                  *args, **kwargs):
         super().__init__(*args, **kwargs, infinite=infinite)
 
-        #: override environment variables to get the same output everywhere
-        self.env = dict(os.environ)
-        self.env["LANG"] = "en_US"
+        #: override environment variables to get the same output everywhere.
+        #  Starts as a copy of the environment shared by the launcher.
+        self.env = dict(default_launcher.env)
 
         #: command to run. Can be an iterable or a string
         self.cmd = cmd
@@ -357,3 +649,12 @@ class SubprocessWidget(Widget):
 
         #: value for the subprocess.Popen shell parameter. Default to False
         self.shell = shell
+
+        #: start cmd only once, and use each line it prints as a new value
+        self.stream = stream
+        #: time to wait before restarting cmd when streaming
+        self.failure_refresh = failure_refresh
+        #: time during which the output of cmd is shared with the widgets
+        #  running the same command. None to use half the refresh, up to
+        #  100ms, enough to share it with widgets updated in a same tick.
+        self.cache_ttl = cache_ttl
@@ -2,8 +2,11 @@
 
 import logging
 import os
+import threading
 
-from .base import Widget
+from .base import SourceWidget
+from barython.hooks.uevent import UeventHook
+from barython.sources import DataSource, get_source
 
 
 logger = logging.getLogger("battery_widget")
@@ -17,6 +20,10 @@ BAT_STATUS = {
     "UNKNOWN": "unknown",
 }
 
+#: polling rate when updated by uevents, to follow the capacity of the
+#  batteries not sending uevents when it changes
+FALLBACK_REFRESH = 60
+
 BATTERY_INFO_FILES = {
     "capacity": ["capacity"],
     "energy_now": ["energy_now", "charge_now"],
@@ -41,56 +48,101 @@ def _read_1st_and_concat(*files):
             continue
 
 
-class BatteryWidget(Widget):
-    """
-    Show battery level
+class BatterySource(DataSource):
     """
-    def _result_by_battery(self, battery, infos, show_batt_name=False):
-        r = ""
-        if show_batt_name:
-            r += "{}: ".format(battery)
-        r += "{}%".format(max(0, min(infos["capacity"], 100)))
-        remains = max(infos["remains"], 0)
-        if remains:
-            r += " - {:d}:{:02d}".format(*divmod(remains, 60))
-        return r
+    Read the state of all batteries
 
-    def organize_result(self, **batteries):
-        r = (" " * self.padding).join(
-            self._result_by_battery(
-                battery, infos, show_batt_name=len(batteries) > 1
-            ) for battery, infos in sorted(batteries.items())
-        )
-        return super().organize_result(r)
+    Snapshots are dicts {battery name: infos}.
 
-    def list_batteries(self):
+    Batteries and the path of each info are discovered once, and their files
+    are kept open and read with pread(). The discovery is done again when the
+    power supply directory changes, or when a file cannot be read anymore.
+    """
+    #: pread() size, enough for any power supply attribute
+    read_size = 4096
+
+    def _discovery_key(self):
         """
-        List batteries by checking each power supply device's type
+        Return a value changing with the power supply directory
+        """
+        return (BAT_DIR, os.stat(BAT_DIR).st_mtime_ns)
 
-        :return: yield each battery name
+    def _discover(self):
         """
+        Find the batteries and open the files of their infos
+        """
+        self.close()
+        batteries = dict()
         for component in sorted(os.listdir(BAT_DIR)):
             t = _read_1st_and_concat(*[
                 os.path.join(BAT_DIR, component, type_file)
                 for type_file in BATTERY_INFO_FILES.get("type", [])
             ])
-            if t == BAT_TYPE:
-                yield component
+            if t != BAT_TYPE:
+                continue
+            fds = batteries[component] = dict()
+            for key, files in BATTERY_INFO_FILES.items():
+                for f in files:
+                    try:
+                        fds[key] = os.open(
+                            os.path.join(BAT_DIR, component, f),
+                            os.O_RDONLY | os.O_CLOEXEC
+                        )
+                        break
+                    except FileNotFoundError:
+                        continue
+                else:
+                    logger.debug(
+                        "Could not find file {} for battery {}".format(
+                            key, component
+                        )
+                    )
+        self._batteries = batteries
+        self.discoveries += 1
+
+    def _ensure_discovered(self):
+        key = self._discovery_key()
+        if key != self._discovered:
+            self._discover()
+            self._discovered = key
+
+    def rediscover(self):
+        """
+        Force a new discovery at the next read
+        """
+        self._discovered = None
+
+    def list_batteries(self):
+        """
+        List batteries by checking each power supply device's type
+
+        :return: yield each battery name
+        """
+        self._ensure_discovered()
+        yield from self._batteries
+
+    def _read_fd(self, fd):
+        """
+        Read the whole file behind fd and concat all lines
+        """
+        content = os.pread(fd, self.read_size, 0).decode()
+        return " ".join(l.strip() for l in content.splitlines())
 
     def read_battery_infos(self, battery):
+        self._ensure_discovered()
         infos = {}
         # Fetch all infos about the battery
-        for key, val in BATTERY_INFO_FILES.items():
+        for key, fd in self._batteries.get(battery, {}).items():
             try:
-                info = _read_1st_and_concat(
-                    *[os.path.join(BAT_DIR, battery, f) for f in val]
-                )
-            except FileNotFoundError:
+                info = self._read_fd(fd)
+            except OSError as e:
+                # removed in the meantime, find it again at the next update
                 logger.debug(
-                    "Could not read file {} for battery {}".format(
-                        key, battery
+                    "Could not read {} for battery {}: {}".format(
+                        key, battery, e
                     )
                 )
+                self.rediscover()
                 continue
 
             try:
@@ -107,15 +159,17 @@ class BatteryWidget(Widget):
                 )
             except ZeroDivisionError:
                 infos["capacity"] = 0
+        # some batteries, like the ones of peripherals, have no status
+        status = str(infos.get("status", BAT_STATUS["UNKNOWN"])).lower()
         try:
-            if infos["status"].lower() == BAT_STATUS["CHARGING"]:
+            if status == BAT_STATUS["CHARGING"]:
                 energy_to_charge = (
                     infos.get("energy_full", 0) - infos.get("energy_now", 0)
                 )
                 infos["remains"] = int(
                     60 * energy_to_charge/infos.get("power_now", 0)
                 )
-            elif infos["status"].lower() == BAT_STATUS["CHARGE"]:
+            elif status == BAT_STATUS["CHARGE"]:
                 infos["remains"] = 0
             else:
                 infos["remains"] = int(
@@ -126,12 +180,93 @@ class BatteryWidget(Widget):
 
         return infos
 
-    def update(self, *args, **kwargs):
+    def collect(self):
         batteries = {}
-        for b in self.list_batteries():
-            batteries[b] = self.read_battery_infos(b)
+        # the files cannot be closed by a discovery while reading them
+        with self._files_lock:
+            for b in self.list_batteries():
+                batteries[b] = self.read_battery_infos(b)
         logger.debug("Batteries: {}".format(batteries.values()))
+        return batteries
+
+    def handler(self, event=None, *args, **kwargs):
+        """
+        Update on a power supply uevent, sent by UeventHook
+        """
+        if event != "change":
+            # added, removed, or uevents lost
+            self.rediscover()
+        self.update()
+
+    def close(self):
+        """
+        Close the files of all batteries
+        """
+        for fds in self._batteries.values():
+            for fd in fds.values():
+                os.close(fd)
+        self._batteries = dict()
+
+    def __init__(self):
+        super().__init__()
+        #: open files of each battery infos, by battery and info
+        self._batteries = dict()
+        #: result of _discovery_key() at the last discovery
+        self._discovered = None
+        #: number of discoveries done
+        self.discoveries = 0
+        self._files_lock = threading.RLock()
+
+
+class BatteryWidget(SourceWidget):
+    """
+    Show battery level
+    """
+    def _result_by_battery(self, battery, infos, show_batt_name=False):
+        r = ""
+        if show_batt_name:
+            r += "{}: ".format(battery)
+        r += "{}%".format(max(0, min(infos["capacity"], 100)))
+        remains = max(infos["remains"], 0)
+        if remains:
+            r += " - {:d}:{:02d}".format(*divmod(remains, 60))
+        return r
+
+    def organize_result(self, **batteries):
+        r = (" " * self.padding).join(
+            self._result_by_battery(
+                battery, infos, show_batt_name=len(batteries) > 1
+            ) for battery, infos in sorted(batteries.items())
+        )
+        return super().organize_result(r)
+
+    def list_batteries(self):
+        return self.source.list_batteries()
+
+    def read_battery_infos(self, battery):
+        return self.source.read_battery_infos(battery)
+
+    def render(self, batteries):
         self.trigger_global_update(self.organize_result(**batteries))
 
-    def __init__(self, refresh=10, *args, **kwargs):
-        super().__init__(refresh=refresh, infinite=True, *args, **kwargs)
+    def __init__(self, refresh=None, uevents=True, uevent_listener=None,
+                 *args, **kwargs):
+        """
+        :param refresh: polling rate. Default to FALLBACK_REFRESH with
+                        uevents, else to 10s.
+        :param uevents: update on the power supply uevents of the kernel
+        :param uevent_listener: see UeventHook listener
+        """
+        if refresh is None:
+            refresh = FALLBACK_REFRESH if uevents else 10
+        super().__init__(
+            source=get_source(BatterySource), refresh=refresh, infinite=True,
+            *args, **kwargs
+        )
+        if uevents:
+            # subscribe the shared source, so the merged hook calls it once
+            # for all widgets
+            self.hooks.subscribe(
+                self.source.handler, UeventHook, subsystem="power_supply",
+                listener=uevent_listener
+            )
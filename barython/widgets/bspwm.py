@@ -1,15 +1,48 @@
 #!/usr/bin/env python3
 
+import functools
 import logging
-import re
 
 from .base import Widget, protect_handler
-from barython.tools import splitted_sleep
-from barython.hooks.bspwm import BspwmHook
+from barython.hooks.bspwm import BspwmHook, BspwmSocketHook
 
 
 logger = logging.getLogger("barython")
 
+#: maximum number of decorated desktops and monitors to keep
+SEGMENTS_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=SEGMENTS_CACHE_SIZE)
+def _decorate_segment(text, fg, bg, padding, actions):
+    """
+    Decorate a desktop or monitor name
+
+    Cached and shared by all bspwm widgets, as the number of combinations is
+    small.
+
+    :param actions: tuple of (button, command)
+    """
+    decoration = Widget._compile_decoration(
+        fg=fg, bg=bg, padding=padding, actions=dict(actions)
+    )
+    return Widget._apply_decoration(decoration, text)
+
+
+def segments_cache_info():
+    """
+    Return statistics about the decorated segments cache
+
+    :return: dict with the hits, misses, hit rate and current size
+    """
+    info = _decorate_segment.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits, "misses": info.misses,
+        "hit_rate": info.hits / total if total else 0,
+        "size": info.currsize,
+    }
+
 
 class BspwmDesktopWidget(Widget):
     """
@@ -38,7 +71,24 @@ class BspwmDesktopWidget(Widget):
         )
         with self._lock_update:
             self._update_screens(new_content)
-            splitted_sleep(self.refresh, stop=self._stop.is_set)
+
+    @property
+    def fixed_order(self):
+        return self._fixed_order
+
+    @fixed_order.setter
+    def fixed_order(self, value):
+        self._fixed_order = value
+        #: position of each desktop in fixed_order
+        self._fixed_order_index = dict()
+        for i, d in enumerate(value):
+            self._fixed_order_index.setdefault(d, i)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        # colors, padding or order changed, previous renders are outdated
+        if not name.startswith("_"):
+            super().__setattr__("_rendered", dict())
 
     def _actions_desktop(self, desktop, *args, **kwargs):
         return {1: "bspc desktop -f \"{}\"".format(desktop)}
@@ -55,63 +105,72 @@ class BspwmDesktopWidget(Widget):
 
         :param desktops_to_sort: list of desktops to reorder
         """
-        d = desktops_to_sort.copy()
         # All desktops that are not in self._fixed_order will be put at the
         # end
         max_index = len(self.fixed_order)
-        d.sort(key=lambda x: self.fixed_order.index(x[1:])
-               if x[1:] in self.fixed_order else max_index)
-        return d
+        index = self._fixed_order_index
+        return sorted(desktops_to_sort,
+                      key=lambda x: index.get(x[1:], max_index))
 
     def _parse_monitor(self, m, prop):
-        decorate_kwargs = {
-            "text": m, "padding": self.padding,
-            "actions": self._actions_monitor(m, prop)
-        }
-        if prop["focused"]:
+        if prop.focused:
             fg = self.fg_focused_monitor or self.fg
             bg = self.bg_focused_monitor or self.bg
         else:
             fg = self.fg_monitor or self.fg
             bg = self.bg_monitor or self.bg
-        return self.decorate(fg=fg, bg=bg, **decorate_kwargs)
+        return _decorate_segment(
+            m, fg, bg, self.padding,
+            tuple(self._actions_monitor(m, prop).items())
+        )
 
     def _parse_desktop(self, d, m):
         d_name = d[1:]
-        decorate_kwargs = {
-            "text": d_name, "padding": self.padding,
-            "actions": self._actions_desktop(d_name, m)
-        }
-
         bg, fg = self._desktop_colors_prefix.get(
             d[0], ("bg", "fg")
         )
-        return self.decorate(
-            fg=getattr(self, fg, None) or self.fg,
-            bg=getattr(self, bg, None) or self.bg,
-            **decorate_kwargs
+        return _decorate_segment(
+            d_name, getattr(self, fg, None) or self.fg,
+            getattr(self, bg, None) or self.bg, self.padding,
+            tuple(self._actions_desktop(d_name, m).items())
         )
 
     def _get_focused_desktop(self, desktops):
         """
         Return the focused desktop in a list of desktops
         """
-        starts_with_uppercase = re.compile(r"^[A-Z]")
         for d in desktops:
-            if re.match(starts_with_uppercase, d):
+            if d[:1].isupper():
                 yield d[1:]
 
+    def _render_monitor(self, m, prop, show_monitor):
+        if show_monitor:
+            yield self._parse_monitor(m, prop)
+        desktop_list = (self._sort_fixed_order(prop.desktops)
+                        if self.fixed_order else prop.desktops)
+        for d in desktop_list:
+            yield self._parse_desktop(d, m)
+
     def _parse_and_decorate(self, infos):
+        """
+        Render each monitor, reusing the previous render of the monitors
+        that did not change since the last report
+        """
+        show_monitor = len(infos) > 1
+        rendered = dict()
         for m, prop in infos.items():
             self._focused[m] = next(
-                self._get_focused_desktop(prop["desktops"])
+                self._get_focused_desktop(prop.desktops)
             )
-            if len(list(infos.keys())) > 1:
-                yield self._parse_monitor(m, prop)
-            desktop_list = (self._sort_fixed_order(prop["desktops"])
-                            if self.fixed_order else prop["desktops"])
-            for d in desktop_list:
-                yield self._parse_desktop(d, m)
+            state = (show_monitor, prop)
+            previous = self._rendered.get(m)
+            if previous is not None and previous[0] == state:
+                segment = previous[1]
+            else:
+                segment = "".join(self._render_monitor(m, prop, show_monitor))
+            rendered[m] = (state, segment)
+            yield segment
+        self._rendered = rendered
 
     def organize_result(self, monitors, *args, **kwargs):
         """
@@ -128,7 +187,7 @@ class BspwmDesktopWidget(Widget):
                  fg_focused_free=None, bg_focused_free=None,
                  fg_focused_urgent=None, bg_focused_urgent=None,
                  fg_focused_monitor=None, bg_focused_monitor=None,
-                 fixed_order=None, bspwm_version="0.9.2",
+                 fixed_order=None, bspwm_version="0.9.2", use_socket=False,
                  *args, **kwargs):
         super().__init__(*args, **kwargs, infinite=False)
 
@@ -187,11 +246,17 @@ class BspwmDesktopWidget(Widget):
 
         #: registered the focused desktop of each monitors
         self._focused = dict()
+        #: previous render of each monitor, with the state it was made from
+        self._rendered = dict()
 
-        # Update the widget when PA volume changes
-        self.hooks.subscribe(
-            self.handler, BspwmHook, bspwm_version=self.bspwm_version
-        )
+        # Update the widget when bspwm sends a new report
+        if use_socket:
+            # talk directly with bspwm, without spawning bspc
+            self.hooks.subscribe(self.handler, BspwmSocketHook)
+        else:
+            self.hooks.subscribe(
+                self.handler, BspwmHook, bspwm_version=self.bspwm_version
+            )
 
 
 class BspwmDesktopPoolWidget(BspwmDesktopWidget):
@@ -203,6 +268,9 @@ class BspwmDesktopPoolWidget(BspwmDesktopWidget):
     always show desktops in the same order (and will not fully respect the
     order returned by bspwm).
     """
+    #: context of the previous render, see _rendering_context()
+    _rendered_context = None
+
     def _swap_desktop(self, target_d):
         """
         Swap desktop d of monitor m with the one on the current screen
@@ -235,24 +303,48 @@ class BspwmDesktopPoolWidget(BspwmDesktopWidget):
         :param desktops_to_sort: here, is a list of tuple, [(d, m), ], with d
                                  the desktop, and m its monitor
         """
-        d = desktops_to_sort.copy()
         # All desktops that are not in self._fixed_order will be put at the
         # end
         max_index = len(self.fixed_order)
-        d.sort(key=lambda x: self.fixed_order.index(x[0][1:])
-               if x[0][1:] in self.fixed_order else max_index)
-        return d
+        index = self._fixed_order_index
+        return sorted(desktops_to_sort,
+                      key=lambda x: index.get(x[0][1:], max_index))
+
+    def _rendering_context(self):
+        """
+        Return what the render of a desktop depends on, besides its state
+
+        When attached to only one screen, desktops actions depend on the
+        desktop focused on this screen.
+        """
+        if len(self.screens) == 1:
+            current_m = next(iter(self.screens)).bspwm_monitor_name
+            return current_m, self._focused.get(current_m)
+        return None
 
     def _parse_and_decorate(self, infos):
-        def get_desktops():
-            for m, prop in infos.items():
-                self._focused[m] = next(
-                    self._get_focused_desktop(prop["desktops"])
-                )
-                for d in prop["desktops"]:
-                    yield d, m
-
-        desktop_list = (self._sort_fixed_order(list(get_desktops()))
-                        if self.fixed_order else get_desktops())
+        """
+        Render each desktop, reusing the previous render of the desktops
+        that did not change since the last report
+        """
+        desktop_list = []
+        for m, prop in infos.items():
+            self._focused[m] = next(
+                self._get_focused_desktop(prop.desktops)
+            )
+            desktop_list.extend((d, m) for d in prop.desktops)
+        if self.fixed_order:
+            desktop_list = self._sort_fixed_order(desktop_list)
+
+        context = self._rendering_context()
+        previous = (self._rendered if context == self._rendered_context
+                    else dict())
+        rendered = dict()
         for d, m in desktop_list:
-            yield self._parse_desktop(d, m)
+            segment = previous.get((d, m))
+            if segment is None:
+                segment = self._parse_desktop(d, m)
+            rendered[(d, m)] = segment
+            yield segment
+        self._rendered = rendered
+        self._rendered_context = context
@@ -1,21 +1,165 @@
 #!/usr/bin/env python3
 
 from datetime import datetime
+import os
+import re
 import time
 
-from .base import Widget
+from .base import SourceWidget
+from barython.sources import DataSource, get_source
 
 
-class ClockWidget(Widget):
-    def organize_result(self, date_now, **kwargs):
-        return super().organize_result(date_now.strftime(self.date_format))
+#: period of the value shown by each strftime directive, in seconds.
+#  Directives not listed here are considered to change every second.
+DIRECTIVES_PERIODS = dict(
+    [(d, 60) for d in "MR"] +
+    # the timezone only changes with the DST, at an hour boundary
+    [(d, 3600) for d in "HIklpPzZ"] +
+    [(d, 86400) for d in "aAbBCdDeFgGhjmntuUVwWxyY"]
+)
+
+_DIRECTIVE_RE = re.compile(r"%%|%[-_0^#]*[EO]?(.)")
+
+LOCALTIME_PATH = "/etc/localtime"
+
+
+def format_granularity(date_format):
+    """
+    Return the period of the finest value shown by date_format, in seconds
+
+    For example, 60 for "%H:%M" and 1 for "%c".
+    """
+    return min(
+        (DIRECTIVES_PERIODS.get(d, 1)
+         for d in _DIRECTIVE_RE.findall(date_format) if d),
+        default=86400
+    )
+
+
+def next_boundary(period, now=None):
+    """
+    Return the time.time() value when the local time next reaches a
+    multiple of period
+
+    :param now: time.time() value to start from. Default to now.
+    """
+    now = time.time() if now is None else now
+    offset = time.localtime(now).tm_gmtoff
+    return ((now + offset) // period + 1) * period - offset
+
+
+def _timezone_key():
+    """
+    Return a value changing with the timezone configuration
+    """
+    key = [os.environ.get("TZ")]
+    for stat in (os.lstat, os.stat):
+        try:
+            st = stat(LOCALTIME_PATH)
+            key.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            key.append(None)
+    return tuple(key)
+
+
+class ClockSource(DataSource):
+    """
+    Current local time, shared by all clocks
+
+    Snapshots are datetime objects, formatted by each widget. The source is
+    updated right after each multiple of the smallest refresh of its
+    subscribers, in local time, so all clocks flip at the same time with one
+    tick. Timezone data are reloaded only when TZ or /etc/localtime change.
+    """
+    #: minimum period between two ticks
+    min_period = 0.01
+    #: maximum time to wait before checking the wall clock again. The
+    #  scheduler uses the monotonic clock, which stops during a suspend.
+    max_wait = 60
 
-    def update(self, *args, **kwargs):
-        time.tzset()
-        self.trigger_global_update(
-            self.organize_result(datetime.now())
+    def collect(self):
+        key = _timezone_key()
+        if key != self._timezone_key:
+            time.tzset()
+            self._timezone_key = key
+            self.tzsets += 1
+        return datetime.now()
+
+    def _start_periodic(self, period):
+        self._tick_token = token = object()
+        self._periodic_runtime.update_dispatcher.submit(self._periodic_update)
+        self._schedule_tick(
+            token, next_boundary(max(period, self.min_period))
+        )
+
+    def _stop_periodic(self):
+        with self._lock:
+            self._tick_token = None
+            if self._tick_timer is not None:
+                self._tick_timer.cancel()
+                self._tick_timer = None
+
+    def _schedule_tick(self, token, boundary):
+        with self._lock:
+            if token is not self._tick_token:
+                return
+            self._tick_timer = self._periodic_runtime.call_later(
+                min(max(0, boundary - time.time()), self.max_wait),
+                self._tick, token, boundary
+            )
+
+    def _tick(self, token, boundary):
+        now = time.time()
+        if now < boundary:
+            # woken up early or to check the wall clock, the time shown would
+            # not change yet
+            return self._schedule_tick(token, boundary)
+        with self._lock:
+            if token is not self._tick_token:
+                return
+            period = self._period
+        self.ticks += 1
+        self._schedule_tick(
+            token, next_boundary(max(period, self.min_period), now)
         )
+        self._periodic_runtime.update_dispatcher.submit(self._periodic_update)
+
+    def __init__(self):
+        super().__init__()
+        #: result of _timezone_key() at the last time.tzset()
+        self._timezone_key = None
+        #: number of time.tzset() calls
+        self.tzsets = 0
+        #: number of boundaries reached
+        self.ticks = 0
+
+        #: identify the current chain of ticks
+        self._tick_token = None
+        self._tick_timer = None
+
+
+class ClockWidget(SourceWidget):
+    """
+    Show the date and time
+
+    By default, the refresh is the period of the finest value shown by
+    date_format, and the widget is updated right when it changes.
+    """
+    @property
+    def refresh(self):
+        if self._refresh == -1:
+            return format_granularity(getattr(self, "date_format", "%c"))
+        return max(0, self._refresh)
+
+    @refresh.setter
+    def refresh(self, value):
+        self._refresh = value
+
+    def organize_result(self, date_now, **kwargs):
+        return super().organize_result(date_now.strftime(self.date_format))
 
     def __init__(self, date_format="%c", infinite=True, *args, **kwargs):
-        super().__init__(infinite=True, *args, **kwargs)
+        super().__init__(
+            source=get_source(ClockSource), infinite=True, *args, **kwargs
+        )
         self.date_format = date_format
@@ -2,15 +2,120 @@
 
 import logging
 import mpd
+import threading
 
-from .base import Widget
-from barython.hooks.mpd import MPDHook
+from .base import SourceWidget
+from barython.hooks.mpd import MPDHook, fetch_state
+from barython.sources import DataSource, get_source
 
 
 logger = logging.getLogger("barython")
 
 
-class MPDWidget(Widget):
+class MPDConnection:
+    """
+    Connection to MPD, shared by all widgets showing a same server
+    """
+    def fetch(self):
+        """
+        Fetch the status and the current song, reconnecting if needed
+
+        :return: tuple (status, current song)
+        """
+        with self._lock:
+            try:
+                return fetch_state(self._client)
+            except Exception:
+                self._reconnect()
+                return fetch_state(self._client)
+
+    def set_password(self, value):
+        with self._lock:
+            self.password = value
+            try:
+                self._client.password(value)
+            except mpd.ConnectionError:
+                # will be sent at the next connection
+                pass
+
+    def _reconnect(self):
+        try:
+            self._client.disconnect()
+        except mpd.ConnectionError:
+            pass
+        self._client.connect(self.host, self.port)
+        if self.password:
+            self._client.password(self.password)
+
+    def __init__(self, host, port, password=None):
+        self.host = host
+        self.port = port
+        self.password = password
+
+        self._client = mpd.MPDClient()
+        #: the client cannot be used by several threads at the same time
+        self._lock = threading.Lock()
+
+
+#: connections shared by widgets, by (host, port, password)
+_connections = dict()
+_connections_lock = threading.Lock()
+
+
+def get_connection(host, port, password=None):
+    """
+    Return the connection shared by all widgets showing host:port with the
+    same password
+    """
+    key = (host, port, password)
+    with _connections_lock:
+        connection = _connections.get(key)
+        if connection is None:
+            connection = _connections[key] = MPDConnection(
+                host, port, password
+            )
+    return connection
+
+
+class MPDSource(DataSource):
+    """
+    Status and current song of a MPD server
+
+    Snapshots are tuples (status, current song), both None if MPD cannot be
+    joined.
+    """
+    def collect(self):
+        try:
+            return self.connection.fetch()
+        except Exception as e:
+            logger.debug(
+                "MPD is not running or cannot be joined: {}".format(e)
+            )
+            return (None, None)
+
+    def handler(self, event=None, run=True, status=None, current=None,
+                *args, **kwargs):
+        """
+        Publish the state notified by MPDHook
+
+        :return: the new snapshot
+        """
+        if not run:
+            snapshot = (None, None)
+        elif status is not None:
+            # already fetched by the hook
+            snapshot = (status, current)
+        else:
+            return self.update()
+        self.publish(snapshot)
+        return snapshot
+
+    def __init__(self, host, port, password=None):
+        super().__init__()
+        self.connection = get_connection(host, port, password)
+
+
+class MPDWidget(SourceWidget):
     """
     Requires python-mpd2
     """
@@ -18,47 +123,39 @@ class MPDWidget(Widget):
 
     @property
     def icon(self):
-        status = self.status
+        return self._get_icon(self.status)
+
+    @icon.setter
+    def icon(self, value):
+        self._icon = value
+
+    def _get_icon(self, status):
+        """
+        Return the icon to show for status
+        """
         no_icon = self._icon is None or not status
         if isinstance(self._icon, str) or no_icon:
             return self._icon
         global_icon = self._icon.get("global", None)
         return self._icon.get(status, global_icon)
 
-    @icon.setter
-    def icon(self, value):
-        self._icon = value
+    def _get_snapshot(self):
+        snapshot = self.source.snapshot
+        if snapshot is None:
+            snapshot = self.source.update()
+        return snapshot
 
     @property
     def status(self):
-        try:
-            r = self._mpdclient.status()["state"]
-        except Exception:
-            self._reconnect()
-            r = self._mpdclient.status()["state"]
-        return r
+        status = self._get_snapshot()[0]
+        return status.get("state") if status else None
 
     @property
     def current(self):
-        try:
-            r = self._mpdclient.currentsong()
-        except Exception:
-            self._reconnect()
-            r = self._mpdclient.currentsong()
-        return r
-
-    def _reconnect(self):
-        try:
-            self._mpdclient.connect(self.host, self.port)
-        except:
-            try:
-                self._mpdclient.disconnect()
-            except mpd.ConnectionError:
-                pass
-            self._mpdclient.connect(self.host, self.port)
+        return self._get_snapshot()[1]
 
     def password(self, value):
-        self._mpdclient.password(value)
+        self.source.connection.set_password(value)
 
     def organize_result(self, status=None, current=None, running=True,
                         *args, **kwargs):
@@ -69,7 +166,7 @@ class MPDWidget(Widget):
             return ""
 
         # avoid doing useless connections to mpd
-        icon = self.icon
+        icon = self._get_icon(status) if status is not None else self.icon
         artist, title = None, None
         if current:
             artist, title = current.get("artist"), current.get("title")
@@ -83,33 +180,33 @@ class MPDWidget(Widget):
         else:
             return "{} - {}".format(artist, title)
 
-    def handler(self, event=None, run=True, *args, **kwargs):
-        if not run:
+    def render(self, snapshot):
+        status, current = snapshot
+        if status is None:
             return self.trigger_global_update(
                 self.organize_result(running=False)
             )
-        return super().handler(event=event, *args, **kwargs)
+        return self.trigger_global_update(
+            self.organize_result(status=status.get("state"), current=current)
+        )
 
-    def update(self, *args, **kwargs):
-        try:
-            return self.trigger_global_update(
-                self.organize_result(status=self.status, current=self.current)
-            )
-        except Exception as e:
-            logger.debug(
-                "MPD is not running or cannot be joined: {}".format(e)
-            )
-            return self.trigger_global_update(
-                self.organize_result(running=False)
-            )
+    def handler(self, *args, **kwargs):
+        self._show(self.source.handler(*args, **kwargs))
 
     def __init__(self, host="localhost", port=6600, password=None,
                  *args, **kwargs):
-        super().__init__(*args, **kwargs)
+        super().__init__(
+            source=get_source(MPDSource, host, port, password),
+            *args, **kwargs
+        )
         self.infinite = False
         self.host = host
         self.port = port
-        self._mpdclient = mpd.MPDClient()
         if password:
             self.password(password)
-        self.hooks.subscribe(self.handler, MPDHook, refresh=self.refresh)
+        # subscribe the shared source, so the merged hook calls it once for
+        # all widgets
+        self.hooks.subscribe(
+            self.source.handler, MPDHook, host=host, port=port,
+            password=password, refresh=self.refresh
+        )
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+"""
+Measure the cost of reading the batteries, by opening every file at each
+update and with the files kept open by BatterySource
+
+A fake /sys/class/power_supply is built on a tmpfs (/dev/shm), with
+batteries using the charge_* fallbacks and other power supply devices, as
+on a real laptop.
+
+Usage: python benchmarks/bench_battery.py [nb_batteries]
+"""
+
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import barython.widgets.battery
+from barython.widgets.battery import (
+    BAT_TYPE, BATTERY_INFO_FILES, BatterySource, _read_1st_and_concat
+)
+
+
+NUMBER = 2000
+
+#: files of a battery, charge_* instead of energy_* to use the fallbacks
+BATTERY_FILES = {
+    "capacity": "87", "charge_now": "3512000", "charge_full": "4036000",
+    "current_now": "1260000", "status": "Discharging", "type": "Battery",
+}
+OTHER_DEVICES = {
+    "AC": "Mains", "ucsi-source-psy-USBC000:001": "USB",
+    "hidpp_battery_0": "Battery",
+}
+
+
+def build_power_supply_dir(path, nb_batteries):
+    for i in range(nb_batteries):
+        d = os.path.join(path, "BAT{}".format(i))
+        os.mkdir(d)
+        for name, content in BATTERY_FILES.items():
+            with open(os.path.join(d, name), "w") as f:
+                f.write(content + "\n")
+    for device, t in OTHER_DEVICES.items():
+        d = os.path.join(path, device)
+        os.mkdir(d)
+        with open(os.path.join(d, "type"), "w") as f:
+            f.write(t + "\n")
+
+
+def collect_reopening(bat_dir):
+    """
+    Previous implementation: list and open every file at each update
+    """
+    batteries = {}
+    for component in sorted(os.listdir(bat_dir)):
+        t = _read_1st_and_concat(os.path.join(bat_dir, component, "type"))
+        if t != BAT_TYPE:
+            continue
+        infos = batteries[component] = {}
+        for key, files in BATTERY_INFO_FILES.items():
+            infos[key] = _read_1st_and_concat(
+                *[os.path.join(bat_dir, component, f) for f in files]
+            )
+    return batteries
+
+
+def measure(func):
+    timings = []
+    for _ in range(NUMBER):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1e6
+
+
+def main(nb_batteries=2):
+    bat_dir = tempfile.mkdtemp(dir="/dev/shm")
+    try:
+        build_power_supply_dir(bat_dir, nb_batteries)
+        barython.widgets.battery.BAT_DIR = bat_dir
+        source = BatterySource()
+        results = (
+            ("open every file", lambda: collect_reopening(bat_dir)),
+            ("BatterySource (pread)", source.collect),
+        )
+        print("batteries: {}, median of {} updates".format(
+            nb_batteries, NUMBER
+        ))
+        for name, func in results:
+            print("{:<24} {:.1f} us".format(name, measure(func)))
+        print("discoveries:             {}".format(source.discoveries))
+        source.close()
+    finally:
+        shutil.rmtree(bat_dir)
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
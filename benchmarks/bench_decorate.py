@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+
+"""
+Compare the decoration precompiled from the widget attributes with the
+previous implementation of Widget.decorate, rebuilding it on each call
+
+Usage: python benchmarks/bench_decorate.py
+"""
+
+import timeit
+
+from barython.widgets.base import Widget
+
+
+NUMBER = 100000
+
+
+def legacy_decorate(text, fg=None, bg=None, padding=0, font=None, icon=None,
+                    actions=None):
+    """
+    Widget.decorate, before the decoration was precompiled
+    """
+    try:
+        joined_actions = "".join(
+            "%{{A{}:{}:}}".format(a, cmd) for a, cmd in actions.items()
+        )
+    except (TypeError, AttributeError):
+        joined_actions = ""
+    if padding and text:
+        padding_str = legacy_decorate(padding * " ", fg=fg, bg=bg, font=font)
+    else:
+        padding_str = ""
+    return (12*"{}").format(
+        joined_actions,
+        padding_str,
+        "%{{B{}}}".format(bg) if bg else "",
+        "%{{F{}}}".format(fg) if fg else "",
+        "%{{T{}}}".format(font) if font else "",
+        icon + " " if icon else "",
+        text,
+        "%{{T-}}".format(font) if font else "",
+        "%{F-}" if fg else "",
+        "%{B-}" if bg else "",
+        padding_str,
+        "%{A}" * len(actions) if actions else "",
+    )
+
+
+def legacy_decorate_with_self_attributes(w, text):
+    d_kwargs = {
+        "fg": w.fg, "bg": w.bg, "padding": w.padding,
+        "font": w.fonts[0] if w.fonts else None,
+        "actions": w.actions,
+    }
+    return legacy_decorate(text, **d_kwargs)
+
+
+def main():
+    w = Widget(fg="#FFFFFFFF", bg="#FF000000", padding=2, fonts=[1, ],
+               actions={1: "urxvt&", 3: "firefox&"})
+    assert (legacy_decorate_with_self_attributes(w, "test") ==
+            w.decorate_with_self_attributes("test"))
+
+    results = {
+        "legacy decorate": timeit.timeit(
+            lambda: legacy_decorate_with_self_attributes(w, "test"),
+            number=NUMBER
+        ),
+        "decorate": timeit.timeit(
+            lambda: w.decorate(
+                "test", fg=w.fg, bg=w.bg, padding=w.padding, font=1,
+                actions=w.actions
+            ), number=NUMBER
+        ),
+        "precompiled": timeit.timeit(
+            lambda: w.decorate_with_self_attributes("test"), number=NUMBER
+        ),
+    }
+    for name, total in results.items():
+        print("{:<16} {:.3f} µs/call".format(name, total / NUMBER * 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+
+"""
+Replay a burst of pactl events, like the one sent when holding the volume
+key, and compare the deliveries to the widget before and after the
+PulseAudioHook filters and debouncing
+
+Usage: python benchmarks/bench_pulseaudio.py
+"""
+
+import time
+
+from barython.hooks import _Hook
+from barython.hooks.audio import PulseAudioHook
+
+
+#: one volume step: pactl reports the sink, its inputs and the client
+STEP = [
+    "Event 'change' on sink #0",
+    "Event 'change' on sink-input #42",
+    "Event 'change' on client #7",
+    "Event 'change' on sink #0",
+]
+#: holding the key for about 1 second, with a step every 20ms
+NB_STEPS = 50
+STEP_INTERVAL = 0.02
+
+
+class Counter:
+    def __call__(self, *args, **kwargs):
+        self.calls += 1
+
+    def __init__(self):
+        self.calls = 0
+
+
+def legacy_handler(counter):
+    """
+    Handler of PulseAudioWidget before the hook filters, doing the
+    substring check on every line
+    """
+    def handler(event, *args, **kwargs):
+        if "Event 'change' on sink" in event:
+            counter()
+    return handler
+
+
+def replay(hook):
+    """
+    :return: tuple (time spent in the hook, number of calls dispatched)
+    """
+    dispatched = hook.dispatcher.dispatched
+    start = time.perf_counter()
+    for _ in range(NB_STEPS):
+        for line in STEP:
+            hook.notify(run=True, **hook.parse_event(line))
+        time.sleep(STEP_INTERVAL)
+    elapsed = time.perf_counter() - start - NB_STEPS * STEP_INTERVAL
+    time.sleep(0.2)
+    hook.dispatcher.join()
+    return elapsed, hook.dispatcher.dispatched - dispatched
+
+
+def main():
+    legacy_updates = Counter()
+    legacy_hook = _Hook(callbacks={legacy_handler(legacy_updates), })
+    legacy_time, legacy_dispatched = replay(legacy_hook)
+
+    updates = Counter()
+    hook = PulseAudioHook(
+        callbacks={updates, }, events=("change", ), facilities=("sink", )
+    )
+    new_time, dispatched = replay(hook)
+
+    lines = NB_STEPS * len(STEP)
+    print("lines replayed:      {}".format(lines))
+    print("legacy dispatches:   {} ({} updates)".format(
+        legacy_dispatched, legacy_updates.calls
+    ))
+    print("legacy hook time:    {:.2f} ms".format(legacy_time * 1000))
+    print("filtered:            {}".format(hook.filtered))
+    print("debounced:           {}".format(hook.debounced))
+    print("dispatches:          {} ({} updates)".format(
+        dispatched, updates.calls
+    ))
+    print("hook time:           {:.2f} ms".format(new_time * 1000))
+
+
+if __name__ == "__main__":
+    main()
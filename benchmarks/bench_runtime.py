@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+"""
+Compare the thread and asyncio runtimes
+
+Builds a panel with several screens and widgets, feeds it with synthetic hook
+events, and measures the number of threads, the RSS and the latency between
+an event and the frame written in the bar.
+
+Usage: python benchmarks/bench_runtime.py [thread|asyncio] [nb_screens]
+"""
+
+import statistics
+import sys
+import threading
+import time
+
+import barython.panel
+from barython.hooks import _Hook
+from barython.panel import Panel
+from barython.screen import Screen
+from barython.widgets.base import TextWidget, Widget
+from barython.widgets.clock import ClockWidget
+
+
+NB_EVENTS = 200
+EVENT_INTERVAL = 0.01
+
+#: timestamp of the last event sent, to compute the latency
+last_event = {"ts": None}
+latencies = []
+
+
+class SyntheticHook(_Hook):
+    def run(self):
+        for i in range(NB_EVENTS):
+            if self._stop_event.is_set():
+                return
+            last_event["ts"] = time.perf_counter()
+            self.notify(value=i)
+            time.sleep(EVENT_INTERVAL)
+
+
+class EventWidget(Widget):
+    def handler(self, value, *args, **kwargs):
+        self.trigger_global_update(self.organize_result(str(value)))
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hooks.subscribe(self.handler, SyntheticHook)
+
+
+def fake_init_bar(self, *args, **kwargs):
+    self._bar = True
+
+
+def fake_write_in_bar(self, content):
+    if last_event["ts"] is not None:
+        latencies.append(time.perf_counter() - last_event["ts"])
+
+
+def rss_kb():
+    with open("/proc/self/status") as f:
+        for l in f:
+            if l.startswith("VmRSS"):
+                return int(l.split()[1])
+
+
+def main(runtime="thread", nb_screens=6):
+    barython.panel.SIG_TO_CATCH = ()
+    Panel.init_bar = Screen.init_bar = fake_init_bar
+    Panel._write_in_bar = Screen._write_in_bar = fake_write_in_bar
+
+    p = Panel(runtime=runtime, keep_unplugged_screens=True, refresh=0.01)
+    for i in range(nb_screens):
+        s = Screen(geometry=(1920, 18, 1920 * i, 0))
+        s.add_widget("l", EventWidget(), TextWidget(text="screen {}".format(i)))
+        s.add_widget("r", ClockWidget(refresh=1))
+        p.add_screen(s)
+
+    threading.Thread(target=p.start).start()
+    max_threads = 0
+    deadline = time.perf_counter() + NB_EVENTS * EVENT_INTERVAL + 0.5
+    while time.perf_counter() < deadline:
+        max_threads = max(max_threads, threading.active_count())
+        time.sleep(0.005)
+    rss = rss_kb()
+    p.stop()
+
+    print("runtime:         {}".format(runtime))
+    print("screens:         {}".format(nb_screens))
+    print("max threads:     {}".format(max_threads))
+    print("RSS:             {} kB".format(rss))
+    if latencies:
+        latencies.sort()
+        print("frames:          {}".format(len(latencies)))
+        print("latency median:  {:.3f} ms".format(
+            statistics.median(latencies) * 1000
+        ))
+        print("latency p95:     {:.3f} ms".format(
+            latencies[int(len(latencies) * 0.95)] * 1000
+        ))
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2], *map(int, sys.argv[2:3]))
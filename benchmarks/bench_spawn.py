@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+"""
+Measure the latency of launching a command, with subprocess.Popen defaults
+and with the barython launcher
+
+A ballast is allocated and a few threads are started to look like a running
+panel, as forking gets slower with the size of the process.
+
+Usage: python benchmarks/bench_spawn.py [ballast_mb]
+"""
+
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+from barython.launcher import Launcher
+
+
+NUMBER = 200
+
+
+def measure(func):
+    timings = []
+    for _ in range(NUMBER):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def popen_default(cmd, shell=False):
+    p = subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=shell)
+    p.stdout.readline()
+    p.wait()
+    p.stdout.close()
+
+
+def main(ballast_mb=200):
+    # touch every page, so they have to be handled when forking
+    ballast = bytearray(ballast_mb * 1024 * 1024)
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1
+    stop = threading.Event()
+    for _ in range(8):
+        threading.Thread(target=stop.wait, daemon=True).start()
+
+    launcher = Launcher()
+    results = (
+        ("Popen ['echo', 'x']", lambda: popen_default(["echo", "x"])),
+        ("launcher ['echo', 'x']", lambda: launcher.run(["echo", "x"])),
+        ("Popen 'echo x' shell", lambda: popen_default("echo x", True)),
+        ("launcher 'echo x' shell",
+         lambda: launcher.run("echo x", shell=True)),
+    )
+    print("ballast: {} MB, median of {} launches".format(ballast_mb, NUMBER))
+    for name, func in results:
+        print("{:<26} {:.3f} ms".format(name, measure(func)))
+    stop.set()
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:2]))
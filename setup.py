@@ -30,6 +30,7 @@ setup(
     keywords=["bar", "desktop"],
     packages=["barython", ],
     install_requires=["python-mpd2", "xcffib"],
+    extras_require={"pulseaudio": ["pulsectl"]},
     setup_requires=['pytest-runner', ],
     tests_require=['pytest', 'pytest-cov', "pytest-mock", "pytest-xdist"],
 )